@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import click
+from flask import Flask
+
+
+@click.command("backfill-normalized")
+@click.option("--chunk-size", default=1000, show_default=True, help="Raw rows read and committed per chunk.")
+def backfill_normalized_command(chunk_size: int) -> None:
+    """Populate transaction_normalized from existing transaction_raw rows."""
+    from app.services.normalize.backfill import backfill_normalized
+
+    written = backfill_normalized(chunk_size=chunk_size)
+    click.echo(f"backfilled {written} normalized transactions")
+
+
+@click.command("value-transactions")
+@click.option("--batch-id", type=int, default=None, help="Only this import batch (default: all).")
+@click.option("--refresh", is_flag=True, help="Revalue rows that already have a valuation.")
+def value_transactions_command(batch_id, refresh: bool) -> None:
+    """Store USD valuations for transactions not valued (or priced) yet."""
+    from app.services.valuation import value_transactions
+
+    valued = value_transactions(batch_id, refresh=refresh)
+    click.echo(f"valued {valued} transactions")
+
+
+@click.command("rollup-prices")
+@click.option("--chunk-size", default=10_000, show_default=True, help="Price points read and committed per chunk.")
+def rollup_prices_command(chunk_size: int) -> None:
+    """Rebuild the 1m/1h/1d price_rollup tables from price_point."""
+    from app.db import SessionLocal
+    from app.services.prices import series_cache
+    from app.services.prices.rollup import rebuild_rollups
+
+    with SessionLocal() as session:
+        points = rebuild_rollups(session, chunk_size=chunk_size)
+    series_cache.clear()
+    click.echo(f"rolled up {points} price points")
+
+
+@click.command("prune-prices")
+@click.option("--older-than-days", default=90, show_default=True, help="Only thin ticks of days at least this old.")
+@click.option("--chunk-size", default=10_000, show_default=True, help="Price points read and committed per chunk.")
+def prune_prices_command(older_than_days: int, chunk_size: int) -> None:
+    """Thin old price_point ticks to each minute's open/high/low/close; rollups are kept."""
+    from datetime import datetime, timedelta, timezone
+
+    from app.db import SessionLocal
+    from app.services.prices import series_cache
+    from app.services.prices.rollup import prune_ticks
+
+    before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    with SessionLocal() as session:
+        removed = prune_ticks(session, before, chunk_size=chunk_size)
+    series_cache.clear()
+    click.echo(f"pruned {removed} price points")
+
+
+@click.command("export-parquet")
+@click.option("--out", "out_dir", default=None, help="Output directory (default: EXPORT_DIR).")
+@click.option(
+    "--dataset", "datasets", multiple=True, type=click.Choice(["transactions", "prices"]),
+    help="Dataset to export; repeatable (default: all).",
+)
+@click.option("--full", is_flag=True, help="Drop earlier exports of the datasets and export everything again.")
+def export_parquet_command(out_dir, datasets, full: bool) -> None:
+    """Export normalized transactions and prices to partitioned Parquet, incrementally."""
+    from app.services.export import DATASETS, export_parquet
+
+    summary = export_parquet(out_dir, datasets or DATASETS, full=full)
+    for name, result in summary.items():
+        click.echo(f"{name}: {result['rows']} rows in {len(result['files'])} files")
+
+
+@click.command("compact-raw")
+@click.option("--batch-id", type=int, default=None, help="Only this import batch (default: all).")
+@click.option("--expand", is_flag=True, help="Write block rows back to raw_payload instead.")
+def compact_raw_command(batch_id, expand: bool) -> None:
+    """Move raw CSV rows into compressed raw_block storage (or back)."""
+    from sqlalchemy import select
+
+    from app.db import SessionLocal
+    from app.db.models import ImportBatch
+    from app.services.ingest.rawstore import compact_batch, expand_batch
+
+    with SessionLocal() as session:
+        batch_ids = [batch_id] if batch_id is not None else session.execute(select(ImportBatch.id)).scalars().all()
+        rows = sum((expand_batch if expand else compact_batch)(session, b) for b in batch_ids)
+    click.echo(f"{'expanded' if expand else 'compacted'} {rows} raw rows")
+
+
+@click.command("storage-report")
+@click.option("--batch-id", type=int, default=None, help="Only this import batch (default: all).")
+def storage_report_command(batch_id) -> None:
+    """Bytes per raw row in JSON vs compact storage, per import batch."""
+    from app.db import SessionLocal
+    from app.services.ingest.rawstore import storage_report
+
+    with SessionLocal() as session:
+        report = storage_report(session, batch_id)
+    click.echo(f"{'batch':>8} {'source':<16} {'rows':>10} {'json B/row':>11} {'compact B/row':>14} {'ratio':>6}")
+    for entry in report:
+        ratio = entry["json_bytes"] / entry["compact_bytes"] if entry["compact_bytes"] else 0.0
+        click.echo(
+            f"{entry['batch_id']:>8} {entry['source']:<16} {entry['rows']:>10} "
+            f"{entry['json_bytes_per_row']:>11.1f} {entry['compact_bytes_per_row']:>14.1f} {ratio:>6.1f}"
+        )
+
+
+def _echo_progress(progress) -> None:
+    total = f"/{progress.rows_total}" if progress.rows_total else ""
+    click.echo(
+        f"{progress.files_done}/{progress.files_total} files  {progress.rows_processed}{total} rows  "
+        f"{progress.rows_per_sec:.0f} rows/s  {progress.elapsed:.0f}s"
+    )
+
+
+def _echo_outcomes(outcomes) -> None:
+    for outcome in outcomes:
+        detail = outcome["error"] or f"{outcome['rows_ok']} ok, {outcome['rows_error']} errors"
+        click.echo(f"batch {outcome['batch_id']} {outcome['status']}: {outcome['path']} ({detail})")
+
+
+@click.command("import-csv")
+@click.argument("paths", nargs=-1)
+@click.option("--source", required=True, help="Registered import source, e.g. token, wallet, dexscreener, bnb.")
+@click.option("--workers", type=int, default=None, help="Files imported at once (default: IMPORT_WORKERS).")
+@click.option("--watch", "watch_dir", default=None, help="Keep importing new files dropped into this directory.")
+@click.option("--poll-interval", default=5.0, show_default=True, help="Seconds between scans of --watch.")
+@click.option("--progress-interval", default=1.0, show_default=True, help="Seconds between progress lines.")
+def import_csv_command(paths, source: str, workers, watch_dir, poll_interval: float, progress_interval: float) -> None:
+    """Import CSV exports from files, directories or globs, one import batch per file.
+
+    A running web app needs no restart: its dedup index and price coverage
+    index catch up from the database, and the coverage refresh drops stale
+    cached price series.
+    """
+    from app.services.ingest import importer, jobs
+
+    try:
+        jobs.parser_spec(source)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--source")
+    if not paths and not watch_dir:
+        raise click.UsageError("give files, directories or globs to import, or --watch")
+    try:
+        files = importer.expand_paths(paths)
+    except FileNotFoundError as exc:
+        raise click.BadParameter(f"no such file: {exc}", param_hint="PATHS")
+
+    outcomes = importer.import_files(source, files, workers, _echo_progress, progress_interval)
+    _echo_outcomes(outcomes)
+    failed = sum(outcome["status"] != "completed" for outcome in outcomes)
+    if watch_dir:
+        click.echo(f"watching {watch_dir} for new {source} exports (Ctrl-C to stop)")
+        try:
+            importer.watch(watch_dir, source, workers, poll_interval, _echo_progress, _echo_outcomes)
+        except KeyboardInterrupt:
+            pass
+    if failed:
+        raise click.ClickException(f"{failed} of {len(outcomes)} files failed")
+
+
+def init_app(app: Flask) -> None:
+    app.cli.add_command(backfill_normalized_command)
+    app.cli.add_command(value_transactions_command)
+    app.cli.add_command(rollup_prices_command)
+    app.cli.add_command(prune_prices_command)
+    app.cli.add_command(export_parquet_command)
+    app.cli.add_command(compact_raw_command)
+    app.cli.add_command(storage_report_command)
+    app.cli.add_command(import_csv_command)
@@ -1,21 +1,107 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from .models import Base
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite://")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-    future=True,
-)
+# Connection pool for server databases and file-backed SQLite.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+# How long a SQLite connection waits on a locked database, in milliseconds.
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+
+
+def _is_memory_sqlite(url) -> bool:
+    database = url.database or ""
+    return database in ("", ":memory:") or url.query.get("mode") == "memory"
+
+
+def _one_thread_at_a_time(engine: Engine) -> None:
+    """Lend the single in-memory connection to one thread at a time.
+
+    Sessions on different threads would otherwise share its transaction, and
+    a request's teardown rollback would undo an import worker's open chunk.
+    The lock is taken on every checkout and given back when that checkout is
+    returned (the pool's ``reset`` event), so nested sessions on one thread
+    still work.
+    """
+    lock = threading.RLock()
+    event.listen(engine, "checkout", lambda *args: lock.acquire())
+    event.listen(engine, "reset", lambda *args: lock.release())
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
+def make_engine(database_url: str) -> Engine:
+    """Build an engine with a pool suited to the database behind ``database_url``.
+
+    - in-memory SQLite: one shared connection (``StaticPool``), otherwise
+      every connection would see its own empty database; threads take turns;
+    - file-backed SQLite: a connection pool, WAL journal and tuned pragmas
+      so readers do not block on the single writer;
+    - anything else: a ``QueuePool`` sized by the ``DB_POOL_*`` settings.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        if _is_memory_sqlite(url):
+            engine = create_engine(
+                database_url,
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+                future=True,
+            )
+            _one_thread_at_a_time(engine)
+            return engine
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            future=True,
+        )
+        event.listen(engine, "connect", _sqlite_pragmas)
+        return engine
+    return create_engine(
+        database_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        future=True,
+    )
+
+
+engine = make_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Request-scoped session for Flask views; removed by ``init_app``'s teardown.
+db_session = scoped_session(SessionLocal)
+
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
+
+
+def init_app(app) -> None:
+    @app.teardown_appcontext
+    def remove_session(exc=None):
+        db_session.remove()
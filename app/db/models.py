@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import cached_property
 from decimal import Decimal
 from typing import List
 
@@ -9,7 +10,9 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
     Text,
@@ -29,9 +32,18 @@ class ImportBatch(Base):
     file_name = Column(String, nullable=True)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    status = Column(String, nullable=True)
+    rows_total = Column(Integer, nullable=True)
+    rows_processed = Column(Integer, default=0)
     rows_ok = Column(Integer, default=0)
     rows_error = Column(Integer, default=0)
     warnings = Column(JSON, default=list)
+    # Per-stage seconds/calls and row counters (see ``app.metrics.StageStats``).
+    stats = Column(JSON, nullable=True)
+    # Last committed position: ``{"file", "row", "offset"}`` (see ``ingest.checkpoint``).
+    checkpoint = Column(JSON, nullable=True)
+    # Stamped on every committed chunk; a "running" batch without one for a while is abandoned.
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
     notes = Column(Text)
 
     transactions = relationship("TransactionRaw", back_populates="batch")
@@ -44,11 +56,73 @@ class TransactionRaw(Base):
     import_batch_id = Column(Integer, ForeignKey("import_batch.id"), nullable=False)
     source = Column(String, nullable=False)
     row_hash = Column(String, unique=True, nullable=False)
-    raw_payload = Column(JSON, nullable=False)
+    # NULL when the row is stored in ``block`` (``RAW_STORAGE=compact``).
+    raw_payload = Column(JSON, nullable=True)
     error = Column(Text)
     provenance = Column(JSON, nullable=False)
+    raw_block_id = Column(Integer, ForeignKey("raw_block.id"), nullable=True)
+    block_row = Column(Integer, nullable=True)
 
     batch = relationship("ImportBatch", back_populates="transactions")
+    normalized = relationship("TransactionNormalized", back_populates="raw", uselist=False)
+    block = relationship("RawBlock")
+
+    @property
+    def payload(self) -> dict:
+        """The CSV row, from ``raw_payload`` or decoded from its block on first access."""
+        if self.raw_payload is not None or self.block is None:
+            return self.raw_payload
+        return self.block.rows[self.block_row]
+
+
+class RawBlock(Base):
+    """Raw CSV rows of one written chunk, compressed and dictionary-encoded per column."""
+
+    __tablename__ = "raw_block"
+
+    id = Column(Integer, primary_key=True)
+    import_batch_id = Column(Integer, ForeignKey("import_batch.id"), nullable=False, index=True)
+    row_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+    @cached_property
+    def rows(self) -> List[dict]:
+        from app.services.ingest.rawstore import decode_rows
+
+        return decode_rows(self.data)
+
+
+class TransactionNormalized(Base):
+    """Typed, indexed copy of the normalized ``Transaction`` for each raw row."""
+
+    __tablename__ = "transaction_normalized"
+    __table_args__ = (
+        Index("ix_txn_norm_tx_hash", "tx_hash"),
+        Index("ix_txn_norm_datetime_utc", "datetime_utc"),
+        Index("ix_txn_norm_base_asset_datetime", "base_asset", "datetime_utc"),
+        Index("ix_txn_norm_account_datetime", "account", "datetime_utc"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    row_hash = Column(String, ForeignKey("transaction_raw.row_hash"), unique=True, nullable=False)
+    import_batch_id = Column(Integer, ForeignKey("import_batch.id"), nullable=False, index=True)
+    tx_id = Column(String)
+    tx_hash = Column(String, nullable=False)
+    datetime_utc = Column(DateTime(timezone=True), nullable=False)
+    platform = Column(String)
+    account = Column(String)
+    chain = Column(String)
+    type = Column(String, nullable=False)
+    base_asset = Column(String)
+    base_qty = Column(Numeric(38, 18))
+    quote_asset = Column(String)
+    quote_qty = Column(Numeric(38, 18))
+    fee_asset = Column(String)
+    fee_qty = Column(Numeric(38, 18))
+    price_quote = Column(Numeric(38, 18))
+    note = Column(Text)
+
+    raw = relationship("TransactionRaw", back_populates="normalized")
 
 
 class PricePoint(Base):
@@ -63,3 +137,90 @@ class PricePoint(Base):
     quote = Column(String, nullable=False, default="USD")
     price = Column(Numeric(38, 18), nullable=False)
     source = Column(String, nullable=False)
+
+
+class TransactionValuation(Base):
+    """USD value of a normalized transaction's base leg, kept so reports are incremental."""
+
+    __tablename__ = "transaction_valuation"
+    __table_args__ = (
+        Index("ix_txn_val_asset_datetime", "asset", "datetime_utc"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    row_hash = Column(String, ForeignKey("transaction_normalized.row_hash"), unique=True, nullable=False)
+    import_batch_id = Column(Integer, ForeignKey("import_batch.id"), nullable=False, index=True)
+    datetime_utc = Column(DateTime(timezone=True), nullable=False)
+    asset = Column(String, nullable=False)
+    qty = Column(Numeric(38, 18), nullable=False)
+    price_usd = Column(Numeric(38, 18))
+    value_usd = Column(Numeric(38, 18))
+    valued_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class CostBasisCheckpoint(Base):
+    """Open lots for one asset after replaying transactions up to ``(datetime_utc, row_id)``."""
+
+    __tablename__ = "cost_basis_checkpoint"
+    __table_args__ = (
+        UniqueConstraint("method", "asset", "datetime_utc", "row_id", name="uix_cost_basis_checkpoint"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    method = Column(String, nullable=False)
+    asset = Column(String, nullable=False)
+    datetime_utc = Column(DateTime(timezone=True), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    # Highest transaction_normalized.id known when the checkpoint was written.
+    high_water_id = Column(Integer, nullable=False)
+    # Highest transaction_valuation.id of the asset then: revaluations get new ids.
+    valuation_high_water_id = Column(Integer, nullable=False, server_default="0")
+    lots = Column(JSON, nullable=False)
+    realized_usd = Column(Numeric(38, 18), nullable=False)
+
+
+class RealizedGain(Base):
+    """Gain on one disposal, matched against lots by ``method``."""
+
+    __tablename__ = "realized_gain"
+    __table_args__ = (
+        UniqueConstraint("method", "row_hash", name="uix_realized_gain"),
+        Index("ix_realized_gain_method_asset_datetime", "method", "asset", "datetime_utc"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    method = Column(String, nullable=False)
+    asset = Column(String, nullable=False)
+    row_hash = Column(String, ForeignKey("transaction_normalized.row_hash"), nullable=False)
+    row_id = Column(Integer, nullable=False)
+    datetime_utc = Column(DateTime(timezone=True), nullable=False)
+    qty = Column(Numeric(38, 18), nullable=False)
+    proceeds_usd = Column(Numeric(38, 18), nullable=False)
+    cost_usd = Column(Numeric(38, 18), nullable=False)
+    gain_usd = Column(Numeric(38, 18), nullable=False)
+
+
+class PriceRollup(Base):
+    """OHLC summary of ``price_point`` ticks per asset/quote and time bucket.
+
+    ``first_dt``/``last_dt`` are the times of the opening and closing ticks,
+    so buckets built from separate imports can be merged.
+    """
+
+    __tablename__ = "price_rollup"
+    __table_args__ = (
+        UniqueConstraint("resolution", "asset", "quote", "bucket_start", name="uix_price_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    resolution = Column(String, nullable=False)
+    asset = Column(String, nullable=False)
+    quote = Column(String, nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    open = Column(Numeric(38, 18), nullable=False)
+    high = Column(Numeric(38, 18), nullable=False)
+    low = Column(Numeric(38, 18), nullable=False)
+    close = Column(Numeric(38, 18), nullable=False)
+    first_dt = Column(DateTime(timezone=True), nullable=False)
+    last_dt = Column(DateTime(timezone=True), nullable=False)
+    ticks = Column(Integer, nullable=False)
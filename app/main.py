@@ -1,13 +1,22 @@
 from flask import Flask
 
 from .routes.api import bp as api_bp
+from .routes.data import bp as data_bp
+from .routes.metrics import bp as metrics_bp
 from .routes.ui import bp as ui_bp
-from .db import init_db
+from . import cli
+from .db import init_app, init_db
+from .services.ingest.dedup import dedup_index
 
 
 def create_app() -> Flask:
     init_db()
+    dedup_index.warm()
     app = Flask(__name__)
+    init_app(app)
+    cli.init_app(app)
     app.register_blueprint(api_bp)
+    app.register_blueprint(data_bp)
+    app.register_blueprint(metrics_bp)
     app.register_blueprint(ui_bp)
     return app
@@ -0,0 +1,203 @@
+"""Per-import stage timings and a process-wide, Prometheus-format metrics registry."""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+# Histogram bucket upper bounds in seconds.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+T = TypeVar("T")
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value: float) -> str:
+    """Sample value in full precision; whole numbers (e.g. counters) without a fraction."""
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+    """Counters, gauges and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[Labels, float]] = defaultdict(dict)
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[name][tuple(sorted(labels.items()))] = value
+
+    def replace(self, name: str, series: Iterable[Tuple[Dict[str, str], float]]) -> None:
+        """Set a gauge to exactly ``series`` of ``(labels, value)``, dropping label sets not in it."""
+        values = {tuple(sorted(labels.items())): value for labels, value in series}
+        with self._lock:
+            self._values[name] = values
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms[name]
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted({*self._values, *self._histograms}):
+                kind, help_text = self._meta.get(name, ("untyped", ""))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                for labels, hist in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip((*BUCKETS, float("inf")), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_labels((*labels, ('le', le)))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(hist.sum)}")
+                    lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+
+registry = Registry()
+registry.describe("gcc_import_stage_seconds", "histogram", "Seconds spent per import in each ingest stage.")
+registry.describe("gcc_import_rows_total", "counter", "Rows seen by importers, by outcome.")
+registry.describe("gcc_imports_total", "counter", "Finished imports.")
+registry.describe("gcc_price_lookup_seconds", "histogram", "Seconds per PriceService.get_usd_many call.")
+registry.describe("gcc_price_series_load_seconds", "histogram", "Seconds per price series read from the database.")
+registry.describe("gcc_price_lookups_total", "counter", "Timestamps priced by PriceService, by source.")
+
+
+class StageStats:
+    """Seconds and call counts per ingest stage plus row counters for one import.
+
+    Hot loops accumulate into locals and call :meth:`add` once per chunk or
+    per row; chunk-level work uses :meth:`time`.
+    """
+
+    __slots__ = ("seconds", "calls", "counters")
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def add(self, stage: str, seconds: float, calls: int = 1) -> None:
+        self.seconds[stage] += seconds
+        self.calls[stage] += calls
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def merge(self, summary: Dict) -> None:
+        """Fold in another :meth:`summary`, e.g. from a worker process."""
+        for stage, entry in summary.get("stages", {}).items():
+            self.add(stage, entry["seconds"], entry["calls"])
+        for name, n in summary.get("counters", {}).items():
+            self.count(name, n)
+
+    def summary(self) -> Dict:
+        return {
+            "stages": {
+                stage: {"seconds": round(self.seconds[stage], 6), "calls": self.calls[stage]}
+                for stage in sorted(self.seconds)
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def publish(self, source: str) -> None:
+        """Add this import's totals to the process-wide ``registry``."""
+        for stage, seconds in self.seconds.items():
+            registry.observe("gcc_import_stage_seconds", seconds, source=source, stage=stage)
+        for name, n in self.counters.items():
+            registry.inc("gcc_import_rows_total", n, source=source, outcome=name)
+        registry.inc("gcc_imports_total", source=source)
+
+
+def timed_iter(items: Iterable[T], stats: StageStats, stage: str = "read") -> Iterator[T]:
+    """Yield from ``items``, charging the time spent producing each one to ``stage``.
+
+    Wrap a ``csv`` reader to measure decoding and CSV parsing separately
+    from the per-row work done by the caller.
+    """
+    clock = time.perf_counter
+    it = iter(items)
+    total = 0.0
+    n = 0
+    try:
+        while True:
+            start = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                total += clock() - start
+                return
+            total += clock() - start
+            n += 1
+            yield item
+    finally:
+        stats.add(stage, total, n)
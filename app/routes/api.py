@@ -1,56 +1,92 @@
 from __future__ import annotations
 
-import json
 import logging
-from datetime import datetime
-from typing import List
+from datetime import datetime, timezone
 
 from flask import Blueprint, abort, jsonify, request
+from werkzeug.datastructures import FileStorage
 
-from app.db import SessionLocal
+from app.db import db_session
 from app.db.models import ImportBatch
-from app.services.ingest import dexscreener_csv, token_tx_csv, wallet_tx_csv
+from app.services.ingest import jobs, registry
+from app.services.ingest.dedup import dedup_index
+from app.services.prices import refresh_bnb_usd
 
 bp = Blueprint("api", __name__)
 
 
 @bp.route("/api/import/csv", methods=["POST"])
 def import_csv():
-    source = request.args.get("source")
-    if not source:
+    spec = registry.REGISTRY.get(request.args.get("source") or "")
+    if spec is None:
         abort(400)
 
-    files = request.files.getlist("file") or request.files.getlist("files")
+    chunked = "chunked" in request.headers.get("Transfer-Encoding", "").lower()
+    if request.mimetype == "multipart/form-data":
+        files = request.files.getlist("file") or request.files.getlist("files")
+    elif request.content_length or chunked:
+        # Raw body upload (e.g. ``curl --data-binary @export.csv.gz``, or
+        # ``-T -`` for a chunked one): spooled straight from the socket
+        # without form parsing.
+        if chunked and "wsgi.input_terminated" not in request.environ:
+            abort(411, "this server cannot read chunked uploads; send a Content-Length")
+        files = [FileStorage(stream=request.stream, filename=request.args.get("filename") or "upload.csv")]
+    else:
+        files = []
     if not files:
         abort(400)
 
-    session = SessionLocal()
-    batch = ImportBatch(source=f"{source.upper()}_CSV", file_name=",".join(f.filename or getattr(f, "name", "") for f in files), started_at=datetime.utcnow())
-    session.add(batch)
-    session.commit()
-
-    if source == "token":
-        result = token_tx_csv.parse(files[0], batch.id)
-    elif source == "wallet":
-        result = wallet_tx_csv.parse(files, batch.id)
-    elif source == "dexscreener":
-        result = dexscreener_csv.parse(files[0], batch.id)
-    else:
-        abort(400)
+    batch = ImportBatch(
+        source=spec.batch_source,
+        file_name=",".join(f.filename or getattr(f, "name", "") for f in files),
+        started_at=datetime.now(timezone.utc),
+        status="queued",
+    )
+    db_session.add(batch)
+    db_session.commit()
+    batch_id = batch.id
+
+    try:
+        paths = jobs.spool(files, batch_id)
+    except ValueError as exc:
+        batch.status = "failed"
+        batch.completed_at = datetime.now(timezone.utc)
+        batch.notes = str(exc)
+        db_session.commit()
+        return jsonify({"batch_id": batch_id, "status": "failed", "error": str(exc)}), 400
+    jobs.enqueue(batch_id, spec.name, paths)
+    return jsonify({"batch_id": batch_id, "status": "queued"}), 202
+
+
+@bp.route("/api/import/<int:batch_id>", methods=["GET"])
+def import_status(batch_id: int):
+    batch = db_session.get(ImportBatch, batch_id)
+    if batch is None:
+        abort(404)
+    return jsonify(jobs.progress(batch))
+
+
+@bp.route("/api/import/<int:batch_id>/resume", methods=["POST"])
+def import_resume(batch_id: int):
+    try:
+        jobs.resume(batch_id)
+    except LookupError:
+        abort(404)
+    except ValueError:
+        abort(409)
+    return jsonify({"batch_id": batch_id, "status": "queued"}), 202
+
+
+@bp.route("/api/import/dedup", methods=["GET"])
+def dedup_stats():
+    return jsonify(dedup_index.stats())
+
 
-    batch.completed_at = datetime.utcnow()
-    batch.rows_ok = result["rows_ok"]
-    batch.rows_error = result["rows_error"]
-    batch.warnings = result["warnings"]
-    session.commit()
-    session.close()
-
-    logging.info(json.dumps({
-        "batch_id": batch.id,
-        "source": source,
-        "rows_ok": batch.rows_ok,
-        "rows_error": batch.rows_error,
-        "warnings": batch.warnings,
-    }))
-
-    return jsonify({"batch_id": batch.id, **result})
+@bp.route("/api/prices/bnb/refresh", methods=["POST"])
+def refresh_bnb():
+    try:
+        point = refresh_bnb_usd()
+    except Exception as exc:  # any provider failure: missing config, network, bad payload
+        logging.exception("BNB/USD refresh failed")
+        abort(503, f"BNB/USD provider unavailable: {exc}")
+    return jsonify({"dt_utc": point.dt_utc.isoformat(), "price": str(point.price), "source": point.source})
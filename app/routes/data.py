@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Iterator, List, Optional
+
+from dateutil import parser as dtparser
+from flask import Blueprint, Response, abort, jsonify, request, stream_with_context
+from sqlalchemy import select
+
+from app.db import SessionLocal
+from app.db.models import ImportBatch, PricePoint, TransactionNormalized, TransactionRaw
+from app.services.costbasis import METHODS, compute_cost_basis, positions
+from app.services.export import DATASETS, export_parquet
+from app.services.ingest.rawstore import attach_payloads
+from app.services.normalize import COLUMN_FIELDS
+from app.services.prices.coverage import coverage_index
+from app.services.prices.series import as_utc
+from app.services.valuation import asset_totals, value_transactions
+
+bp = Blueprint("data", __name__)
+
+# Rows fetched per keyset query while streaming.
+PAGE_SIZE = 1000
+DEFAULT_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def _arg_int(name: str) -> Optional[int]:
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, f"{name} must be an integer")
+
+
+def _arg_datetime(name: str) -> Optional[datetime]:
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return as_utc(dtparser.parse(value))
+    except (ValueError, OverflowError):
+        abort(400, f"{name} must be a timestamp")
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return as_utc(value).isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _pages(build: Callable, after: int, limit: Optional[int], fill: Optional[Callable] = None) -> Iterator[dict]:
+    """Yield rows of ``build(after_id, page_size)`` page by page, keyed on ``id``.
+
+    ``fill(session, rows)`` may complete each page in place before it is yielded.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = PAGE_SIZE if remaining is None else min(PAGE_SIZE, remaining)
+        with SessionLocal() as session:
+            rows = [dict(r._mapping) for r in session.execute(build(after, size))]
+            if fill is not None:
+                fill(session, rows)
+        if not rows:
+            return
+        for row in rows:
+            yield row
+        after = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < size:
+            return
+
+
+def _flatten(row: dict) -> dict:
+    return {k: json.dumps(v) if isinstance(v, (dict, list)) else _jsonable(v) for k, v in row.items()}
+
+
+def _respond(build: Callable, columns: List[str], fill: Optional[Callable] = None):
+    fmt = request.args.get("format", "json")
+    after = _arg_int("after") or 0
+    limit = _arg_int("limit")
+
+    if fmt == "json":
+        limit = min(limit or DEFAULT_LIMIT, MAX_PAGE_LIMIT)
+        rows = list(_pages(build, after, limit, fill))
+        next_cursor = rows[-1]["id"] if len(rows) == limit else None
+        return jsonify({
+            "items": [{k: _jsonable(v) for k, v in row.items()} for row in rows],
+            "next_cursor": next_cursor,
+        })
+
+    if fmt == "ndjson":
+        def generate():
+            for row in _pages(build, after, limit, fill):
+                yield json.dumps(row, default=_jsonable) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if fmt == "csv":
+        def generate():
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for row in _pages(build, after, limit, fill):
+                writer.writerow(_flatten(row))
+                if buf.tell() > 64 * 1024:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            yield buf.getvalue()
+
+        return Response(stream_with_context(generate()), mimetype="text/csv")
+
+    abort(400, "format must be json, ndjson or csv")
+
+
+TRANSACTION_COLUMNS = [
+    TransactionRaw.id,
+    TransactionRaw.import_batch_id,
+    TransactionRaw.source,
+    TransactionRaw.row_hash,
+    *(getattr(TransactionNormalized, name) for name in COLUMN_FIELDS),
+    TransactionRaw.raw_payload,
+    TransactionRaw.provenance,
+]
+# Selected to decode rows stored in raw blocks; dropped again by ``attach_payloads``.
+BLOCK_COLUMNS = [TransactionRaw.raw_block_id, TransactionRaw.block_row]
+
+
+@bp.route("/api/transactions", methods=["GET"])
+def list_transactions():
+    batch_id = _arg_int("batch_id")
+    source = request.args.get("source")
+    start = _arg_datetime("start")
+    end = _arg_datetime("end")
+
+    def build(after: int, size: int):
+        query = (
+            select(*TRANSACTION_COLUMNS, *BLOCK_COLUMNS)
+            .outerjoin(TransactionNormalized, TransactionNormalized.row_hash == TransactionRaw.row_hash)
+            .where(TransactionRaw.id > after)
+        )
+        if batch_id is not None:
+            query = query.where(TransactionRaw.import_batch_id == batch_id)
+        if source:
+            query = query.where(TransactionRaw.source == source)
+        if start is not None:
+            query = query.where(TransactionNormalized.datetime_utc >= start)
+        if end is not None:
+            query = query.where(TransactionNormalized.datetime_utc < end)
+        return query.order_by(TransactionRaw.id).limit(size)
+
+    return _respond(build, [c.key for c in TRANSACTION_COLUMNS], attach_payloads)
+
+
+BATCH_COLUMNS = [c for c in ImportBatch.__table__.columns]
+
+
+@bp.route("/api/batches", methods=["GET"])
+def list_batches():
+    source = request.args.get("source")
+    start = _arg_datetime("start")
+    end = _arg_datetime("end")
+
+    def build(after: int, size: int):
+        query = select(*BATCH_COLUMNS).where(ImportBatch.id > after)
+        if source:
+            query = query.where(ImportBatch.source == source)
+        if start is not None:
+            query = query.where(ImportBatch.started_at >= start)
+        if end is not None:
+            query = query.where(ImportBatch.started_at < end)
+        return query.order_by(ImportBatch.id).limit(size)
+
+    return _respond(build, [c.key for c in BATCH_COLUMNS])
+
+
+PRICE_COLUMNS = [c for c in PricePoint.__table__.columns]
+
+
+@bp.route("/api/prices", methods=["GET"])
+def list_prices():
+    asset = request.args.get("asset")
+    quote = request.args.get("quote")
+    source = request.args.get("source")
+    start = _arg_datetime("start")
+    end = _arg_datetime("end")
+
+    def build(after: int, size: int):
+        query = select(*PRICE_COLUMNS).where(PricePoint.id > after)
+        if asset:
+            query = query.where(PricePoint.asset == asset)
+        if quote:
+            query = query.where(PricePoint.quote == quote)
+        if source:
+            query = query.where(PricePoint.source == source)
+        if start is not None:
+            query = query.where(PricePoint.dt_utc >= start)
+        if end is not None:
+            query = query.where(PricePoint.dt_utc < end)
+        return query.order_by(PricePoint.id).limit(size)
+
+    return _respond(build, [c.key for c in PRICE_COLUMNS])
+
+
+@bp.route("/api/prices/gaps", methods=["GET"])
+def price_gaps():
+    """Time ranges where price lookups will miss and data needs backfilling."""
+    min_seconds = _arg_int("min_seconds") or 0
+    gaps = coverage_index.gaps(
+        request.args.get("asset"),
+        request.args.get("quote"),
+        _arg_datetime("start"),
+        _arg_datetime("end"),
+    )
+    return jsonify({
+        "window_seconds": coverage_index.window.total_seconds(),
+        "gaps": [{k: _jsonable(v) for k, v in g.items()} for g in gaps if g["seconds"] >= min_seconds],
+    })
+
+
+def _valuation_body(batch_id: Optional[int], start: Optional[datetime], end: Optional[datetime]) -> dict:
+    with SessionLocal() as session:
+        assets = asset_totals(session, batch_id, start, end)
+    total = sum((a["value_usd"] or Decimal(0) for a in assets), Decimal(0))
+    return {
+        "assets": [{k: _jsonable(v) for k, v in a.items()} for a in assets],
+        "total_usd": str(total),
+    }
+
+
+@bp.route("/api/valuation", methods=["GET"])
+def valuation():
+    """Per-asset USD totals over stored valuations; see ``POST /api/valuation`` to update them."""
+    return jsonify(_valuation_body(_arg_int("batch_id"), _arg_datetime("start"), _arg_datetime("end")))
+
+
+@bp.route("/api/valuation", methods=["POST"])
+def update_valuation():
+    """Value not-yet-valued (and unpriced) transactions, then return the totals."""
+    batch_id = _arg_int("batch_id")
+    start = _arg_datetime("start")
+    end = _arg_datetime("end")
+    refresh = request.args.get("refresh") in ("1", "true")
+
+    valued = value_transactions(batch_id, start, end, refresh=refresh)
+    return jsonify({"valued": valued, **_valuation_body(batch_id, start, end)})
+
+
+def _cost_basis_method() -> str:
+    method = request.args.get("method", "fifo").lower()
+    if method not in METHODS:
+        abort(400, f"method must be one of {', '.join(METHODS)}")
+    return method
+
+
+def _cost_basis_body(method: str, asset: Optional[str]) -> dict:
+    with SessionLocal() as session:
+        assets = positions(session, method, asset)
+    return {
+        "method": method,
+        "assets": [{k: _jsonable(v) for k, v in a.items()} for a in assets],
+    }
+
+
+@bp.route("/api/costbasis", methods=["GET"])
+def cost_basis():
+    """Open lots and realized gains per asset as last computed; see ``POST /api/costbasis`` to update them."""
+    return jsonify(_cost_basis_body(_cost_basis_method(), request.args.get("asset")))
+
+
+@bp.route("/api/costbasis", methods=["POST"])
+def update_cost_basis():
+    """Replay new or revalued transactions into the lots, then return the positions."""
+    method = _cost_basis_method()
+    asset = request.args.get("asset")
+
+    replayed = compute_cost_basis(method, asset)
+    return jsonify({"replayed": sum(replayed.values()), **_cost_basis_body(method, asset)})
+
+
+@bp.route("/api/export/parquet", methods=["POST"])
+def export_to_parquet():
+    """Write transactions/prices added since the last export to partitioned Parquet under ``EXPORT_DIR``."""
+    datasets = request.args.getlist("dataset") or list(DATASETS)
+    if set(datasets) - set(DATASETS):
+        abort(400, f"dataset must be one of {', '.join(DATASETS)}")
+    full = request.args.get("full") in ("1", "true")
+    try:
+        summary = export_parquet(datasets=datasets, full=full)
+    except RuntimeError as exc:
+        abort(501, str(exc))
+    return jsonify(summary)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from flask import Blueprint, Response
+from sqlalchemy import func, select
+
+from app.db import db_session
+from app.db.models import ImportBatch
+from app.metrics import registry
+from app.services.ingest.dedup import dedup_index
+from app.services.prices import series_cache
+
+bp = Blueprint("metrics", __name__)
+
+# Always exported, at 0 when no batch has the status.
+BATCH_STATUSES = ("queued", "running", "completed", "failed")
+
+registry.describe("gcc_import_batches", "gauge", "Import batches by status.")
+registry.describe("gcc_price_series_cache", "gauge", "Price series cache counters.")
+registry.describe("gcc_dedup_index", "gauge", "Row-hash dedup index counters.")
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text exposition of the process-wide registry plus point-in-time gauges."""
+    rows = db_session.execute(select(ImportBatch.status, func.count()).group_by(ImportBatch.status))
+    counts = dict.fromkeys(BATCH_STATUSES, 0)
+    for status, count in rows:
+        counts[status or "unknown"] = count
+    registry.replace("gcc_import_batches", (({"status": s}, n) for s, n in counts.items()))
+    for key, value in series_cache.stats().items():
+        registry.set("gcc_price_series_cache", value, stat=key)
+    for key, value in dedup_index.stats().items():
+        registry.set("gcc_dedup_index", value, stat=key)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
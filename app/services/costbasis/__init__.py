@@ -0,0 +1,3 @@
+from .engine import METHODS, Lots, compute_cost_basis, positions
+
+__all__ = ["METHODS", "Lots", "compute_cost_basis", "positions"]
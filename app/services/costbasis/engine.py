@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import os
+from collections import deque
+from decimal import Decimal
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.db.models import CostBasisCheckpoint, RealizedGain, TransactionNormalized, TransactionValuation
+from app.services.ingest.bulk import CHUNK_SIZE
+
+METHODS = ("fifo", "lifo", "average")
+
+# Transaction types that reduce holdings; negative quantities do too.
+DISPOSAL_TYPES = frozenset({"SELL", "SEND", "SPEND", "WITHDRAW", "WITHDRAWAL", "TRANSFER_OUT"})
+USD_QUOTES = frozenset({"USD", "USDT", "USDC", "BUSD"})
+
+# Transactions replayed between stored checkpoints of an asset's lots.
+CHECKPOINT_EVERY = int(os.environ.get("COST_BASIS_CHECKPOINT_EVERY", "10000"))
+
+ZERO = Decimal(0)
+
+
+class Lots:
+    """Open lots of one asset as ``[qty, unit_cost]`` pairs.
+
+    FIFO consumes from the left, LIFO from the right; average cost keeps a
+    single pooled lot.
+    """
+
+    __slots__ = ("method", "lots")
+
+    def __init__(self, method: str, lots=()):
+        if method not in METHODS:
+            raise ValueError(f"unknown cost basis method {method!r}")
+        self.method = method
+        self.lots: Deque[List[Decimal]] = deque([Decimal(q), Decimal(c)] for q, c in lots)
+
+    def acquire(self, qty: Decimal, unit_cost: Decimal) -> None:
+        if not qty:
+            # Zero-value transfers (spam, airdrop probes) add no lot; an
+            # empty pooled lot would divide 0 by 0 on the next acquire.
+            return
+        if self.method == "average" and self.lots:
+            held, cost = self.lots[0]
+            total = held + qty
+            self.lots[0] = [total, (held * cost + qty * unit_cost) / total]
+        else:
+            self.lots.append([qty, unit_cost])
+
+    def dispose(self, qty: Decimal) -> Decimal:
+        """Remove ``qty`` from the lots and return its cost.
+
+        Quantity beyond what is held (e.g. transfers in that were never
+        imported) has a cost of zero.
+        """
+        lots = self.lots
+        from_right = self.method == "lifo"
+        cost = ZERO
+        while qty > 0 and lots:
+            lot = lots[-1] if from_right else lots[0]
+            used = min(qty, lot[0])
+            cost += used * lot[1]
+            qty -= used
+            lot[0] -= used
+            if lot[0] <= 0:
+                lots.pop() if from_right else lots.popleft()
+        return cost
+
+    @property
+    def quantity(self) -> Decimal:
+        return sum((q for q, _ in self.lots), ZERO)
+
+    @property
+    def cost(self) -> Decimal:
+        return sum((q * c for q, c in self.lots), ZERO)
+
+    def dump(self) -> List[List[str]]:
+        return [[str(q), str(c)] for q, c in self.lots]
+
+
+def _after(dt_col, id_col, dt, row_id):
+    return or_(dt_col > dt, and_(dt_col == dt, id_col > row_id))
+
+
+def _before(dt_col, id_col, dt, row_id):
+    return or_(dt_col < dt, and_(dt_col == dt, id_col < row_id))
+
+
+def _unit_price(row) -> Decimal:
+    if row.quote_asset and row.quote_asset.upper() in USD_QUOTES and row.price_quote is not None:
+        return Decimal(row.price_quote)
+    if row.price_usd is not None:
+        return Decimal(row.price_usd)
+    return ZERO
+
+
+def _replay(session: Session, method: str, asset: str, checkpoint_every: int) -> int:
+    high_water = session.scalar(
+        select(func.max(TransactionNormalized.id)).where(TransactionNormalized.base_asset == asset)
+    ) or 0
+    valuation_high_water = session.scalar(
+        select(func.max(TransactionValuation.id)).where(TransactionValuation.asset == asset)
+    ) or 0
+    scope = (CostBasisCheckpoint.method == method, CostBasisCheckpoint.asset == asset)
+    latest = session.scalars(
+        select(CostBasisCheckpoint).where(*scope)
+        .order_by(CostBasisCheckpoint.datetime_utc.desc(), CostBasisCheckpoint.row_id.desc()).limit(1)
+    ).first()
+    earliest = (
+        select(TransactionNormalized.datetime_utc, TransactionNormalized.id)
+        .where(TransactionNormalized.base_asset == asset, TransactionNormalized.base_qty.is_not(None))
+        .order_by(TransactionNormalized.datetime_utc, TransactionNormalized.id)
+        .limit(1)
+    )
+    # New transactions, and ones (re)valued since: their unit price may have changed.
+    candidates = [
+        session.execute(
+            earliest.where(TransactionNormalized.id > (latest.high_water_id if latest else 0))
+        ).first(),
+        session.execute(
+            earliest.join(TransactionValuation, TransactionValuation.row_hash == TransactionNormalized.row_hash)
+            .where(TransactionValuation.id > (latest.valuation_high_water_id if latest else 0))
+        ).first(),
+    ]
+    candidates = [tuple(c) for c in candidates if c is not None]
+    if not candidates:
+        return 0
+    changed = min(candidates)
+
+    # Resume from the last checkpoint before the earliest new transaction.
+    restore = session.scalars(
+        select(CostBasisCheckpoint).where(*scope)
+        .where(_before(CostBasisCheckpoint.datetime_utc, CostBasisCheckpoint.row_id, *changed))
+        .order_by(CostBasisCheckpoint.datetime_utc.desc(), CostBasisCheckpoint.row_id.desc()).limit(1)
+    ).first()
+    gains_scope = (RealizedGain.method == method, RealizedGain.asset == asset)
+    if restore is None:
+        after = None
+        lots = Lots(method)
+        realized = ZERO
+        session.execute(delete(CostBasisCheckpoint).where(*scope))
+        session.execute(delete(RealizedGain).where(*gains_scope))
+    else:
+        after = (restore.datetime_utc, restore.row_id)
+        lots = Lots(method, restore.lots)
+        realized = Decimal(restore.realized_usd)
+        session.execute(delete(CostBasisCheckpoint).where(
+            *scope, _after(CostBasisCheckpoint.datetime_utc, CostBasisCheckpoint.row_id, *after)
+        ))
+        session.execute(delete(RealizedGain).where(
+            *gains_scope, _after(RealizedGain.datetime_utc, RealizedGain.row_id, *after)
+        ))
+
+    def checkpoint(row) -> Dict:
+        return {
+            "method": method,
+            "asset": asset,
+            "datetime_utc": row.datetime_utc,
+            "row_id": row.id,
+            "high_water_id": high_water,
+            "valuation_high_water_id": valuation_high_water,
+            "lots": lots.dump(),
+            "realized_usd": realized,
+        }
+
+    replayed = 0
+    row = None
+    while True:
+        query = (
+            select(
+                TransactionNormalized.id,
+                TransactionNormalized.row_hash,
+                TransactionNormalized.datetime_utc,
+                TransactionNormalized.type,
+                TransactionNormalized.base_qty,
+                TransactionNormalized.quote_asset,
+                TransactionNormalized.price_quote,
+                TransactionValuation.price_usd,
+            )
+            .outerjoin(TransactionValuation, TransactionValuation.row_hash == TransactionNormalized.row_hash)
+            .where(TransactionNormalized.base_asset == asset, TransactionNormalized.base_qty.is_not(None))
+        )
+        if after is not None:
+            query = query.where(_after(TransactionNormalized.datetime_utc, TransactionNormalized.id, *after))
+        rows = session.execute(
+            query.order_by(TransactionNormalized.datetime_utc, TransactionNormalized.id).limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        gains = []
+        checkpoints = []
+        for row in rows:
+            qty = Decimal(row.base_qty)
+            price = _unit_price(row)
+            if qty < 0 or row.type.upper() in DISPOSAL_TYPES:
+                qty = abs(qty)
+                cost = lots.dispose(qty)
+                proceeds = qty * price
+                realized += proceeds - cost
+                gains.append({
+                    "method": method,
+                    "asset": asset,
+                    "row_hash": row.row_hash,
+                    "row_id": row.id,
+                    "datetime_utc": row.datetime_utc,
+                    "qty": qty,
+                    "proceeds_usd": proceeds,
+                    "cost_usd": cost,
+                    "gain_usd": proceeds - cost,
+                })
+            else:
+                lots.acquire(qty, price)
+            replayed += 1
+            if replayed % checkpoint_every == 0:
+                checkpoints.append(checkpoint(row))
+        if gains:
+            session.execute(insert(RealizedGain), gains)
+        if checkpoints:
+            session.execute(insert(CostBasisCheckpoint), checkpoints)
+        session.commit()
+        after = (rows[-1].datetime_utc, rows[-1].id)
+
+    if replayed % checkpoint_every:
+        session.execute(insert(CostBasisCheckpoint), [checkpoint(row)])
+    session.commit()
+    return replayed
+
+
+def compute_cost_basis(
+    method: str = "fifo",
+    asset: Optional[str] = None,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+) -> Dict[str, int]:
+    """Bring lots and realized gains for ``method`` up to date.
+
+    Transactions are replayed per asset in ``(datetime_utc, id)`` order.
+    When new rows have arrived or rows were (re)valued since the last run,
+    only the part after the last checkpoint preceding the earliest such row
+    is replayed. Unit prices
+    come from ``price_quote`` for USD-quoted rows, else the stored
+    valuation (see :func:`app.services.valuation.value_transactions`).
+    Returns the number of transactions replayed per asset.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown cost basis method {method!r}")
+    with SessionLocal() as session:
+        if asset is None:
+            assets = session.scalars(
+                select(TransactionNormalized.base_asset)
+                .where(TransactionNormalized.base_asset.is_not(None))
+                .distinct()
+            ).all()
+        else:
+            assets = [asset]
+        return {a: _replay(session, method, a, checkpoint_every) for a in assets}
+
+
+def positions(session: Session, method: str = "fifo", asset: Optional[str] = None) -> List[Dict]:
+    """Open quantity, open cost and realized USD per asset from the latest checkpoints."""
+    latest = (
+        select(
+            CostBasisCheckpoint.asset,
+            CostBasisCheckpoint.lots,
+            CostBasisCheckpoint.realized_usd,
+            func.row_number().over(
+                partition_by=CostBasisCheckpoint.asset,
+                order_by=(CostBasisCheckpoint.datetime_utc.desc(), CostBasisCheckpoint.row_id.desc()),
+            ).label("rank"),
+        )
+        .where(CostBasisCheckpoint.method == method)
+    )
+    if asset is not None:
+        latest = latest.where(CostBasisCheckpoint.asset == asset)
+    latest = latest.subquery()
+    result = []
+    for row in session.execute(select(latest).where(latest.c.rank == 1).order_by(latest.c.asset)):
+        lots = Lots(method, row.lots)
+        result.append({
+            "asset": row.asset,
+            "open_qty": lots.quantity,
+            "open_cost_usd": lots.cost,
+            "open_lots": len(lots.lots),
+            "realized_usd": Decimal(row.realized_usd),
+        })
+    return result
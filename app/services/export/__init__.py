@@ -0,0 +1,3 @@
+from .parquet import DATASETS, export_parquet, load_state
+
+__all__ = ["DATASETS", "export_parquet", "load_state"]
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.db.models import ImportBatch, PricePoint, TransactionNormalized, TransactionRaw
+from app.services.ingest.bulk import CHUNK_SIZE
+from app.services.normalize import COLUMN_FIELDS
+
+try:  # optional: only needed for exports
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pq = None
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "gcc_exports"))
+# Rows buffered per partition before a Parquet row group is written.
+ROW_GROUP_SIZE = int(os.environ.get("EXPORT_ROW_GROUP_SIZE", "65536"))
+# Price ids this far below the last exported one are checked again on the next
+# run: concurrent imports can commit a lower id after a higher one.
+ID_OVERLAP = int(os.environ.get("EXPORT_ID_OVERLAP", "1000"))
+
+DATASETS = ("transactions", "prices")
+STATE_FILE = "_export_state.json"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+_SCALE = 18
+_QUANTUM = Decimal(1).scaleb(-_SCALE)
+_NUMERIC_FIELDS = frozenset({"base_qty", "quote_qty", "fee_qty", "price_quote", "price"})
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    decimal = pa.decimal128(38, _SCALE)
+    timestamp = pa.timestamp("us", tz="UTC")
+    types = {"datetime_utc": timestamp, "dt_utc": timestamp, "id": pa.int64(), "import_batch_id": pa.int64()}
+    # Partition keys (source, asset, month) live in the directory names only.
+    transaction_fields = ("id", "import_batch_id", "row_hash", *COLUMN_FIELDS)
+    return {
+        "transactions": pa.schema([
+            (name, decimal if name in _NUMERIC_FIELDS else types.get(name, pa.string()))
+            for name in transaction_fields
+        ]),
+        "prices": pa.schema([("id", pa.int64()), ("dt_utc", timestamp), ("quote", pa.string()), ("price", decimal)]),
+    }
+
+
+def _decimal(value) -> Optional[Decimal]:
+    if value is None:
+        return None
+    value = Decimal(value)
+    return value if value.as_tuple().exponent >= -_SCALE else value.quantize(_QUANTUM)
+
+
+def partition(source: str, asset: Optional[str], dt) -> str:
+    """Hive-style ``source=/asset=/month=`` directory for a row."""
+    asset = quote(asset, safe="") if asset else NULL_PARTITION
+    return os.path.join(f"source={quote(source, safe='')}", f"asset={asset}", f"month={dt:%Y-%m}")
+
+
+class PartitionedWriter:
+    """Streams rows into one Parquet file per partition, a row group per ``row_group_size`` rows."""
+
+    def __init__(self, root: str, schema: "pa.Schema", file_name: str, row_group_size: Optional[int] = None):
+        self.root = root
+        self.schema = schema
+        self.file_name = file_name
+        self.row_group_size = row_group_size or ROW_GROUP_SIZE
+        self.rows = 0
+        self.files: List[str] = []
+        self._buffers: Dict[str, Dict[str, list]] = {}
+        self._writers: Dict[str, "pq.ParquetWriter"] = {}
+
+    def add(self, key: str, row: Dict) -> None:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = {name: [] for name in self.schema.names}
+        for name, column in buffer.items():
+            column.append(row[name])
+        if len(buffer["id"]) >= self.row_group_size:
+            self._flush(key)
+
+    def _flush(self, key: str) -> None:
+        buffer = self._buffers.pop(key, None)
+        if not buffer or not buffer["id"]:
+            return
+        writer = self._writers.get(key)
+        if writer is None:
+            directory = os.path.join(self.root, key)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, self.file_name)
+            writer = self._writers[key] = pq.ParquetWriter(path, self.schema, compression="zstd")
+            self.files.append(os.path.relpath(path, self.root))
+        writer.write_table(pa.Table.from_pydict(buffer, schema=self.schema), row_group_size=self.row_group_size)
+        self.rows += len(buffer["id"])
+
+    def close(self) -> None:
+        for key in list(self._buffers):
+            self._flush(key)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+def _empty_state() -> Dict:
+    return {"transactions": {"batches": {}}, "prices": {"last_id": 0, "recent": []}}
+
+
+def load_state(out_dir: str) -> Dict:
+    """What earlier runs exported to ``out_dir``.
+
+    Transactions: the last ``transaction_normalized.id`` written per batch id.
+    Prices: the last ``price_point.id`` plus the ids written within
+    ``ID_OVERLAP`` below it.
+    """
+    try:
+        with open(os.path.join(out_dir, STATE_FILE)) as f:
+            state = {**_empty_state(), **json.load(f)}
+    except FileNotFoundError:
+        return _empty_state()
+    batches = state["transactions"]["batches"]
+    if isinstance(batches, list):
+        # Older state only listed exported batches; ``None`` means "all rows so far".
+        state["transactions"]["batches"] = {str(batch_id): None for batch_id in batches}
+    state["prices"].setdefault("recent", [])
+    return state
+
+
+def _save_state(out_dir: str, state: Dict) -> None:
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _transaction_rows(session, batch_id: int, after: int, upto: int, chunk_size: int) -> Iterable[Tuple[str, Dict]]:
+    columns = [getattr(TransactionNormalized, name) for name in COLUMN_FIELDS]
+    last_id = after
+    while True:
+        rows = session.execute(
+            select(
+                TransactionNormalized.id,
+                TransactionNormalized.import_batch_id,
+                TransactionNormalized.row_hash,
+                TransactionRaw.source,
+                *columns,
+            )
+            .join(TransactionRaw, TransactionRaw.row_hash == TransactionNormalized.row_hash)
+            .where(
+                TransactionNormalized.import_batch_id == batch_id,
+                TransactionNormalized.id > last_id,
+                TransactionNormalized.id <= upto,
+            )
+            .order_by(TransactionNormalized.id)
+            .limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            return
+        for row in rows:
+            row = dict(row)
+            for name in _NUMERIC_FIELDS.intersection(row):
+                row[name] = _decimal(row[name])
+            yield partition(row["source"], row["base_asset"], row["datetime_utc"]), row
+        last_id = rows[-1]["id"]
+
+
+def _export_transactions(session, out_dir: str, state: Dict, chunk_size: int) -> Dict:
+    root = os.path.join(out_dir, "transactions")
+    exported = state["transactions"]["batches"]
+    # Rows can reach a completed batch later (backfill-normalized), so every
+    # batch is compared against its own high-water mark.
+    newest = session.execute(
+        select(TransactionNormalized.import_batch_id, func.max(TransactionNormalized.id))
+        .join(ImportBatch, ImportBatch.id == TransactionNormalized.import_batch_id)
+        .where(ImportBatch.status == "completed")
+        .group_by(TransactionNormalized.import_batch_id)
+        .order_by(TransactionNormalized.import_batch_id)
+    ).all()
+    schema = _schemas()["transactions"]
+    summary = {"batches": [], "rows": 0, "files": []}
+    for batch_id, upto in newest:
+        after = exported.get(str(batch_id), 0)
+        if after is None:
+            exported[str(batch_id)] = upto
+            _save_state(out_dir, state)
+            continue
+        if upto <= after:
+            continue
+        # Named after the first id, so a rerun after a crash overwrites its partial files.
+        name = f"batch-{batch_id}.parquet" if after == 0 else f"batch-{batch_id}-{after + 1}.parquet"
+        writer = PartitionedWriter(root, schema, name)
+        try:
+            for key, row in _transaction_rows(session, batch_id, after, upto, chunk_size):
+                writer.add(key, row)
+        finally:
+            writer.close()
+        # Saved per batch: an interrupted run resumes with the next batch.
+        exported[str(batch_id)] = upto
+        _save_state(out_dir, state)
+        summary["batches"].append(batch_id)
+        summary["rows"] += writer.rows
+        summary["files"].extend(writer.files)
+    return summary
+
+
+def _export_prices(session, out_dir: str, state: Dict, chunk_size: int) -> Dict:
+    after = state["prices"]["last_id"]
+    upto = session.execute(select(PricePoint.id).order_by(PricePoint.id.desc()).limit(1)).scalar() or after
+    if upto <= after:
+        # Late commits below ``after`` wait for a run with new ids, which re-reads the overlap.
+        return {"rows": 0, "files": [], "last_id": after}
+    recent = set(state["prices"]["recent"])
+    written = []
+    # Named after the first new id only, so a rerun after a crash overwrites its partial files.
+    writer = PartitionedWriter(os.path.join(out_dir, "prices"), _schemas()["prices"], f"points-{after + 1}.parquet")
+    last_id = max(after - ID_OVERLAP, 0)
+    try:
+        while last_id < upto:
+            rows = session.execute(
+                select(
+                    PricePoint.id, PricePoint.dt_utc, PricePoint.asset, PricePoint.quote, PricePoint.price, PricePoint.source
+                )
+                .where(PricePoint.id > last_id, PricePoint.id <= upto)
+                .order_by(PricePoint.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                if row.id in recent:
+                    continue
+                writer.add(
+                    partition(row.source, row.asset, row.dt_utc),
+                    {"id": row.id, "dt_utc": row.dt_utc, "quote": row.quote, "price": _decimal(row.price)},
+                )
+                written.append(row.id)
+            last_id = rows[-1].id
+    finally:
+        writer.close()
+    state["prices"]["last_id"] = upto
+    state["prices"]["recent"] = sorted(i for i in recent.union(written) if i > upto - ID_OVERLAP)
+    _save_state(out_dir, state)
+    return {"rows": writer.rows, "files": writer.files, "last_id": upto}
+
+
+def export_parquet(
+    out_dir: Optional[str] = None,
+    datasets: Iterable[str] = DATASETS,
+    full: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> Dict[str, Dict]:
+    """Write new transactions and/or prices under ``out_dir`` as partitioned Parquet.
+
+    Transactions are exported per completed import batch (rows added to a
+    batch later go to a new file of that batch) and prices by
+    ``price_point.id``; ``_export_state.json`` remembers what earlier runs
+    wrote, so each run only adds files for new data. ``full`` drops the
+    selected datasets and the state first. Returns a summary per dataset.
+    """
+    if pq is None:
+        raise RuntimeError("Parquet export needs the pyarrow package")
+    out_dir = out_dir or EXPORT_DIR
+    datasets = list(datasets)
+    unknown = set(datasets) - set(DATASETS)
+    if unknown:
+        raise ValueError(f"unknown export dataset(s): {', '.join(sorted(unknown))}")
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(out_dir)
+    if full:
+        for name in datasets:
+            shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+            state[name] = _empty_state()[name]
+        _save_state(out_dir, state)
+
+    summary = {}
+    with SessionLocal() as session:
+        if "transactions" in datasets:
+            summary["transactions"] = _export_transactions(session, out_dir, state, chunk_size)
+        if "prices" in datasets:
+            summary["prices"] = _export_prices(session, out_dir, state, chunk_size)
+    return summary
@@ -1,3 +1,3 @@
-from . import token_tx_csv, wallet_tx_csv, dexscreener_csv
+from . import registry, token_tx_csv, wallet_tx_csv, dexscreener_csv, bnb_usd_csv
 
-__all__ = ["token_tx_csv", "wallet_tx_csv", "dexscreener_csv"]
+__all__ = ["registry", "token_tx_csv", "wallet_tx_csv", "dexscreener_csv", "bnb_usd_csv"]
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Protocol, TypedDict, IO
+from typing import Dict, List, Optional, Protocol, Tuple, TypedDict, IO
 
 
 class IngestResult(TypedDict):
@@ -8,8 +8,12 @@ class IngestResult(TypedDict):
     rows_error: int
     warnings: List[str]
     batch_id: int
+    # ``StageStats.summary()`` of the import.
+    stats: Dict
 
 
 class CsvParser(Protocol):
-    def parse(self, file: IO, import_batch_id: int) -> IngestResult:
+    def parse(
+        self, file: IO, import_batch_id: int, resume: bool = False, columns: Optional[Dict[str, Tuple[str, ...]]] = None
+    ) -> IngestResult:
         ...
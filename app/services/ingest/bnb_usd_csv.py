@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import time
+from decimal import Decimal
+from typing import IO, Optional
+
+from app.db import SessionLocal
+from app.metrics import StageStats, timed_iter
+from . import registry
+from .base import IngestResult
+from .checkpoint import numbered_rows, position, resume_point
+from .bulk import CHUNK_SIZE, MAX_WARNINGS, commit_price_points, finish_import
+from .timestamps import TimestampParser
+
+COLUMNS = {
+    "timestamp": ("timestamp", "date", "dt"),
+    "price": ("price", "price_usd", "close"),
+}
+
+
+def parse(
+    file: IO, import_batch_id: int, resume: bool = False, columns: Optional[registry.ColumnVariants] = None
+) -> IngestResult:
+    """Import a historical BNB/USD series (``timestamp,price`` or ``date,close`` columns)."""
+    stats = StageStats()
+    table = registry.CsvTable(file)
+    col = registry.Columns(table.header, columns or COLUMNS)
+    reader = timed_iter(table, stats)
+    with SessionLocal() as session:
+        rows_processed = 0
+        rows_ok = 0
+        rows_error = 0
+        start_row = 0
+        if resume:
+            point = resume_point(session, import_batch_id, stats)
+            rows_processed, rows_ok, rows_error = point["rows_processed"], point["rows_ok"], point["rows_error"]
+            start_row = point["row"]
+        counted = rows_processed
+        warnings = list(point["warnings"]) if resume else []
+        pending = []
+        parse_ts = TimestampParser()
+        clock = time.perf_counter
+        ts_seconds = 0.0
+
+        for idx, row in numbered_rows(reader, file, start_row):
+            rows_processed += 1
+            try:
+                start = clock()
+                dt_utc = parse_ts(col["timestamp"](row))
+                ts_seconds += clock() - start
+                price = col["price"](row)
+                pending.append({
+                    "dt_utc": dt_utc,
+                    "asset": "BNB",
+                    "quote": "USD",
+                    "price": Decimal(price),
+                    "source": "BNB_USD_CSV",
+                })
+                rows_ok += 1
+            except Exception as exc:  # pragma: no cover
+                rows_error += 1
+                if len(warnings) < MAX_WARNINGS:
+                    warnings.append(str(exc))
+            if len(pending) >= CHUNK_SIZE:
+                commit_price_points(
+                    session, pending, import_batch_id, rows_processed, rows_ok, rows_error, stats,
+                    position(file, 0, idx), warnings,
+                )
+                pending = []
+
+        commit_price_points(session, pending, import_batch_id, rows_processed, rows_ok, rows_error, stats, warnings=warnings)
+        stats.add("timestamp", ts_seconds, rows_processed - counted)
+        return finish_import(session, stats, "bnb", import_batch_id, rows_processed, rows_ok, rows_error, warnings)
+
+
+registry.register("bnb", parse, COLUMNS)
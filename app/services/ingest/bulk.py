@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models import ImportBatch, PricePoint, TransactionNormalized, TransactionRaw
+from app.metrics import StageStats
+from app.services.ingest.dedup import dedup_index
+from app.services.normalize.records import finalize
+from . import rawstore
+from app.services.prices.cache import series_cache
+from app.services.prices.coverage import coverage_index
+from app.services.prices.rollup import apply_rollups
+from .base import IngestResult
+
+# Rows hashed, written and committed per round trip. Also keeps ``IN (...)``
+# lists well under SQLite's bound-parameter limit.
+CHUNK_SIZE = 1000
+
+# Per-row warnings kept on the result; the rest are only counted in rows_error.
+MAX_WARNINGS = 1000
+
+
+def existing_hashes(session: Session, hashes: Iterable[str]) -> Set[str]:
+    """Return the subset of ``hashes`` already stored in ``transaction_raw``.
+
+    Only hashes the dedup index cannot rule out are looked up.
+    """
+    hashes = dedup_index.candidates(session, hashes)
+    found: Set[str] = set()
+    for start in range(0, len(hashes), CHUNK_SIZE):
+        part = hashes[start:start + CHUNK_SIZE]
+        found.update(
+            session.execute(
+                select(TransactionRaw.row_hash).where(TransactionRaw.row_hash.in_(part))
+            ).scalars()
+        )
+    dedup_index.record_confirmed(len(hashes), len(found))
+    return found
+
+
+def _insert_ignoring_conflicts(session: Session, table):
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "mysql":
+        return insert(table).prefix_with("IGNORE")
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing()
+
+
+def insert_ignoring_conflicts(session: Session, table, rows: List[Dict]) -> None:
+    """Multi-row insert into ``table`` skipping rows that hit a unique constraint."""
+    if not rows:
+        return
+    session.execute(_insert_ignoring_conflicts(session, table), rows)
+
+
+def insert_raw_rows(session: Session, rows: List[Dict]) -> Set[str]:
+    """Multi-row insert into ``transaction_raw`` skipping known ``row_hash`` values.
+
+    Returns the hashes actually stored: rows that another writer inserted
+    first are skipped by the unique constraint and left out. With
+    ``RAW_STORAGE=compact`` the payloads go into a ``raw_block`` first.
+    """
+    if not rows:
+        return set()
+    if rawstore.compact():
+        rows = rawstore.pack(session, rows)
+    stmt = _insert_ignoring_conflicts(session, TransactionRaw.__table__)
+    if session.get_bind().dialect.insert_executemany_returning:
+        stored = set(session.execute(stmt.returning(TransactionRaw.row_hash), rows).scalars())
+    else:
+        result = session.execute(stmt, rows)
+        hashes = [r["row_hash"] for r in rows]
+        if result.rowcount == len(rows):
+            stored = set(hashes)
+        else:
+            # Rows stored by this batch are the ones that were not skipped.
+            stored = set()
+            batch_ids = {r["import_batch_id"] for r in rows}
+            for start in range(0, len(hashes), CHUNK_SIZE):
+                stored.update(session.execute(
+                    select(TransactionRaw.row_hash).where(
+                        TransactionRaw.row_hash.in_(hashes[start:start + CHUNK_SIZE]),
+                        TransactionRaw.import_batch_id.in_(batch_ids),
+                    )
+                ).scalars())
+    if rawstore.compact() and len(stored) < len(rows):
+        rawstore.drop_empty_blocks(session, {r["raw_block_id"] for r in rows})
+    return stored
+
+
+def write_new_rows(session: Session, pending: List[Dict], stats: Optional[StageStats] = None) -> int:
+    """Dedup ``pending`` against the database and insert the new rows.
+
+    Each record is a ``transaction_raw`` row plus a ``"normalized"`` entry
+    holding its ``transaction_normalized`` columns. ``pending`` must already be
+    free of duplicate hashes. Returns the number of rows the insert stored,
+    so rows the dedup index missed (e.g. written by another process since it
+    was warmed) count as duplicates, not as written.
+    """
+    stats = stats or StageStats()
+    normalized = {r["row_hash"]: r.pop("normalized", None) for r in pending}
+    with stats.time("dedup"):
+        known = existing_hashes(session, normalized)
+    new_rows = [r for r in pending if r["row_hash"] not in known]
+    with stats.time("insert"):
+        stored = insert_raw_rows(session, new_rows)
+        dedup_index.add(r["row_hash"] for r in new_rows)
+        insert_ignoring_conflicts(
+            session,
+            TransactionNormalized.__table__,
+            [
+                {**normalized[r["row_hash"]], "row_hash": r["row_hash"], "import_batch_id": r["import_batch_id"]}
+                for r in new_rows
+                if r["row_hash"] in stored and normalized[r["row_hash"]] is not None
+            ],
+        )
+    stats.count("duplicate", len(pending) - len(stored))
+    return len(stored)
+
+
+def write_chunk(
+    session: Session,
+    pending: List[Dict],
+    warnings: List[str],
+    stats: Optional[StageStats] = None,
+) -> Tuple[int, int]:
+    """Normalize a chunk of parsed records (see :func:`finalize`) and write the new ones.
+
+    Returns ``(rows_written, rows_rejected)``; rejection messages are added
+    to ``warnings`` up to ``MAX_WARNINGS``.
+    """
+    stats = stats or StageStats()
+    with stats.time("normalize"):
+        errors = finalize(pending, canonical_json=not rawstore.compact())
+    warnings.extend(errors[:max(MAX_WARNINGS - len(warnings), 0)])
+    return write_new_rows(session, pending, stats), len(errors)
+
+
+def commit_chunk(
+    session: Session,
+    import_batch_id: int,
+    rows_processed: int,
+    rows_ok: int,
+    rows_error: int,
+    stats: Optional[StageStats] = None,
+    checkpoint: Optional[Dict] = None,
+    warnings: Optional[List[str]] = None,
+) -> None:
+    """Record progress (stage stats, resume checkpoint, warnings) on the batch, commit the chunk and drop it from the session.
+
+    Also stamps ``heartbeat_at``, which tells :func:`jobs.resume` the batch is still being worked on.
+    """
+    values = {
+        "rows_processed": rows_processed,
+        "rows_ok": rows_ok,
+        "rows_error": rows_error,
+        "heartbeat_at": datetime.now(timezone.utc),
+    }
+    if stats is not None:
+        values["stats"] = stats.summary()
+    if checkpoint is not None:
+        values["checkpoint"] = checkpoint
+    if warnings is not None:
+        values["warnings"] = list(warnings)
+    start = time.perf_counter()
+    session.execute(update(ImportBatch).where(ImportBatch.id == import_batch_id).values(**values))
+    session.commit()
+    session.expunge_all()
+    if stats is not None:
+        stats.add("commit", time.perf_counter() - start)
+
+
+def finish_import(
+    session: Session,
+    stats: StageStats,
+    source: str,
+    import_batch_id: int,
+    rows_processed: int,
+    rows_ok: int,
+    rows_error: int,
+    warnings: List[str],
+) -> IngestResult:
+    """Final commit of an import: store its stage stats, publish them to the metrics registry and close."""
+    stats.count("processed", rows_processed)
+    stats.count("ok", rows_ok)
+    stats.count("error", rows_error)
+    commit_chunk(session, import_batch_id, rows_processed, rows_ok, rows_error, stats, warnings=warnings)
+    session.close()
+    stats.publish(source)
+    return IngestResult(
+        rows_ok=rows_ok, rows_error=rows_error, warnings=warnings, batch_id=import_batch_id, stats=stats.summary()
+    )
+
+
+def commit_price_points(
+    session: Session,
+    pending: List[Dict],
+    import_batch_id: int,
+    rows_processed: int,
+    rows_ok: int,
+    rows_error: int,
+    stats: Optional[StageStats] = None,
+    checkpoint: Optional[Dict] = None,
+    warnings: Optional[List[str]] = None,
+) -> None:
+    """Insert a chunk of ``price_point`` rows, roll them up and commit.
+
+    Afterwards the stored ticks extend ``coverage_index`` and the cached
+    series of every pair in the chunk are invalidated.
+    """
+    stats = stats or StageStats()
+    stored = []
+    if pending:
+        stmt = _insert_ignoring_conflicts(session, PricePoint.__table__)
+        with stats.time("insert"):
+            if session.get_bind().dialect.insert_executemany_returning:
+                # Only ticks that were actually stored count towards the rollups.
+                columns = (PricePoint.dt_utc, PricePoint.asset, PricePoint.quote, PricePoint.price)
+                stored = session.execute(stmt.returning(*columns), pending).mappings().all()
+            else:
+                session.execute(stmt, pending)
+                stored = pending
+        stats.count("duplicate", len(pending) - len(stored))
+        with stats.time("rollup"):
+            apply_rollups(session, stored)
+    commit_chunk(session, import_batch_id, rows_processed, rows_ok, rows_error, stats, checkpoint, warnings)
+    by_pair: Dict[Tuple[str, str], List] = {}
+    for p in stored:
+        by_pair.setdefault((p["asset"], p["quote"]), []).append(p["dt_utc"])
+    for (asset, quote), times in by_pair.items():
+        coverage_index.add(asset, quote, times)
+    for asset, quote in {(p["asset"], p["quote"]) for p in pending}:
+        series_cache.invalidate(asset, quote)
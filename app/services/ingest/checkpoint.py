@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import codecs
+import itertools
+import mmap
+import os
+from contextlib import ExitStack
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.db.models import ImportBatch
+from app.metrics import StageStats
+
+
+class OffsetLines:
+    """Decoded lines of a binary file, tracking the byte offset past the last line handed out.
+
+    Parsers iterate it like a text file; the ``offset`` recorded when a chunk
+    commits is the line boundary an interrupted import resumes from. Opened
+    with ``offset`` > 0 the header line is still yielded first, then reading
+    continues at ``offset``.
+    """
+
+    def __init__(self, file: BinaryIO, offset: int = 0, encoding: str = "utf-8", name: Optional[str] = None):
+        self.file = file
+        self.name = name if name is not None else getattr(file, "name", "")
+        self.encoding = encoding
+        self.offset = 0
+        self.resumed = offset > 0
+        self._start = offset
+
+    def __iter__(self) -> Iterator[str]:
+        readline = self.file.readline
+        encoding = self.encoding
+        header = readline()
+        if not header:
+            return
+        self.offset = len(header)
+        if header.startswith(codecs.BOM_UTF8):
+            header = header[len(codecs.BOM_UTF8):]
+        yield header.decode(encoding)
+        if self._start > self.offset:
+            self.file.seek(self._start)
+            self.offset = self._start
+        for line in iter(readline, b""):
+            self.offset += len(line)
+            yield line.decode(encoding)
+
+
+def open_spooled(stack: ExitStack, path: str, offset: int = 0) -> OffsetLines:
+    """Memory-map a spooled file (closed with ``stack``) and read its lines from ``offset``.
+
+    The page cache backs the mapping, so multi-GB files are parsed without
+    being copied into process memory.
+    """
+    f = stack.enter_context(open(path, "rb"))
+    if os.fstat(f.fileno()).st_size == 0:  # empty files cannot be mapped
+        return OffsetLines(f, offset, name=path)
+    mapped = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return OffsetLines(mapped, offset, name=path)
+
+
+def position(file, file_index: int, row: int) -> Dict:
+    """Checkpoint for ``ImportBatch.checkpoint``: the last committed row and, if known, its end offset."""
+    return {"file": file_index, "row": row, "offset": getattr(file, "offset", None)}
+
+
+def resume_point(session: Session, import_batch_id: int, stats: StageStats) -> Dict:
+    """Checkpoint, row counters and warnings of an interrupted batch; its stage stats are folded into ``stats``."""
+    batch = session.get(ImportBatch, import_batch_id)
+    stats.merge(batch.stats or {})
+    return {
+        "file": 0,
+        "row": 0,
+        "offset": None,
+        **(batch.checkpoint or {}),
+        "rows_processed": batch.rows_processed or 0,
+        "rows_ok": batch.rows_ok or 0,
+        "rows_error": batch.rows_error or 0,
+        "warnings": batch.warnings or [],
+    }
+
+
+def numbered_rows(reader: Iterable[Dict], file, start_row: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """``enumerate`` the rows after ``start_row``, numbered from ``start_row + 1``.
+
+    Rows up to ``start_row`` are read and dropped unless ``file`` is an
+    :class:`OffsetLines` that already seeked past them.
+    """
+    if start_row and not getattr(file, "resumed", False):
+        reader = itertools.islice(reader, start_row, None)
+    return enumerate(reader, start=start_row + 1)
+
+
+def offset_of(point: Optional[Dict], file_index: int) -> int:
+    """Byte offset to open file ``file_index`` of a resumed batch at."""
+    if not point or point.get("file", 0) != file_index:
+        return 0
+    return point.get("offset") or 0
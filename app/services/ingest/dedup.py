@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import math
+import os
+import struct
+import threading
+from hashlib import sha256
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.db.models import TransactionRaw
+
+DEDUP_INDEX_PATH = os.environ.get("DEDUP_INDEX_PATH")
+DEDUP_CAPACITY = int(os.environ.get("DEDUP_CAPACITY", "1000000"))
+DEDUP_FP_RATE = float(os.environ.get("DEDUP_FP_RATE", "0.01"))
+
+_MAGIC = b"GCCBLOOM1"
+_HEADER = struct.Struct("<QIQQ")  # bits, hash functions, entries, last transaction_raw.id
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter keyed by hex SHA-256 row hashes."""
+
+    def __init__(self, capacity: int, fp_rate: float, bits: Optional[int] = None, hashes: Optional[int] = None):
+        capacity = max(capacity, 1)
+        self.bits = bits or max(int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)), 64)
+        self.hashes = hashes or max(int(round(self.bits / capacity * math.log(2))), 1)
+        self.capacity = capacity
+        self.count = 0
+        self.array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: str):
+        try:
+            h1 = int(key[:16], 16)
+            h2 = int(key[16:32], 16) | 1
+        except ValueError:
+            digest = sha256(key.encode()).hexdigest()
+            h1 = int(digest[:16], 16)
+            h2 = int(digest[16:32], 16) | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        array = self.array
+        for pos in self._positions(key):
+            array[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        array = self.array
+        return all(array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def estimated_fp_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.array)
+
+
+class DedupIndex:
+    """Bloom filter over ``transaction_raw.row_hash`` that answers "definitely new".
+
+    Warmed from the table (resuming from the snapshot at ``path`` when there
+    is one), updated as rows are inserted and caught up with other writers
+    and saved by :meth:`flush`. A "maybe present" answer still goes to the
+    database, and the unique constraint on ``row_hash`` stays the final
+    arbiter: a row the filter wrongly calls new is skipped by the insert
+    and not counted as written.
+    """
+
+    def __init__(self, path: Optional[str], capacity: int, fp_rate: float):
+        self.path = path
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.filter: Optional[BloomFilter] = None
+        self.last_id = 0
+        self.lookups = 0
+        self.db_checks = 0
+        self.false_positives = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Optional[BloomFilter]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            bits, hashes, count, last_id = _HEADER.unpack(f.read(_HEADER.size))
+            bloom = BloomFilter(self.capacity, self.fp_rate, bits=bits, hashes=hashes)
+            bloom.array = bytearray(f.read())
+        if len(bloom.array) != (bits + 7) // 8:
+            return None
+        bloom.count = count
+        self.last_id = last_id
+        return bloom
+
+    def warm(self, session: Optional[Session] = None) -> None:
+        """Load the snapshot and add every row inserted since it was taken."""
+        with self._lock:
+            if self.filter is not None:
+                return
+            own = session is None
+            session = session or SessionLocal()
+            try:
+                total = session.execute(select(func.count(TransactionRaw.id))).scalar() or 0
+                bloom = self._load()
+                if bloom is None or bloom.count > bloom.capacity or total > 2 * bloom.capacity:
+                    bloom = BloomFilter(max(self.capacity, 2 * total), self.fp_rate)
+                    self.last_id = 0
+                self._catch_up(session, bloom)
+                self.filter = bloom
+            finally:
+                if own:
+                    session.close()
+
+    def _catch_up(self, session: Session, bloom: BloomFilter) -> None:
+        """Add rows after ``last_id`` to ``bloom``, from any writer, and advance ``last_id``."""
+        while True:
+            rows = session.execute(
+                select(TransactionRaw.id, TransactionRaw.row_hash)
+                .where(TransactionRaw.id > self.last_id)
+                .order_by(TransactionRaw.id)
+                .limit(10_000)
+            ).all()
+            if not rows:
+                return
+            for _, row_hash in rows:
+                # Skips rows this process already added, keeping ``count`` honest.
+                if row_hash not in bloom:
+                    bloom.add(row_hash)
+            self.last_id = rows[-1][0]
+
+    def candidates(self, session: Session, hashes: Iterable[str]) -> List[str]:
+        """Hashes that may already be stored; the rest are definitely new."""
+        if self.filter is None:
+            self.warm(session)
+        hashes = list(hashes)
+        bloom = self.filter
+        maybe = [h for h in hashes if h in bloom]
+        self.lookups += len(hashes)
+        self.db_checks += len(maybe)
+        return maybe
+
+    def record_confirmed(self, checked: int, found: int) -> None:
+        self.false_positives += checked - found
+
+    def add(self, hashes: Iterable[str]) -> None:
+        if self.filter is None:
+            return
+        for h in hashes:
+            self.filter.add(h)
+
+    def flush(self, session: Optional[Session] = None) -> None:
+        """Fold in rows other processes inserted, then save the filter if it has a ``path``.
+
+        The snapshot records the last ``transaction_raw.id`` the filter has
+        actually replayed, so the next process catches up on everything
+        after it.
+        """
+        if self.filter is None:
+            return
+        with self._lock:
+            own = session is None
+            session = session or SessionLocal()
+            try:
+                self._catch_up(session, self.filter)
+            finally:
+                if own:
+                    session.close()
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(_MAGIC)
+                f.write(_HEADER.pack(self.filter.bits, self.filter.hashes, self.filter.count, self.last_id))
+                f.write(self.filter.array)
+            os.replace(tmp, self.path)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.filter = None
+            self.last_id = 0
+            self.lookups = self.db_checks = self.false_positives = 0
+
+    def stats(self) -> dict:
+        bloom = self.filter
+        return {
+            "entries": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else self.capacity,
+            "bits": bloom.bits if bloom else 0,
+            "hash_functions": bloom.hashes if bloom else 0,
+            "memory_bytes": bloom.nbytes if bloom else 0,
+            "estimated_fp_rate": bloom.estimated_fp_rate if bloom else 0.0,
+            "lookups": self.lookups,
+            "db_checks": self.db_checks,
+            "false_positives": self.false_positives,
+            "observed_fp_rate": self.false_positives / self.lookups if self.lookups else 0.0,
+        }
+
+
+dedup_index = DedupIndex(DEDUP_INDEX_PATH, DEDUP_CAPACITY, DEDUP_FP_RATE)
@@ -1,72 +1,88 @@
 from __future__ import annotations
 
-import csv
-from datetime import timezone
+import time
 from decimal import Decimal
-from typing import IO
-
-from dateutil import parser as dtparser
+from typing import IO, Optional
 
 from app.db import SessionLocal
-from app.db.models import PricePoint
+from app.metrics import StageStats, timed_iter
+from . import registry
 from .base import IngestResult
+from .checkpoint import numbered_rows, position, resume_point
+from .bulk import CHUNK_SIZE, MAX_WARNINGS, commit_price_points, finish_import
+from .timestamps import TimestampParser
 
+COLUMNS = {
+    "timestamp": ("timestamp", "dt"),
+    "token": ("token", "token_symbol"),
+    "price_usd": ("price_usd", "price", "priceUsd"),
+    "price_bnb": ("price_in_bnb", "priceNative"),
+}
 
-def parse(file: IO, import_batch_id: int) -> IngestResult:
-    reader = csv.DictReader(file)
-    session = SessionLocal()
-    rows_ok = 0
-    rows_error = 0
-    warnings = []
 
-    for idx, row in enumerate(reader, start=1):
-        try:
-            dt = dtparser.parse(row.get("timestamp") or row.get("dt"))
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            dt_utc = dt.astimezone(timezone.utc)
-            token = row.get("token") or row.get("token_symbol")
-            price_usd = row.get("price_usd") or row.get("price")
-            if price_usd:
-                price = Decimal(price_usd)
-                exists = (
-                    session.query(PricePoint)
-                    .filter_by(asset=token, quote="USD", dt_utc=dt_utc, source="DEXSCREENER")
-                    .first()
-                )
-                if not exists:
-                    session.add(
-                        PricePoint(
-                            dt_utc=dt_utc,
-                            asset=token,
-                            quote="USD",
-                            price=price,
-                            source="DEXSCREENER",
-                        )
-                    )
-            price_bnb = row.get("price_in_bnb")
-            if price_bnb:
-                price = Decimal(price_bnb)
-                exists = (
-                    session.query(PricePoint)
-                    .filter_by(asset=token, quote="BNB", dt_utc=dt_utc, source="DEXSCREENER")
-                    .first()
+def parse(
+    file: IO, import_batch_id: int, resume: bool = False, columns: Optional[registry.ColumnVariants] = None
+) -> IngestResult:
+    stats = StageStats()
+    table = registry.CsvTable(file)
+    col = registry.Columns(table.header, columns or COLUMNS)
+    reader = timed_iter(table, stats)
+    with SessionLocal() as session:
+        rows_processed = 0
+        rows_ok = 0
+        rows_error = 0
+        start_row = 0
+        if resume:
+            point = resume_point(session, import_batch_id, stats)
+            rows_processed, rows_ok, rows_error = point["rows_processed"], point["rows_ok"], point["rows_error"]
+            start_row = point["row"]
+        counted = rows_processed
+        warnings = list(point["warnings"]) if resume else []
+        pending = []
+        parse_ts = TimestampParser()
+        clock = time.perf_counter
+        ts_seconds = 0.0
+
+        for idx, row in numbered_rows(reader, file, start_row):
+            rows_processed += 1
+            try:
+                start = clock()
+                dt_utc = parse_ts(col["timestamp"](row))
+                ts_seconds += clock() - start
+                token = col["token"](row)
+                price_usd = col["price_usd"](row)
+                if price_usd:
+                    pending.append({
+                        "dt_utc": dt_utc,
+                        "asset": token,
+                        "quote": "USD",
+                        "price": Decimal(price_usd),
+                        "source": "DEXSCREENER",
+                    })
+                price_bnb = col["price_bnb"](row)
+                if price_bnb:
+                    pending.append({
+                        "dt_utc": dt_utc,
+                        "asset": token,
+                        "quote": "BNB",
+                        "price": Decimal(price_bnb),
+                        "source": "DEXSCREENER",
+                    })
+                rows_ok += 1
+            except Exception as exc:  # pragma: no cover
+                rows_error += 1
+                if len(warnings) < MAX_WARNINGS:
+                    warnings.append(str(exc))
+            if len(pending) >= CHUNK_SIZE:
+                commit_price_points(
+                    session, pending, import_batch_id, rows_processed, rows_ok, rows_error, stats,
+                    position(file, 0, idx), warnings,
                 )
-                if not exists:
-                    session.add(
-                        PricePoint(
-                            dt_utc=dt_utc,
-                            asset=token,
-                            quote="BNB",
-                            price=price,
-                            source="DEXSCREENER",
-                        )
-                    )
-            rows_ok += 1
-        except Exception as exc:  # pragma: no cover
-            rows_error += 1
-            warnings.append(str(exc))
+                pending = []
+
+        commit_price_points(session, pending, import_batch_id, rows_processed, rows_ok, rows_error, stats, warnings=warnings)
+        stats.add("timestamp", ts_seconds, rows_processed - counted)
+        return finish_import(session, stats, "dexscreener", import_batch_id, rows_processed, rows_ok, rows_error, warnings)
+
 
-    session.commit()
-    session.close()
-    return IngestResult(rows_ok=rows_ok, rows_error=rows_error, warnings=warnings, batch_id=import_batch_id)
+registry.register("dexscreener", parse, COLUMNS)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import glob
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ALL_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import func, select
+from werkzeug.utils import secure_filename
+
+from app.db import SessionLocal
+from app.db.models import ImportBatch
+from . import jobs, registry
+from .upload import SUFFIXES, save_upload, sniff
+
+# Files picked up from directories: CSVs and the compressed forms uploads accept.
+FILE_SUFFIXES = (".csv",) + tuple(s for suffixes in SUFFIXES.values() for s in suffixes)
+# What ``watch`` has imported from a directory, kept in that directory.
+STATE_FILE = "_imported.json"
+
+
+class ImportProgress(NamedTuple):
+    files_done: int
+    files_total: int
+    rows_processed: int
+    rows_total: int
+    # Rows per second since the previous report.
+    rows_per_sec: float
+    elapsed: float
+
+
+def _wanted(name: str) -> bool:
+    return not name.startswith(".") and name.lower().endswith(FILE_SUFFIXES)
+
+
+def expand_paths(patterns: Iterable[str]) -> List[str]:
+    """Files named by ``patterns``: paths, globs (``**`` recurses) or directories of CSV exports.
+
+    Directories contribute their CSV (and .gz/.zst/.zip) files, not recursing.
+    The result is de-duplicated and sorted within each pattern.
+    """
+    paths: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                paths.extend(sorted(
+                    os.path.join(match, name) for name in os.listdir(match)
+                    if _wanted(name) and os.path.isfile(os.path.join(match, name))
+                ))
+            elif os.path.isfile(match):
+                paths.append(match)
+            else:
+                raise FileNotFoundError(match)
+    return list(dict.fromkeys(paths))
+
+
+def stage(path: str, batch_id: int) -> List[str]:
+    """Put a local file into the batch's spool directory, like an upload.
+
+    Plain CSVs are copied rather than linked: resume offsets point into the
+    spooled file, which must not change when the source is rewritten or
+    appended to. Compressed files are decompressed through
+    :func:`upload.save_upload`.
+    """
+    target = os.path.join(jobs.SPOOL_DIR, str(batch_id))
+    os.makedirs(target, exist_ok=True)
+    name = os.path.basename(path)
+    try:
+        with open(path, "rb") as f:
+            kind, _ = sniff(f)
+            if kind is not None:
+                return save_upload(f, name, target, 0)
+        spooled = os.path.join(target, f"0-{secure_filename(name) or 'upload.csv'}")
+        shutil.copyfile(path, spooled)
+    except (OSError, ValueError):
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    return [spooled]
+
+
+def _create_batch(spec: registry.ParserSpec, path: str) -> int:
+    with SessionLocal() as session:
+        batch = ImportBatch(
+            source=spec.batch_source,
+            file_name=os.path.basename(path),
+            started_at=datetime.now(timezone.utc),
+            status="queued",
+        )
+        session.add(batch)
+        session.commit()
+        return batch.id
+
+
+def _run(spec: registry.ParserSpec, batch_id: int, path: str) -> Dict:
+    outcome = {"path": path, "batch_id": batch_id, "status": "failed", "rows_ok": 0, "rows_error": 0, "error": None}
+    try:
+        result = jobs.run_import(batch_id, spec.name, stage(path, batch_id))
+    except Exception as exc:  # run_import marked the batch failed unless staging did
+        outcome["error"] = str(exc)
+        with SessionLocal() as session:
+            batch = session.get(ImportBatch, batch_id)
+            if batch.status == "queued":
+                batch.status = "failed"
+                batch.completed_at = datetime.now(timezone.utc)
+                batch.notes = str(exc)
+                session.commit()
+        return outcome
+    outcome.update(status="completed", rows_ok=result["rows_ok"], rows_error=result["rows_error"])
+    return outcome
+
+
+def _rows(batch_ids: List[int]):
+    with SessionLocal() as session:
+        return session.execute(
+            select(
+                func.coalesce(func.sum(ImportBatch.rows_processed), 0),
+                func.coalesce(func.sum(ImportBatch.rows_total), 0),
+            ).where(ImportBatch.id.in_(batch_ids))
+        ).one()
+
+
+def import_files(
+    source: str,
+    paths: Iterable[str],
+    workers: Optional[int] = None,
+    on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    interval: float = 1.0,
+) -> List[Dict]:
+    """Import local files with the ``source`` parser, one ``ImportBatch`` per file.
+
+    Up to ``workers`` files run at once (default ``IMPORT_WORKERS``), each
+    through :func:`jobs.run_import` exactly as an uploaded batch, so status,
+    checkpoints and ``POST /api/import/<id>/resume`` work the same.
+    ``on_progress`` is called every ``interval`` seconds and once at the end.
+    Returns one outcome per file; a failed file does not stop the others.
+    """
+    spec = jobs.parser_spec(source)
+    paths = list(paths)
+    if not paths:
+        return []
+    batch_ids = [_create_batch(spec, path) for path in paths]
+    start = last_time = time.monotonic()
+    last_rows = 0
+    with ThreadPoolExecutor(max_workers=workers or jobs.WORKERS, thread_name_prefix="import-cli") as pool:
+        futures = [pool.submit(_run, spec, batch_id, path) for batch_id, path in zip(batch_ids, paths)]
+        pending = futures
+        while pending:
+            _, pending = wait(pending, timeout=interval, return_when=ALL_COMPLETED)
+            if on_progress is not None:
+                processed, total = _rows(batch_ids)
+                now = time.monotonic()
+                rate = (processed - last_rows) / (now - last_time) if now > last_time else 0.0
+                on_progress(ImportProgress(len(futures) - len(pending), len(futures), processed, total, rate, now - start))
+                last_time, last_rows = now, processed
+    return [future.result() for future in futures]
+
+
+def _load_state(directory: str) -> Dict[str, Dict]:
+    try:
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_state(directory: str, state: Dict[str, Dict]) -> None:
+    path = os.path.join(directory, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _signature(path: str) -> List:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def watch(
+    directory: str,
+    source: str,
+    workers: Optional[int] = None,
+    poll_interval: float = 5.0,
+    on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    on_imported: Optional[Callable[[List[Dict]], None]] = None,
+    max_polls: Optional[int] = None,
+) -> int:
+    """Import new export files dropped into ``directory`` as they arrive.
+
+    A file is taken once its size and mtime are unchanged between two polls,
+    so exports still being written are left alone. Imported (or failed)
+    files and their batch ids are remembered in ``directory/_imported.json``;
+    a file that changes afterwards is imported again. Runs until interrupted
+    or for ``max_polls`` polls; returns the number of files imported.
+    """
+    jobs.parser_spec(source)
+    state = _load_state(directory)
+    seen: Dict[str, List] = {}
+    imported = polls = 0
+    while max_polls is None or polls < max_polls:
+        if polls:
+            time.sleep(poll_interval)
+        polls += 1
+        current = {}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if _wanted(name) and os.path.isfile(path):
+                current[name] = _signature(path)
+        ready = [
+            name for name, signature in current.items()
+            if seen.get(name) == signature and state.get(name, {}).get("signature") != signature
+        ]
+        seen = current
+        if not ready:
+            continue
+        outcomes = import_files(source, [os.path.join(directory, n) for n in ready], workers, on_progress)
+        for name, outcome in zip(ready, outcomes):
+            # Failed files are recorded too: they are retried once they change.
+            state[name] = {"signature": current[name], "batch_id": outcome["batch_id"], "status": outcome["status"]}
+            if outcome["status"] == "completed":
+                imported += 1
+            else:
+                logging.warning("watch: importing %s failed: %s", name, outcome["error"])
+        _save_state(directory, state)
+        if on_imported is not None:
+            on_imported(outcomes)
+    return imported
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, update
+
+from app.db import SessionLocal
+from app.db.models import ImportBatch
+from . import registry
+from .base import IngestResult
+from .checkpoint import offset_of, open_spooled
+from .dedup import dedup_index
+from .upload import save_upload
+
+SPOOL_DIR = os.environ.get("IMPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "gcc_imports"))
+WORKERS = int(os.environ.get("IMPORT_WORKERS", "2"))
+# Processes used to parse multi-file wallet imports; 0 or 1 keeps them serial.
+WALLET_PARALLEL_WORKERS = int(os.environ.get("WALLET_PARALLEL_WORKERS", "0"))
+# A queued or running batch with no committed chunk for this long is taken to
+# have lost its worker and may be resumed.
+STALE_SECONDS = int(os.environ.get("IMPORT_STALE_SECONDS", "600"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_futures: Dict[int, Future] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="import")
+    return _executor
+
+
+def spool(files, batch_id: int) -> List[str]:
+    """Stream uploaded files to ``SPOOL_DIR/<batch_id>/`` and return their paths.
+
+    Compressed uploads are decompressed while spooling (see
+    :func:`upload.save_upload`); a zip adds one path per member. On a
+    ``ValueError`` the batch's spool directory is removed before it is raised.
+    """
+    target = os.path.join(SPOOL_DIR, str(batch_id))
+    os.makedirs(target, exist_ok=True)
+    paths: List[str] = []
+    try:
+        for f in files:
+            name = f.filename or getattr(f, "name", "") or "upload.csv"
+            paths.extend(save_upload(f.stream, name, target, len(paths)))
+    except ValueError:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    return paths
+
+
+def spooled_paths(batch_id: int) -> List[str]:
+    """Paths saved by :func:`spool` for a batch, in upload order."""
+    target = os.path.join(SPOOL_DIR, str(batch_id))
+    names = sorted(os.listdir(target), key=lambda name: int(name.split("-", 1)[0]))
+    return [os.path.join(target, name) for name in names]
+
+
+def count_rows(path: str) -> int:
+    """Cheap upper bound on data rows: newlines minus the header line."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def parser_spec(source: str) -> registry.ParserSpec:
+    """The registered parser for ``source``; ``ValueError`` if there is none."""
+    try:
+        return registry.get(source)
+    except KeyError:
+        raise ValueError(f"unknown import source {source!r}") from None
+
+
+def run_import(batch_id: int, source: str, paths: List[str], resume: bool = False) -> IngestResult:
+    """Run the parser for a spooled batch, tracking status on the ``ImportBatch`` row.
+
+    With ``resume`` the parser continues after the batch's last committed
+    checkpoint, seeking straight to its byte offset.
+    """
+    with SessionLocal() as session:
+        batch = session.get(ImportBatch, batch_id)
+        batch.status = "running"
+        batch.heartbeat_at = datetime.now(timezone.utc)
+        if resume:
+            batch.completed_at = None
+            batch.notes = None
+        else:
+            batch.started_at = datetime.now(timezone.utc)
+        batch.rows_total = sum(count_rows(p) for p in paths)
+        point = batch.checkpoint if resume else None
+        session.commit()
+
+    try:
+        spec = parser_spec(source)
+        if spec.parse_parallel and len(paths) > 1 and WALLET_PARALLEL_WORKERS > 1:
+            result = spec.parse_parallel(paths, batch_id, WALLET_PARALLEL_WORKERS, resume, spec.columns)
+        else:
+            with ExitStack() as stack:
+                files = [open_spooled(stack, p, offset_of(point, idx)) for idx, p in enumerate(paths)]
+                result = spec.run(files, batch_id, resume)
+    except Exception as exc:
+        logging.exception("import batch %s failed", batch_id)
+        with SessionLocal() as session:
+            batch = session.get(ImportBatch, batch_id)
+            batch.status = "failed"
+            batch.completed_at = datetime.now(timezone.utc)
+            batch.notes = str(exc)
+            session.commit()
+        raise
+
+    with SessionLocal() as session:
+        batch = session.get(ImportBatch, batch_id)
+        batch.status = "completed"
+        batch.completed_at = datetime.now(timezone.utc)
+        batch.rows_ok = result["rows_ok"]
+        batch.rows_error = result["rows_error"]
+        batch.warnings = result["warnings"]
+        batch.stats = result["stats"]
+        session.commit()
+        if spec.transactions:
+            dedup_index.flush(session)
+
+    logging.info(json.dumps({
+        "batch_id": batch_id,
+        "source": source,
+        "rows_ok": result["rows_ok"],
+        "rows_error": result["rows_error"],
+        "warnings": result["warnings"],
+        "stats": result["stats"],
+    }))
+    return result
+
+
+def enqueue(batch_id: int, source: str, paths: List[str], resume: bool = False) -> Future:
+    future = _get_executor().submit(run_import, batch_id, source, paths, resume)
+    _futures[batch_id] = future
+    future.add_done_callback(lambda _: _futures.pop(batch_id, None))
+    return future
+
+
+def resume(batch_id: int) -> Future:
+    """Queue an interrupted batch again from its last checkpoint.
+
+    The batch is claimed with one conditional ``UPDATE``: only a failed
+    batch, or a queued/running one whose ``heartbeat_at`` is older than
+    ``STALE_SECONDS``, is moved back to "queued", so two workers cannot
+    both resume it. Raises ``LookupError`` if the batch or its spooled
+    files are gone and ``ValueError`` if it completed or is still being
+    worked on.
+    """
+    try:
+        paths = spooled_paths(batch_id)
+    except FileNotFoundError:
+        paths = None
+    stale = datetime.now(timezone.utc) - timedelta(seconds=STALE_SECONDS)
+    with SessionLocal() as session:
+        batch = session.get(ImportBatch, batch_id)
+        if batch is None:
+            raise LookupError(f"import batch {batch_id} not found")
+        if paths is None:
+            raise LookupError(f"spooled files of import batch {batch_id} are gone")
+        claimed = batch_id not in _futures and session.execute(
+            update(ImportBatch)
+            .where(ImportBatch.id == batch_id)
+            .where(or_(
+                ImportBatch.status == "failed",
+                and_(
+                    or_(ImportBatch.status.in_(("queued", "running")), ImportBatch.status.is_(None)),
+                    func.coalesce(ImportBatch.heartbeat_at, ImportBatch.started_at) < stale,
+                ),
+            ))
+            .values(status="queued", heartbeat_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if not claimed:
+            raise ValueError(f"import batch {batch_id} is {batch.status}")
+        session.commit()
+        source = batch.source.lower()[:-len("_csv")]
+    return enqueue(batch_id, source, paths, resume=True)
+
+
+def wait(batch_id: int, timeout: Optional[float] = None) -> None:
+    """Block until a queued batch finishes; returns immediately if it is not running here."""
+    future = _futures.get(batch_id)
+    if future is not None:
+        future.exception(timeout)
+
+
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def progress(batch: ImportBatch) -> dict:
+    """Status, throughput (rows/sec) and ETA (seconds) for a batch."""
+    processed = batch.rows_processed or 0
+    started = _as_utc(batch.started_at)
+    end = _as_utc(batch.completed_at) or datetime.now(timezone.utc)
+    elapsed = (end - started).total_seconds() if started else 0.0
+    throughput = processed / elapsed if elapsed > 0 else None
+    eta = None
+    if batch.status == "completed":
+        eta = 0.0
+    elif throughput and batch.rows_total is not None:
+        eta = max(batch.rows_total - processed, 0) / throughput
+    return {
+        "batch_id": batch.id,
+        "source": batch.source,
+        "status": batch.status,
+        "rows_total": batch.rows_total,
+        "rows_processed": processed,
+        "rows_ok": batch.rows_ok or 0,
+        "rows_error": batch.rows_error or 0,
+        "warnings": batch.warnings or [],
+        "throughput_rows_per_sec": throughput,
+        "eta_seconds": eta,
+        "stats": batch.stats,
+        "checkpoint": batch.checkpoint,
+        "started_at": started.isoformat() if started else None,
+        "completed_at": _as_utc(batch.completed_at).isoformat() if batch.completed_at else None,
+        "error": batch.notes if batch.status == "failed" else None,
+    }
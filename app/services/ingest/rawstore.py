@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.models import ImportBatch, RawBlock, TransactionNormalized, TransactionRaw
+from app.services.normalize.records import NormalizedTx, canonical
+from app.services.normalize.schema import COLUMN_FIELDS
+
+# "json": every raw row keeps its CSV row in ``raw_payload`` and a JSON copy
+# of the normalized transaction in ``provenance``. "compact": raw rows of each
+# written chunk are stored as one compressed ``raw_block`` and the normalized
+# copy is left to ``transaction_normalized``.
+RAW_STORAGE = os.environ.get("RAW_STORAGE", "json").lower()
+COMPRESS_LEVEL = int(os.environ.get("RAW_BLOCK_COMPRESS_LEVEL", "6"))
+
+FORMAT_VERSION = 1
+_MISSING = object()
+
+
+def compact() -> bool:
+    return RAW_STORAGE == "compact"
+
+
+def encode_rows(rows: List[Dict]) -> bytes:
+    """Dictionary-encode ``rows`` column by column and zlib-compress the result.
+
+    Each column keeps its distinct values once plus one small integer per
+    row (0 = key absent); columns whose values are all distinct, like
+    transaction hashes, skip the codes.
+    """
+    columns: List = []
+    positions: Dict = {}
+    for row in rows:
+        for key in row:
+            if key not in positions:
+                positions[key] = len(columns)
+                columns.append(key)
+    values: List[List] = [[] for _ in columns]
+    codes: List[Optional[List[int]]] = [[] for _ in columns]
+    for pos, key in enumerate(columns):
+        lookup: Dict = {}
+        column_values = values[pos]
+        column_codes = codes[pos]
+        for row in rows:
+            value = row.get(key, _MISSING)
+            if value is _MISSING:
+                column_codes.append(0)
+                continue
+            hashable = tuple(value) if isinstance(value, list) else value
+            code = lookup.get(hashable)
+            if code is None:
+                column_values.append(value)
+                code = lookup[hashable] = len(column_values)
+            column_codes.append(code)
+        if len(column_values) == len(rows) and 0 not in column_codes:
+            codes[pos] = None
+    doc = {"v": FORMAT_VERSION, "n": len(rows), "columns": columns, "values": values, "codes": codes}
+    return zlib.compress(json.dumps(doc, separators=(",", ":")).encode(), COMPRESS_LEVEL)
+
+
+def decode_rows(data: bytes) -> List[Dict]:
+    """Inverse of :func:`encode_rows`."""
+    doc = json.loads(zlib.decompress(data))
+    if not doc["columns"]:
+        return [{} for _ in range(doc["n"])]
+    expanded = []
+    for values, codes in zip(doc["values"], doc["codes"]):
+        if codes is None:
+            expanded.append(values)
+        else:
+            lookup = [_MISSING, *values]
+            expanded.append([lookup[code] for code in codes])
+    columns = doc["columns"]
+    return [
+        {key: value for key, value in zip(columns, row) if value is not _MISSING}
+        for row in zip(*expanded)
+    ]
+
+
+def _strip(provenance: Dict) -> Dict:
+    return {k: v for k, v in provenance.items() if k != "normalized"}
+
+
+def pack(session: Session, rows: List[Dict]) -> List[Dict]:
+    """Store the ``raw_payload`` of ``rows`` as one ``raw_block`` per batch.
+
+    Returns the rows to insert instead: ``raw_payload`` left empty, pointing
+    at their block and position.
+    """
+    by_batch: Dict[int, List[Dict]] = {}
+    for row in rows:
+        by_batch.setdefault(row["import_batch_id"], []).append(row)
+    packed = []
+    for batch_id, group in by_batch.items():
+        block_id = session.execute(
+            insert(RawBlock).values(
+                import_batch_id=batch_id,
+                row_count=len(group),
+                data=encode_rows([r["raw_payload"] for r in group]),
+            )
+        ).inserted_primary_key[0]
+        for pos, row in enumerate(group):
+            packed.append({
+                **row,
+                "raw_payload": None,
+                "raw_block_id": block_id,
+                "block_row": pos,
+                "provenance": _strip(row["provenance"]),
+            })
+    return packed
+
+
+def drop_empty_blocks(session: Session, block_ids: Iterable[int]) -> None:
+    """Delete blocks no ``transaction_raw`` row points at, e.g. when every row of a chunk was a conflict."""
+    table = RawBlock.__table__
+    session.execute(
+        table.delete().where(
+            table.c.id.in_(list(block_ids)),
+            ~exists().where(TransactionRaw.raw_block_id == table.c.id),
+        )
+    )
+
+
+def attach_payloads(session: Session, rows: List[Dict]) -> None:
+    """Fill ``raw_payload`` of selected ``transaction_raw`` rows that live in blocks, in place.
+
+    Expects ``raw_block_id`` and ``block_row`` keys, which are removed; each
+    block is decoded once.
+    """
+    block_ids = {r["raw_block_id"] for r in rows if r.get("raw_block_id") is not None}
+    blocks = {}
+    if block_ids:
+        blocks = {
+            block_id: decode_rows(data)
+            for block_id, data in session.execute(
+                select(RawBlock.id, RawBlock.data).where(RawBlock.id.in_(block_ids))
+            )
+        }
+    for row in rows:
+        block_id = row.pop("raw_block_id", None)
+        pos = row.pop("block_row", None)
+        if row.get("raw_payload") is None and block_id in blocks:
+            row["raw_payload"] = blocks[block_id][pos]
+
+
+def compact_batch(session: Session, batch_id: int, chunk_size: int = 1000) -> int:
+    """Move the JSON-stored raw rows of a batch into blocks, a chunk per commit. Returns rows moved.
+
+    ``provenance["normalized"]`` is only dropped from rows that have their
+    ``transaction_normalized`` row; rows still waiting for
+    ``flask backfill-normalized`` keep it, as it is the backfill's input.
+    """
+    moved = 0
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(
+                TransactionRaw.id,
+                TransactionRaw.raw_payload,
+                TransactionRaw.provenance,
+                TransactionNormalized.id.label("normalized_id"),
+            )
+            .outerjoin(TransactionNormalized, TransactionNormalized.row_hash == TransactionRaw.row_hash)
+            .where(
+                TransactionRaw.import_batch_id == batch_id,
+                TransactionRaw.raw_block_id.is_(None),
+                TransactionRaw.id > last_id,
+            )
+            .order_by(TransactionRaw.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return moved
+        last_id = rows[-1].id
+        block_id = session.execute(
+            insert(RawBlock).values(
+                import_batch_id=batch_id,
+                row_count=len(rows),
+                data=encode_rows([r.raw_payload for r in rows]),
+            )
+        ).inserted_primary_key[0]
+        session.execute(
+            update(TransactionRaw.__table__)
+            .where(TransactionRaw.__table__.c.id == bindparam("row_id"))
+            .values(raw_payload=None, raw_block_id=block_id, block_row=bindparam("pos"), provenance=bindparam("prov")),
+            [
+                {
+                    "row_id": r.id,
+                    "pos": pos,
+                    "prov": _strip(r.provenance or {}) if r.normalized_id is not None else r.provenance,
+                }
+                for pos, r in enumerate(rows)
+            ],
+        )
+        session.commit()
+        moved += len(rows)
+
+
+def _plain(value):
+    # Numeric columns come back with 18 places; stored JSON has the short form.
+    if isinstance(value, Decimal):
+        return Decimal(format(value.normalize(), "f"))
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _normalized_json(session: Session, rows: List) -> Dict[str, Dict]:
+    """``provenance["normalized"]`` rebuilt from ``transaction_normalized`` for rows lacking it, by row hash."""
+    sources = {r.row_hash: r.source for r in rows if "normalized" not in (r.provenance or {})}
+    if not sources:
+        return {}
+    columns = [getattr(TransactionNormalized, name) for name in COLUMN_FIELDS]
+    rebuilt = {}
+    for row in session.execute(
+        select(TransactionNormalized.row_hash, *columns).where(TransactionNormalized.row_hash.in_(list(sources)))
+    ):
+        values = {name: _plain(value) for name, value in zip(COLUMN_FIELDS, row[1:])}
+        # Parsers tag the normalized transaction with their source, e.g. "token_csv".
+        provenance = {"source": sources[row.row_hash].lower()}
+        rebuilt[row.row_hash] = canonical(NormalizedTx(**values, provenance=provenance))
+    return rebuilt
+
+
+def expand_batch(session: Session, batch_id: int) -> int:
+    """Inverse of :func:`compact_batch`: write block rows back to ``raw_payload``. Returns rows restored.
+
+    ``provenance["normalized"]`` is rebuilt from ``transaction_normalized``
+    where compaction (or a compact-mode import) dropped it.
+    """
+    restored = 0
+    blocks = session.execute(
+        select(RawBlock.id, RawBlock.data).where(RawBlock.import_batch_id == batch_id).order_by(RawBlock.id)
+    ).all()
+    for block_id, data in blocks:
+        payloads = decode_rows(data)
+        rows = session.execute(
+            select(TransactionRaw.id, TransactionRaw.block_row, TransactionRaw.row_hash, TransactionRaw.source,
+                   TransactionRaw.provenance)
+            .where(TransactionRaw.raw_block_id == block_id)
+        ).all()
+        if rows:
+            rebuilt = _normalized_json(session, rows)
+            session.execute(
+                update(TransactionRaw.__table__)
+                .where(TransactionRaw.__table__.c.id == bindparam("row_id"))
+                .values(raw_payload=bindparam("payload"), raw_block_id=None, block_row=None, provenance=bindparam("prov")),
+                [
+                    {
+                        "row_id": r.id,
+                        "payload": payloads[r.block_row],
+                        "prov": {**(r.provenance or {}), "normalized": rebuilt[r.row_hash]}
+                        if r.row_hash in rebuilt else r.provenance,
+                    }
+                    for r in rows
+                ],
+            )
+        session.execute(RawBlock.__table__.delete().where(RawBlock.__table__.c.id == block_id))
+        session.commit()
+        restored += len(rows)
+    return restored
+
+
+def _json_bytes(value) -> int:
+    return 0 if value is None else len(json.dumps(value).encode())
+
+
+def storage_report(session: Session, batch_id: Optional[int] = None, chunk_size: int = 1000) -> List[Dict]:
+    """Raw storage per batch as stored in JSON mode vs compact mode.
+
+    Both sides are measured from the rows: JSON-stored rows are encoded into
+    blocks of ``chunk_size`` to size their compact form; rows already in
+    blocks are decoded to size their JSON form (without the normalized copy,
+    which compact mode no longer keeps, so that side is a lower bound).
+    """
+    query = select(ImportBatch.id, ImportBatch.source).order_by(ImportBatch.id)
+    if batch_id is not None:
+        query = query.where(ImportBatch.id == batch_id)
+    report = []
+    for batch in session.execute(query).all():
+        rows = json_bytes = compact_bytes = 0
+        last_id = 0
+        while True:
+            chunk = session.execute(
+                select(
+                    TransactionRaw.id,
+                    TransactionRaw.raw_payload,
+                    TransactionRaw.provenance,
+                    TransactionRaw.raw_block_id,
+                    TransactionRaw.block_row,
+                )
+                .where(TransactionRaw.import_batch_id == batch.id, TransactionRaw.id > last_id)
+                .order_by(TransactionRaw.id)
+                .limit(chunk_size)
+            ).all()
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            rows += len(chunk)
+            inline = [r for r in chunk if r.raw_block_id is None]
+            json_bytes += sum(_json_bytes(r.raw_payload) + _json_bytes(r.provenance) for r in inline)
+            if inline:
+                compact_bytes += len(encode_rows([r.raw_payload for r in inline]))
+                compact_bytes += sum(_json_bytes(_strip(r.provenance or {})) for r in inline)
+            packed = [r for r in chunk if r.raw_block_id is not None]
+            compact_bytes += sum(_json_bytes(r.provenance) for r in packed)
+            payloads = [dict(r._mapping) for r in packed]
+            attach_payloads(session, payloads)
+            json_bytes += sum(_json_bytes(p["raw_payload"]) + _json_bytes(p["provenance"]) for p in payloads)
+        compact_bytes += session.execute(
+            select(func.coalesce(func.sum(func.length(RawBlock.data)), 0)).where(RawBlock.import_batch_id == batch.id)
+        ).scalar()
+        report.append({
+            "batch_id": batch.id,
+            "source": batch.source,
+            "rows": rows,
+            "json_bytes": json_bytes,
+            "compact_bytes": compact_bytes,
+            "json_bytes_per_row": json_bytes / rows if rows else 0.0,
+            "compact_bytes_per_row": compact_bytes / rows if rows else 0.0,
+        })
+    return report
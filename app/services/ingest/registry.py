@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import csv
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .base import IngestResult
+
+# field -> header names it may appear under, in priority order.
+ColumnVariants = Dict[str, Tuple[str, ...]]
+
+
+class ParserSpec(NamedTuple):
+    """An import source: its parser and the header variants its fields are read from.
+
+    ``parse(file_or_files, import_batch_id, resume, columns)`` receives every
+    uploaded file when ``multi_file`` is set, otherwise the first one.
+    ``parse_parallel(paths, import_batch_id, workers, resume, columns)``, if
+    given, is used for multi-file batches when worker processes are enabled.
+    ``transactions`` marks sources that write ``transaction_raw`` rows (and
+    so feed the dedup index) rather than price points.
+    """
+
+    name: str
+    parse: Callable[..., IngestResult]
+    columns: ColumnVariants
+    multi_file: bool = False
+    parse_parallel: Optional[Callable[..., IngestResult]] = None
+    transactions: bool = False
+
+    @property
+    def batch_source(self) -> str:
+        """``ImportBatch.source`` label of this source's batches."""
+        return f"{self.name.upper()}_CSV"
+
+    def run(self, files: Sequence, import_batch_id: int, resume: bool = False) -> IngestResult:
+        return self.parse(files if self.multi_file else files[0], import_batch_id, resume, self.columns)
+
+
+REGISTRY: Dict[str, ParserSpec] = {}
+
+
+def register(
+    name: str,
+    parse: Callable[..., IngestResult],
+    columns: ColumnVariants,
+    multi_file: bool = False,
+    parse_parallel: Optional[Callable[..., IngestResult]] = None,
+    transactions: bool = False,
+) -> ParserSpec:
+    """Make ``name`` importable through ``POST /api/import/csv?source=<name>``.
+
+    A new export layout of an existing format only needs its own
+    ``columns``, e.g. ``register("bscscan_bep20", wallet_tx_csv.parse,
+    {...}, multi_file=True, transactions=True)``.
+    """
+    variants = {field: tuple(names) for field, names in columns.items()}
+    spec = ParserSpec(name, parse, variants, multi_file, parse_parallel, transactions)
+    REGISTRY[name] = spec
+    return spec
+
+
+def add_variants(name: str, **fields: Iterable[str]) -> None:
+    """Accept more header names for fields of a registered source, after the existing ones."""
+    columns = REGISTRY[name].columns
+    for field, variants in fields.items():
+        known = columns.get(field, ())
+        columns[field] = known + tuple(v for v in variants if v not in known)
+
+
+def get(name: str) -> ParserSpec:
+    """The registered source ``name``; ``KeyError`` if there is none."""
+    return REGISTRY[name]
+
+
+def _missing(field: str) -> Callable[[List], None]:
+    def getter(row: List) -> None:
+        raise KeyError(field)
+
+    return getter
+
+
+def _first_non_empty(positions: Tuple[int, ...]) -> Callable[[List], Optional[str]]:
+    def getter(row: List) -> Optional[str]:
+        for pos in positions:
+            value = row[pos]
+            if value:
+                return value
+        return value
+
+    return getter
+
+
+class Columns:
+    """Field accessors compiled once from a file's header.
+
+    ``columns[field](row)`` reads a ``csv.reader`` row by position. A field
+    present under several header variants falls back to the next one when
+    a row's value is empty, like a chain of ``row.get(a) or row.get(b)``.
+    Fields in ``required`` that the header lacks raise ``KeyError`` per row;
+    other absent fields read as ``None``.
+    """
+
+    def __init__(self, header: Sequence[str], variants: ColumnVariants, required: Iterable[str] = ()):
+        # Last occurrence wins, as in ``csv.DictReader`` rows.
+        index = {name: pos for pos, name in enumerate(header)}
+        required = set(required)
+        self.positions: Dict[str, Tuple[int, ...]] = {}
+        self._getters: Dict[str, Callable[[List], Optional[str]]] = {}
+        for field, names in variants.items():
+            positions = tuple(dict.fromkeys(index[n] for n in names if n in index))
+            self.positions[field] = positions
+            if not positions:
+                self._getters[field] = _missing(field) if field in required else (lambda row: None)
+            elif len(positions) == 1:
+                self._getters[field] = itemgetter(positions[0])
+            else:
+                self._getters[field] = _first_non_empty(positions)
+
+    def __getitem__(self, field: str) -> Callable[[List], Optional[str]]:
+        return self._getters[field]
+
+
+class CsvTable:
+    """``csv.reader`` rows of a file whose header is read up front.
+
+    Blank lines are skipped and short rows padded with ``None`` to the
+    header width, so positions line up as ``csv.DictReader`` keys would.
+    """
+
+    def __init__(self, file: Iterable[str]):
+        self._reader = csv.reader(file)
+        self.header: List[str] = next(self._reader, [])
+        self.width = len(self.header)
+
+    def __iter__(self) -> Iterator[List]:
+        width = self.width
+        for row in self._reader:
+            if not row:
+                continue
+            if len(row) < width:
+                row += [None] * (width - len(row))
+            yield row
+
+    def record(self, row: List) -> Dict:
+        """The row as ``csv.DictReader`` would return it (extra cells under ``None``), for ``raw_payload``."""
+        record = dict(zip(self.header, row))
+        if len(row) > self.width:
+            record[None] = row[self.width:]
+        return record
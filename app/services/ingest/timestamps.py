@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime, timezone
+from typing import Callable
+
+from dateutil import parser as dtparser
+
+_EPOCH_RE = re.compile(r"\d{9,11}(\.\d+)?")
+# ISO-8601 / ``YYYY-MM-DD HH:MM:SS`` with optional fraction and Z or +HH:MM offset.
+_ISO_RE = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}:\d{2})?")
+
+
+def _utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def parse_epoch(value: str) -> datetime:
+    if not _EPOCH_RE.fullmatch(value):
+        raise ValueError(f"not an epoch timestamp: {value!r}")
+    return datetime.fromtimestamp(float(value) if "." in value else int(value), tz=timezone.utc)
+
+
+def parse_iso(value: str) -> datetime:
+    if not _ISO_RE.fullmatch(value):
+        raise ValueError(f"not an ISO-8601 timestamp: {value!r}")
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return _utc(datetime.fromisoformat(value))
+
+
+def parse_any(value: str) -> datetime:
+    return _utc(dtparser.parse(value))
+
+
+def detect(value: str) -> Callable[[str], datetime]:
+    """Pick the fast parser matching ``value``, or dateutil if none does."""
+    value = value.strip()
+    if _EPOCH_RE.fullmatch(value):
+        return parse_epoch
+    if _ISO_RE.fullmatch(value):
+        return parse_iso
+    return parse_any
+
+
+class TimestampParser:
+    """Parses one timestamp column into aware UTC datetimes.
+
+    The format is detected from the first value seen; later values that do
+    not match it are detected individually (dateutil as a last resort) and
+    counted in ``fallbacks``.
+    Create one per file/column.
+    """
+
+    def __init__(self) -> None:
+        self._fast = None
+        self.fallbacks = 0
+
+    @property
+    def format(self) -> str:
+        return {parse_epoch: "epoch", parse_iso: "iso", parse_any: "dateutil"}.get(self._fast, "unknown")
+
+    def __call__(self, value: str) -> datetime:
+        fast = self._fast
+        if fast is None:
+            if not value:
+                raise ValueError("missing timestamp")
+            fast = self._fast = detect(value)
+        try:
+            return fast(value)
+        except (ValueError, OverflowError, OSError):
+            if fast is parse_any:
+                raise
+            self.fallbacks += 1
+            # Route through detect() so e.g. an epoch in an ISO column still parses.
+            return detect(value)(value.strip())
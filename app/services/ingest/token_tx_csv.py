@@ -1,72 +1,119 @@
 from __future__ import annotations
 
-import csv
 import json
-from datetime import timezone
+import time
 from hashlib import sha256
-from typing import IO
+from typing import IO, Optional
 
-from dateutil import parser as dtparser
 from decimal import Decimal
 
 from app.db import SessionLocal
-from app.db.models import TransactionRaw
+from app.metrics import StageStats, timed_iter
+from . import registry
 from .base import IngestResult
-from app.services.normalize.schema import Transaction
+from .checkpoint import numbered_rows, position, resume_point
+from .bulk import CHUNK_SIZE, MAX_WARNINGS, commit_chunk, finish_import, write_chunk
+from .timestamps import TimestampParser
+from app.services.normalize.records import NormalizedTx
 
+COLUMNS = {
+    "timestamp": ("timestamp",),
+    "tx_hash": ("tx_hash",),
+    "from": ("from",),
+    "to": ("to",),
+    "value": ("value",),
+    "token_symbol": ("token_symbol",),
+    "token_contract": ("token_contract",),
+}
+REQUIRED = ("timestamp", "tx_hash", "from", "to", "value")
 
-def parse(file: IO, import_batch_id: int) -> IngestResult:
-    reader = csv.DictReader(file)
-    session = SessionLocal()
-    rows_ok = 0
-    rows_error = 0
-    warnings = []
 
-    for idx, row in enumerate(reader, start=1):
-        try:
-            dt = dtparser.parse(row["timestamp"])
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            dt_utc = dt.astimezone(timezone.utc)
-            amount = Decimal(row["value"])
-            canonical = {
-                "tx_hash": row["tx_hash"],
-                "datetime_utc": dt_utc.isoformat(),
-                "from": row["from"],
-                "to": row["to"],
-                "value": str(amount),
-                "token_symbol": row.get("token_symbol"),
-                "token_contract": row.get("token_contract"),
-            }
-            row_hash = sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
-            exists = session.query(TransactionRaw).filter_by(row_hash=row_hash).first()
-            if exists:
-                continue
-            tx = Transaction(
-                tx_hash=row["tx_hash"],
-                datetime_utc=dt_utc,
-                type="TRANSFER",
-                base_asset=row.get("token_symbol"),
-                base_qty=amount,
-                provenance={"source": "token_csv"},
-            )
-            tr = TransactionRaw(
-                import_batch_id=import_batch_id,
-                source="TOKEN_CSV",
-                row_hash=row_hash,
-                raw_payload=row,
-                provenance={
-                    "source_file": getattr(file, "name", ""),
-                    "row_number": idx,
-                    "normalized": json.loads(tx.json()),
-                },
-            )
-            session.add(tr)
-            rows_ok += 1
-        except Exception as exc:  # pragma: no cover - generic error catch
-            rows_error += 1
-            warnings.append(str(exc))
+def parse(
+    file: IO, import_batch_id: int, resume: bool = False, columns: Optional[registry.ColumnVariants] = None
+) -> IngestResult:
+    stats = StageStats()
+    table = registry.CsvTable(file)
+    col = registry.Columns(table.header, columns or COLUMNS, REQUIRED)
+    get_ts, get_hash, get_from, get_to = col["timestamp"], col["tx_hash"], col["from"], col["to"]
+    get_value, get_symbol, get_contract = col["value"], col["token_symbol"], col["token_contract"]
+    reader = timed_iter(table, stats)
+    with SessionLocal() as session:
+        rows_processed = 0
+        rows_ok = 0
+        rows_error = 0
+        start_row = 0
+        if resume:
+            point = resume_point(session, import_batch_id, stats)
+            rows_processed, rows_ok, rows_error = point["rows_processed"], point["rows_ok"], point["rows_error"]
+            start_row = point["row"]
+        counted = rows_processed
+        warnings = list(point["warnings"]) if resume else []
+        seen_hashes = set()
+        pending = []
+        parse_ts = TimestampParser()
+        clock = time.perf_counter
+        ts_seconds = hash_seconds = 0.0
 
-    session.commit()
-    session.close()
-    return IngestResult(rows_ok=rows_ok, rows_error=rows_error, warnings=warnings, batch_id=import_batch_id)
+        for idx, row in numbered_rows(reader, file, start_row):
+            rows_processed += 1
+            try:
+                start = clock()
+                dt_utc = parse_ts(get_ts(row))
+                parsed = clock()
+                ts_seconds += parsed - start
+                amount = Decimal(get_value(row))
+                canonical = {
+                    "tx_hash": get_hash(row),
+                    "datetime_utc": dt_utc.isoformat(),
+                    "from": get_from(row),
+                    "to": get_to(row),
+                    "value": str(amount),
+                    "token_symbol": get_symbol(row),
+                    "token_contract": get_contract(row),
+                }
+                row_hash = sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+                hash_seconds += clock() - parsed
+                if row_hash in seen_hashes:
+                    stats.count("duplicate")
+                    continue
+                seen_hashes.add(row_hash)
+                pending.append({
+                    "import_batch_id": import_batch_id,
+                    "source": "TOKEN_CSV",
+                    "row_hash": row_hash,
+                    "raw_payload": table.record(row),
+                    "provenance": {
+                        "source_file": getattr(file, "name", ""),
+                        "row_number": idx,
+                    },
+                    "tx": NormalizedTx(
+                        tx_hash=canonical["tx_hash"],
+                        datetime_utc=dt_utc,
+                        type="TRANSFER",
+                        account=canonical["from"],
+                        base_asset=canonical["token_symbol"],
+                        base_qty=amount,
+                        provenance={"source": "token_csv"},
+                    ),
+                })
+            except Exception as exc:  # pragma: no cover - generic error catch
+                rows_error += 1
+                if len(warnings) < MAX_WARNINGS:
+                    warnings.append(str(exc))
+            if len(pending) >= CHUNK_SIZE:
+                written, rejected = write_chunk(session, pending, warnings, stats)
+                rows_ok += written
+                rows_error += rejected
+                commit_chunk(session, import_batch_id, rows_processed, rows_ok, rows_error, stats, position(file, 0, idx), warnings)
+                pending = []
+                seen_hashes.clear()
+
+        written, rejected = write_chunk(session, pending, warnings, stats)
+        rows_ok += written
+        rows_error += rejected
+        stats.add("timestamp", ts_seconds, rows_processed - counted)
+        stats.add("hash", hash_seconds, rows_processed - counted)
+        return finish_import(session, stats, "token", import_batch_id, rows_processed, rows_ok, rows_error, warnings)
+
+
+registry.register("token", parse, COLUMNS, transactions=True)
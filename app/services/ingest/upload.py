@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import gzip
+import io
+import os
+import zipfile
+from typing import BinaryIO, List, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+try:  # optional: only needed for .zst uploads
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+# Bytes read from an upload (or decompressor) per write to the spool file.
+SPOOL_CHUNK_SIZE = int(os.environ.get("IMPORT_SPOOL_CHUNK_SIZE", str(1 << 20)))
+# Most bytes one upload may spool once decompressed (all zip members together);
+# 0 disables the check. Guards against gzip/zip bombs.
+MAX_UNCOMPRESSED_BYTES = int(os.environ.get("IMPORT_MAX_UNCOMPRESSED_BYTES", str(20 << 30)))
+
+MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"PK\x03\x04": "zip",
+}
+SUFFIXES = {"gzip": (".gz", ".gzip"), "zstd": (".zst", ".zstd"), "zip": (".zip",)}
+_READ_ERRORS = (OSError, EOFError, zipfile.BadZipFile) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+class _Prefixed(io.RawIOBase):
+    """A non-seekable stream with the bytes already read for sniffing put back in front."""
+
+    def __init__(self, head: bytes, stream: BinaryIO):
+        self._head = head
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._head:
+            n = min(len(buffer), len(self._head))
+            buffer[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _seekable(stream) -> bool:
+    try:
+        return stream.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def sniff(stream: BinaryIO) -> Tuple[Optional[str], BinaryIO]:
+    """Return the compression of ``stream`` (``None`` for plain text) and a stream positioned at its start."""
+    if _seekable(stream):
+        pos = stream.tell()
+        head = stream.read(4)
+        stream.seek(pos)
+    else:
+        head = stream.read(4)
+        stream = io.BufferedReader(_Prefixed(head, stream), SPOOL_CHUNK_SIZE)
+    for magic, kind in MAGIC.items():
+        if head.startswith(magic):
+            return kind, stream
+    return None, stream
+
+
+def _strip_suffix(name: str, kind: Optional[str]) -> str:
+    for suffix in SUFFIXES.get(kind, ()):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)] or "upload.csv"
+    return name
+
+
+class _Budget:
+    """Bytes an upload may still write before it exceeds ``MAX_UNCOMPRESSED_BYTES``."""
+
+    __slots__ = ("name", "left")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.left = MAX_UNCOMPRESSED_BYTES or None
+
+    def spend(self, n: int) -> None:
+        if self.left is None:
+            return
+        self.left -= n
+        if self.left < 0:
+            raise ValueError(f"upload {self.name!r} is larger than {MAX_UNCOMPRESSED_BYTES} bytes uncompressed")
+
+
+def _copy(src: BinaryIO, path: str, budget: _Budget) -> None:
+    with open(path, "wb") as dst:
+        for block in iter(lambda: src.read(SPOOL_CHUNK_SIZE), b""):
+            budget.spend(len(block))
+            dst.write(block)
+
+
+def save_upload(stream: BinaryIO, name: str, target: str, index: int) -> List[str]:
+    """Stream one upload into ``target`` as ``<index>-<name>`` files, decompressing it on the way.
+
+    gzip and zstd uploads become one plain CSV; every file in a zip becomes
+    its own spool file with consecutive indexes. Nothing is held in memory
+    beyond ``SPOOL_CHUNK_SIZE``. Raises ``ValueError`` for corrupt archives,
+    uploads over ``MAX_UNCOMPRESSED_BYTES`` or a zstd upload without the
+    ``zstandard`` package; the files it wrote are removed first.
+    """
+    kind, stream = sniff(stream)
+    name = _strip_suffix(secure_filename(name) or "upload.csv", kind)
+    budget = _Budget(name)
+    written: List[str] = []
+    try:
+        if kind == "zip":
+            return _save_zip(stream, name, target, index, budget, written)
+        path = os.path.join(target, f"{index}-{name}")
+        written.append(path)
+        if kind == "gzip":
+            with gzip.GzipFile(fileobj=stream, mode="rb") as src:
+                _copy(src, path, budget)
+        elif kind == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd uploads need the zstandard package")
+            with zstandard.ZstdDecompressor().stream_reader(stream, read_size=SPOOL_CHUNK_SIZE) as src:
+                _copy(src, path, budget)
+        else:
+            _copy(stream, path, budget)
+        return written
+    except (ValueError, *_READ_ERRORS) as exc:
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        if isinstance(exc, ValueError):
+            raise
+        raise ValueError(f"could not read upload {name!r}: {exc}") from exc
+
+
+def _save_zip(stream: BinaryIO, name: str, target: str, index: int, budget: _Budget, written: List[str]) -> List[str]:
+    # zipfile needs to seek to the central directory at the end of the archive.
+    part = None
+    if not _seekable(stream):
+        part = os.path.join(target, f"{index}-{name}.part")
+        written.append(part)
+        # The archive itself counts against the budget only while it is spooled.
+        _copy(stream, part, _Budget(name))
+        stream = open(part, "rb")
+    paths = []
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            # Declared sizes reject most bombs before anything is inflated; _copy enforces the rest.
+            _Budget(name).spend(sum(info.file_size for info in members))
+            for info in members:
+                member = secure_filename(os.path.basename(info.filename)) or "upload.csv"
+                path = os.path.join(target, f"{index + len(paths)}-{member}")
+                paths.append(path)
+                written.append(path)
+                with archive.open(info) as src:
+                    _copy(src, path, budget)
+    finally:
+        if part is not None:
+            stream.close()
+            os.remove(part)
+    if not paths:
+        raise ValueError(f"zip upload {name!r} contains no files")
+    return paths
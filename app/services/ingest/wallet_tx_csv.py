@@ -1,77 +1,221 @@
 from __future__ import annotations
 
-import csv
 import json
-from datetime import timezone
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from hashlib import sha256
-from typing import IO, Iterable
+from itertools import repeat
+from operator import itemgetter
+from typing import IO, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from dateutil import parser as dtparser
 from decimal import Decimal
 
 from app.db import SessionLocal
-from app.db.models import TransactionRaw
+from app.metrics import StageStats, timed_iter
+from . import rawstore, registry
 from .base import IngestResult
-from app.services.normalize.schema import Transaction
+from .checkpoint import numbered_rows, open_spooled, position, resume_point
+from .bulk import CHUNK_SIZE, MAX_WARNINGS, commit_chunk, finish_import, write_chunk, write_new_rows
+from .timestamps import TimestampParser
+from app.services.normalize.records import NormalizedTx, finalize
 
 
-def parse(files: Iterable[IO], import_batch_id: int) -> IngestResult:
-    session = SessionLocal()
-    rows_ok = 0
-    rows_error = 0
-    warnings = []
-    seen_hashes = set()
+# BscScan exports name the same fields differently per export type and era.
+COLUMNS = {
+    "timestamp": ("UnixTimestamp", "DateTime", "timestamp", "timeStamp", "DateTime (UTC)"),
+    "value": ("Value", "value", "TokenValue", "token_value"),
+    "tx_hash": ("Txhash", "hash", "tx_hash"),
+    "from": ("From",),
+    "to": ("To",),
+    "token_symbol": ("TokenSymbol",),
+}
 
-    for file in files:
-        reader = csv.DictReader(file)
-        for idx, row in enumerate(reader, start=1):
+
+def _record(
+    row: List, table: registry.CsvTable, col: registry.Columns, source_file: str, idx: int,
+    parse_ts: TimestampParser, stats: StageStats,
+) -> Dict:
+    """Hash and normalize one CSV row into a ``transaction_raw`` insert dict."""
+    start = time.perf_counter()
+    dt_utc = parse_ts(col["timestamp"](row))
+    parsed = time.perf_counter()
+    stats.add("timestamp", parsed - start)
+    amount = Decimal(col["value"](row) or "0")
+    canonical = {
+        "tx_hash": col["tx_hash"](row),
+        "datetime_utc": dt_utc.isoformat(),
+        "from": col["from"](row),
+        "to": col["to"](row),
+        "value": str(amount),
+        "token_symbol": col["token_symbol"](row),
+    }
+    row_hash = sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+    stats.add("hash", time.perf_counter() - parsed)
+    return {
+        "source": "WALLET_CSV",
+        "row_hash": row_hash,
+        "raw_payload": table.record(row),
+        "provenance": {
+            "source_file": source_file,
+            "row_number": idx,
+        },
+        "tx": NormalizedTx(
+            tx_hash=canonical["tx_hash"],
+            datetime_utc=dt_utc,
+            type="TRANSFER",
+            account=canonical["from"],
+            base_asset=canonical["token_symbol"],
+            base_qty=amount,
+            provenance={"source": "wallet_csv"},
+        ),
+    }
+
+
+def parse(
+    files: Iterable[IO], import_batch_id: int, resume: bool = False, columns: Optional[registry.ColumnVariants] = None
+) -> IngestResult:
+    with SessionLocal() as session:
+        stats = StageStats()
+        rows_processed = 0
+        rows_ok = 0
+        rows_error = 0
+        point = {"file": 0, "row": 0}
+        if resume:
+            point = resume_point(session, import_batch_id, stats)
+            rows_processed, rows_ok, rows_error = point["rows_processed"], point["rows_ok"], point["rows_error"]
+        warnings = list(point["warnings"]) if resume else []
+        seen_hashes = set()
+        pending = []
+
+        for file_index, file in enumerate(files):
+            if file_index < point["file"]:
+                continue
+            start_row = point["row"] if file_index == point["file"] else 0
+            table = registry.CsvTable(file)
+            col = registry.Columns(table.header, columns or COLUMNS)
+            reader = timed_iter(table, stats)
+            parse_ts = TimestampParser()
+            for idx, row in numbered_rows(reader, file, start_row):
+                rows_processed += 1
+                try:
+                    record = _record(row, table, col, getattr(file, "name", ""), idx, parse_ts, stats)
+                    if record["row_hash"] in seen_hashes:
+                        stats.count("duplicate")
+                        continue
+                    seen_hashes.add(record["row_hash"])
+                    record["import_batch_id"] = import_batch_id
+                    pending.append(record)
+                except Exception as exc:  # pragma: no cover
+                    rows_error += 1
+                    if len(warnings) < MAX_WARNINGS:
+                        warnings.append(str(exc))
+                if len(pending) >= CHUNK_SIZE:
+                    written, rejected = write_chunk(session, pending, warnings, stats)
+                    rows_ok += written
+                    rows_error += rejected
+                    checkpoint = position(file, file_index, idx)
+                    commit_chunk(session, import_batch_id, rows_processed, rows_ok, rows_error, stats, checkpoint, warnings)
+                    pending = []
+                    seen_hashes.clear()
+
+        written, rejected = write_chunk(session, pending, warnings, stats)
+        rows_ok += written
+        rows_error += rejected
+        return finish_import(session, stats, "wallet", import_batch_id, rows_processed, rows_ok, rows_error, warnings)
+
+
+def _parse_file(
+    path: str, start_row: int = 0, columns: Optional[registry.ColumnVariants] = None
+) -> Tuple[List[Dict], List[Tuple[int, str]], Dict]:
+    """Process-pool worker: parse, hash and normalize one file without touching the database.
+
+    Returns the records in file order, ``(row_number, warning)`` for each bad
+    row and the worker's stage stats. Rows up to ``start_row`` are skipped.
+    """
+    records = []
+    errors = []
+    stats = StageStats()
+    parse_ts = TimestampParser()
+    with ExitStack() as stack:
+        f = open_spooled(stack, path)
+        table = registry.CsvTable(f)
+        col = registry.Columns(table.header, columns or COLUMNS)
+        for idx, row in numbered_rows(timed_iter(table, stats), f, start_row):
             try:
-                dt = dtparser.parse(row.get("DateTime") or row.get("timestamp") or row.get("timeStamp"))
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                dt_utc = dt.astimezone(timezone.utc)
-                amount_str = row.get("Value") or row.get("value") or row.get("TokenValue") or row.get("token_value") or "0"
-                amount = Decimal(amount_str)
-                canonical = {
-                    "tx_hash": row.get("Txhash") or row.get("hash") or row.get("tx_hash"),
-                    "datetime_utc": dt_utc.isoformat(),
-                    "from": row.get("From"),
-                    "to": row.get("To"),
-                    "value": str(amount),
-                    "token_symbol": row.get("TokenSymbol"),
-                }
-                row_hash = sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
-                if row_hash in seen_hashes:
-                    continue
-                seen_hashes.add(row_hash)
-                exists = session.query(TransactionRaw).filter_by(row_hash=row_hash).first()
-                if exists:
-                    continue
-                tx = Transaction(
-                    tx_hash=canonical["tx_hash"],
-                    datetime_utc=dt_utc,
-                    type="TRANSFER",
-                    base_asset=canonical.get("token_symbol"),
-                    base_qty=amount,
-                    provenance={"source": "wallet_csv"},
-                )
-                tr = TransactionRaw(
-                    import_batch_id=import_batch_id,
-                    source="WALLET_CSV",
-                    row_hash=row_hash,
-                    raw_payload=row,
-                    provenance={
-                        "source_file": getattr(file, "name", ""),
-                        "row_number": idx,
-                        "normalized": json.loads(tx.json()),
-                    },
-                )
-                session.add(tr)
-                rows_ok += 1
+                records.append(_record(row, table, col, path, idx, parse_ts, stats))
             except Exception as exc:  # pragma: no cover
-                rows_error += 1
-                warnings.append(str(exc))
+                errors.append((idx, str(exc)))
+    rows = [r["provenance"]["row_number"] for r in records]
+    with stats.time("normalize"):
+        rejected = finalize(records, canonical_json=not rawstore.compact())
+    if rejected:
+        kept = {r["provenance"]["row_number"] for r in records}
+        errors.extend(zip([n for n in rows if n not in kept], rejected))
+        errors.sort()
+    return records, errors, stats.summary()
+
+
+def parse_parallel(
+    paths: Sequence[str],
+    import_batch_id: int,
+    workers: Optional[int] = None,
+    resume: bool = False,
+    columns: Optional[registry.ColumnVariants] = None,
+) -> IngestResult:
+    """Like :func:`parse`, but parses and hashes each file in its own process.
+
+    Results are merged in file and row order through the same ``seen_hashes``
+    dedup and written by this process only, so the outcome (and checkpoints)
+    match :func:`parse`. ``columns`` is handed to the workers explicitly, as
+    spawned processes only see the variants registered at import time.
+    """
+    with SessionLocal() as session:
+        stats = StageStats()
+        rows_processed = 0
+        rows_ok = 0
+        rows_error = 0
+        point = {"file": 0, "row": 0}
+        if resume:
+            point = resume_point(session, import_batch_id, stats)
+            rows_processed, rows_ok, rows_error = point["rows_processed"], point["rows_ok"], point["rows_error"]
+        warnings = list(point["warnings"]) if resume else []
+        seen_hashes = set()
+        pending = []
+
+        paths = list(paths)[point["file"]:]
+        start_rows = [point["row"]] + [0] * (len(paths) - 1)
+        workers = workers or max(min(len(paths), multiprocessing.cpu_count()), 1)
+        # spawn, not fork: callers run inside threaded web/job workers.
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = pool.map(_parse_file, paths, start_rows, repeat(columns or COLUMNS))
+            for file_index, (records, errors, worker_stats) in enumerate(results, start=point["file"]):
+                stats.merge(worker_stats)
+                rows = sorted(errors + [(r["provenance"]["row_number"], r) for r in records], key=itemgetter(0))
+                for idx, item in rows:
+                    rows_processed += 1
+                    if isinstance(item, str):
+                        rows_error += 1
+                        if len(warnings) < MAX_WARNINGS:
+                            warnings.append(item)
+                        continue
+                    if item["row_hash"] in seen_hashes:
+                        stats.count("duplicate")
+                        continue
+                    seen_hashes.add(item["row_hash"])
+                    item["import_batch_id"] = import_batch_id
+                    pending.append(item)
+                    if len(pending) >= CHUNK_SIZE:
+                        rows_ok += write_new_rows(session, pending, stats)
+                        checkpoint = position(None, file_index, idx)
+                        commit_chunk(session, import_batch_id, rows_processed, rows_ok, rows_error, stats, checkpoint, warnings)
+                        pending = []
+                        seen_hashes.clear()
+
+        rows_ok += write_new_rows(session, pending, stats)
+        return finish_import(session, stats, "wallet", import_batch_id, rows_processed, rows_ok, rows_error, warnings)
+
 
-    session.commit()
-    session.close()
-    return IngestResult(rows_ok=rows_ok, rows_error=rows_error, warnings=warnings, batch_id=import_batch_id)
+registry.register("wallet", parse, COLUMNS, multi_file=True, parse_parallel=parse_parallel, transactions=True)
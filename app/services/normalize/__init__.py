@@ -1,3 +1,3 @@
-from .schema import Transaction
+from .schema import COLUMN_FIELDS, Transaction, to_columns
 
-__all__ = ["Transaction"]
+__all__ = ["Transaction", "COLUMN_FIELDS", "to_columns"]
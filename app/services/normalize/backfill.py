@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import exists, select
+
+from app.db import SessionLocal
+from app.db.models import TransactionNormalized, TransactionRaw
+from app.services.ingest.bulk import CHUNK_SIZE, insert_ignoring_conflicts
+from .schema import Transaction, to_columns
+
+
+def backfill_normalized(chunk_size: int = CHUNK_SIZE, limit: Optional[int] = None) -> int:
+    """Create missing ``transaction_normalized`` rows from ``provenance["normalized"]``.
+
+    Walks ``transaction_raw`` by primary key in chunks, committing each one,
+    so it can be interrupted and re-run. Returns the number of rows written.
+    """
+    written = 0
+    last_id = 0
+    with SessionLocal() as session:
+        while limit is None or written < limit:
+            rows = session.execute(
+                select(TransactionRaw.id, TransactionRaw.row_hash, TransactionRaw.import_batch_id, TransactionRaw.provenance)
+                .where(TransactionRaw.id > last_id)
+                .where(~exists().where(TransactionNormalized.row_hash == TransactionRaw.row_hash))
+                .order_by(TransactionRaw.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = []
+            for row in rows:
+                data = (row.provenance or {}).get("normalized")
+                if not data:
+                    continue
+                values.append({
+                    **to_columns(Transaction(**data)),
+                    "row_hash": row.row_hash,
+                    "import_batch_id": row.import_batch_id,
+                })
+            insert_ignoring_conflicts(session, TransactionNormalized.__table__, values)
+            session.commit()
+            written += len(values)
+    return written
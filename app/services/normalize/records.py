@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional
+
+from .schema import COLUMN_FIELDS, Transaction
+
+# Validate every record through the pydantic ``Transaction`` model as well.
+STRICT = os.environ.get("NORMALIZE_STRICT", "").lower() in ("1", "true", "yes")
+
+_ZERO = timedelta(0)
+_DECIMAL_FIELDS = ("base_qty", "quote_qty", "fee_qty", "price_quote")
+_STR_FIELDS = ("tx_id", "platform", "account", "chain", "base_asset", "quote_asset", "fee_asset", "note")
+
+
+class NormalizedTx(NamedTuple):
+    """Tuple-backed counterpart of :class:`Transaction` for bulk ingestion.
+
+    Parsers build these with values that are already typed (aware UTC
+    datetime, ``Decimal`` quantities); :func:`validate_batch` checks them a
+    column at a time instead of running per-field validators per row.
+    """
+
+    tx_hash: str
+    datetime_utc: datetime
+    type: str
+    tx_id: Optional[str] = None
+    platform: Optional[str] = None
+    account: Optional[str] = None
+    chain: Optional[str] = None
+    base_asset: Optional[str] = None
+    base_qty: Optional[Decimal] = None
+    quote_asset: Optional[str] = None
+    quote_qty: Optional[Decimal] = None
+    fee_asset: Optional[str] = None
+    fee_qty: Optional[Decimal] = None
+    price_quote: Optional[Decimal] = None
+    note: Optional[str] = None
+    provenance: Optional[dict] = None
+
+
+_NONE = type(None)
+
+# name -> (fast whole-column check, per-value check used only to locate failures)
+_CHECKS = [
+    ("tx_hash", lambda col: set(map(type, col)) == {str} and "" not in col, lambda v: isinstance(v, str) and v != ""),
+    ("type", lambda col: set(map(type, col)) == {str} and "" not in col, lambda v: isinstance(v, str) and v != ""),
+    (
+        "datetime_utc",
+        lambda col: set(map(type, col)) == {datetime} and {v.tzinfo for v in col} == {timezone.utc},
+        lambda v: isinstance(v, datetime) and v.tzinfo is not None and v.utcoffset() == _ZERO,
+    ),
+    *(
+        (name, lambda col: set(map(type, col)) <= {_NONE, Decimal}, lambda v: v is None or isinstance(v, Decimal))
+        for name in _DECIMAL_FIELDS
+    ),
+    *(
+        (name, lambda col: set(map(type, col)) <= {_NONE, str}, lambda v: v is None or isinstance(v, str))
+        for name in _STR_FIELDS
+    ),
+]
+
+
+def validate_batch(batch: List[NormalizedTx]) -> Dict[int, str]:
+    """Check a batch column by column; returns ``{index: message}`` for bad records."""
+    if not batch:
+        return {}
+    columns = list(zip(*batch))
+    field = NormalizedTx._fields.index
+    errors: Dict[int, str] = {}
+    for name, column_ok, value_ok in _CHECKS:
+        col = columns[field(name)]
+        if column_ok(col):
+            continue
+        for i, v in enumerate(col):
+            if not value_ok(v):
+                errors.setdefault(i, f"invalid {name}: {v!r}")
+    return errors
+
+
+def strict(tx: NormalizedTx) -> NormalizedTx:
+    """Run ``tx`` through the pydantic model and return the validated values."""
+    model = Transaction(**{k: v for k, v in tx._asdict().items() if k != "provenance"}, provenance=tx.provenance or {})
+    return NormalizedTx(**{name: getattr(model, name) for name in NormalizedTx._fields})
+
+
+_COLUMN_VALUES = itemgetter(*(NormalizedTx._fields.index(name) for name in COLUMN_FIELDS))
+_DECIMAL_POSITIONS = {COLUMN_FIELDS.index(name) for name in _DECIMAL_FIELDS}
+_DATETIME_POSITION = COLUMN_FIELDS.index("datetime_utc")
+_CANONICAL_KEYS = COLUMN_FIELDS + ("provenance",)
+
+
+def _canonical_batch(batch: List[NormalizedTx]) -> List[dict]:
+    """:func:`canonical` for a validated batch, converting one column at a time."""
+    cols = [list(col) for col in zip(*map(_COLUMN_VALUES, batch))]
+    cols[_DATETIME_POSITION] = [v.isoformat() for v in cols[_DATETIME_POSITION]]
+    for pos in _DECIMAL_POSITIONS:
+        col = cols[pos]
+        if any(v is not None for v in col):
+            cols[pos] = [None if v is None else str(v) for v in col]
+    cols.append([tx.provenance or {} for tx in batch])
+    return [dict(zip(_CANONICAL_KEYS, values)) for values in zip(*cols)]
+
+
+def canonical(tx: NormalizedTx) -> dict:
+    """JSON-ready dict in ``Transaction`` field order, as stored in provenance."""
+    return _canonical_batch([tx])[0]
+
+
+def columns(tx: NormalizedTx) -> dict:
+    """Typed values for a ``transaction_normalized`` row."""
+    return dict(zip(COLUMN_FIELDS, _COLUMN_VALUES(tx)))
+
+
+def finalize(records: List[dict], strict_mode: Optional[bool] = None, canonical_json: bool = True) -> List[str]:
+    """Turn each record's ``"tx"`` into its stored normalized forms, in place.
+
+    Sets ``provenance["normalized"]`` (unless ``canonical_json`` is false)
+    and the ``"normalized"`` column dict used by
+    :func:`app.services.ingest.bulk.write_new_rows`. Records that fail
+    validation are removed; their error messages are returned.
+    """
+    strict_mode = STRICT if strict_mode is None else strict_mode
+    txs = [r.pop("tx") for r in records]
+    errors: Dict[int, str] = {}
+    if strict_mode:
+        for i, tx in enumerate(txs):
+            try:
+                txs[i] = strict(tx)
+            except Exception as exc:
+                errors[i] = str(exc)
+    for i, msg in validate_batch(txs).items():
+        errors.setdefault(i, msg)
+
+    if errors:
+        records[:] = [r for i, r in enumerate(records) if i not in errors]
+        txs = [tx for i, tx in enumerate(txs) if i not in errors]
+    if txs and canonical_json:
+        for record, tx, normalized in zip(records, txs, _canonical_batch(txs)):
+            record["provenance"]["normalized"] = normalized
+            record["normalized"] = dict(zip(COLUMN_FIELDS, _COLUMN_VALUES(tx)))
+    elif txs:
+        for record, tx in zip(records, txs):
+            record["normalized"] = dict(zip(COLUMN_FIELDS, _COLUMN_VALUES(tx)))
+    return [errors[i] for i in sorted(errors)]
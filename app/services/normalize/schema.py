@@ -43,3 +43,28 @@ class Transaction(BaseModel):
 
     class Config:
         json_encoders = {Decimal: lambda x: str(x)}
+
+
+# ``Transaction`` fields stored as columns of ``transaction_normalized``.
+COLUMN_FIELDS = (
+    "tx_id",
+    "tx_hash",
+    "datetime_utc",
+    "platform",
+    "account",
+    "chain",
+    "type",
+    "base_asset",
+    "base_qty",
+    "quote_asset",
+    "quote_qty",
+    "fee_asset",
+    "fee_qty",
+    "price_quote",
+    "note",
+)
+
+
+def to_columns(tx: Transaction) -> dict:
+    """Typed values for a ``transaction_normalized`` row."""
+    return {name: getattr(tx, name) for name in COLUMN_FIELDS}
@@ -1,3 +1,5 @@
+from .cache import series_cache
+from .providers import live_bnb, refresh_bnb_usd
 from .service import PriceService, PriceNotFound
 
-__all__ = ["PriceService", "PriceNotFound"]
+__all__ = ["PriceService", "PriceNotFound", "series_cache", "live_bnb", "refresh_bnb_usd"]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from .series import PriceSeries
+
+Key = Tuple[str, str, str]
+
+
+class SeriesCache:
+    """LRU cache of full per-(asset, quote) price series.
+
+    Entries are dropped by :meth:`invalidate` when new price points are
+    committed for that pair. A load that races with an invalidation is
+    returned to its caller but not cached.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Key, PriceSeries]" = OrderedDict()
+        self._generation: Dict[Tuple[str, str], int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, asset: str, quote: str, loader: Callable[[], PriceSeries], resolution: str = "") -> PriceSeries:
+        """Cached series for the pair; ``resolution`` keeps rollup series apart from raw ticks."""
+        pair = (asset, quote)
+        key = (asset, quote, resolution)
+        with self._lock:
+            series = self._data.get(key)
+            if series is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return series
+            self.misses += 1
+            generation = (self._epoch, self._generation.get(pair, 0))
+
+        series = loader()
+
+        with self._lock:
+            if self.maxsize > 0 and (self._epoch, self._generation.get(pair, 0)) == generation:
+                self._data[key] = series
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return series
+
+    def invalidate(self, asset: str, quote: Optional[str] = None) -> None:
+        """Drop every cached resolution of ``asset`` (only against ``quote`` when given)."""
+        with self._lock:
+            pairs = {k[:2] for k in (*self._data, *self._generation) if k[0] == asset}
+            if quote is not None:
+                pairs = {(asset, quote)}
+            for key in [k for k in self._data if k[:2] in pairs]:
+                del self._data[key]
+            for pair in pairs:
+                self._generation[pair] = self._generation.get(pair, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._epoch += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "points": sum(len(s) for s in self._data.values()),
+            }
+
+
+series_cache = SeriesCache(int(os.environ.get("PRICE_CACHE_SIZE", "256")))
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from app.db import SessionLocal
+from app.db.models import PricePoint
+from .cache import series_cache
+from .series import as_utc
+
+# How far from the requested timestamp a stored price may be.
+WINDOW = timedelta(days=1)
+
+# On refresh, ticks this far below the last seen ``price_point.id`` are read
+# again: ids handed to transactions that commit out of order would be skipped.
+REFRESH_OVERLAP = 1000
+
+Pair = Tuple[str, str]
+
+
+class Coverage:
+    """Sorted, disjoint ``[start, end]`` intervals (epoch seconds) with bisect lookup."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: float, end: float) -> None:
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i < j:
+            start = min(start, self.starts[i])
+            end = max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def covers(self, t: float) -> bool:
+        i = bisect_right(self.starts, t) - 1
+        return i >= 0 and t <= self.ends[i]
+
+    def gaps(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[float, float]]:
+        """Uncovered stretches between ``start`` and ``end`` (default: the covered span)."""
+        if not self.starts:
+            return [] if start is None or end is None else [(start, end)]
+        lo = self.starts[0] if start is None else start
+        hi = self.ends[-1] if end is None else end
+        gaps = []
+        cursor = lo
+        for s, e in zip(self.starts, self.ends):
+            if e < lo:
+                continue
+            if s > hi:
+                break
+            if s > cursor:
+                gaps.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < hi:
+            gaps.append((cursor, hi))
+        return gaps
+
+
+class CoverageIndex:
+    """In-memory map of where each (asset, quote) pair has a price within ``window``.
+
+    Every stored tick covers ``window`` either side of it. Built from
+    ``price_point`` on first use and extended as imports commit, so lookups
+    that cannot succeed are answered without loading any series. Before a
+    miss is reported the index checks ``max(price_point.id)`` and reads any
+    ticks written since, so ticks stored by other processes or by direct
+    inserts are picked up too, and drops the cached series of their pairs.
+    """
+
+    def __init__(self, window: timedelta = WINDOW):
+        self.window = window
+        self._pairs: Dict[Pair, Coverage] = {}
+        self._last_id = 0
+        self._loaded = False
+        self._loading = False
+        self._queued: List[Tuple[Pair, List[float]]] = []
+        self._lock = threading.Lock()
+
+    def _add(self, pair: Pair, times: Iterable[float]) -> None:
+        coverage = self._pairs.setdefault(pair, Coverage())
+        w = self.window.total_seconds()
+        for t in sorted(times):
+            coverage.add(t - w, t + w)
+
+    def _read(self, after: int) -> Tuple[Dict[Pair, List[float]], int]:
+        """Tick times per pair with ``id > after``, and the highest id read."""
+        times: Dict[Pair, List[float]] = {}
+        last_id = after
+        with SessionLocal() as session:
+            rows = session.execute(
+                select(PricePoint.asset, PricePoint.quote, PricePoint.dt_utc, PricePoint.id)
+                .where(PricePoint.id > after)
+                .execution_options(yield_per=10_000)
+            )
+            for asset, quote, dt, row_id in rows:
+                times.setdefault((asset, quote), []).append(as_utc(dt).timestamp())
+                last_id = max(last_id, row_id)
+        return times, last_id
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+        try:
+            times, last_id = self._read(0)
+        except Exception:
+            with self._lock:
+                self._loading = False
+            raise
+        with self._lock:
+            self._pairs = {}
+            for pair, stamps in times.items():
+                self._add(pair, stamps)
+            for pair, stamps in self._queued:
+                self._add(pair, stamps)
+            self._queued = []
+            self._last_id = last_id
+            # One critical section: an add() sees either loading or loaded.
+            self._loading = False
+            self._loaded = True
+
+    def refresh(self) -> None:
+        """Add ticks committed since the index last read ``price_point``."""
+        with SessionLocal() as session:
+            top = session.execute(select(func.max(PricePoint.id))).scalar() or 0
+        with self._lock:
+            if not self._loaded:
+                return
+            known = self._last_id
+        if top == known:
+            return
+        if top < known:
+            # Rows were deleted from the top: rebuild rather than guess.
+            self.clear()
+            series_cache.clear()
+            self._ensure_loaded()
+            return
+        times, last_id = self._read(max(known - REFRESH_OVERLAP, 0))
+        with self._lock:
+            for pair, stamps in times.items():
+                self._add(pair, stamps)
+            self._last_id = max(self._last_id, last_id)
+        for asset, quote in times:
+            series_cache.invalidate(asset, quote)
+
+    def add(self, asset: str, quote: str, times: Iterable[datetime]) -> None:
+        """Record newly committed ticks for the pair."""
+        stamps = [as_utc(dt).timestamp() for dt in times]
+        with self._lock:
+            if self._loading:
+                self._queued.append(((asset, quote), stamps))
+            elif self._loaded:
+                self._add((asset, quote), stamps)
+
+    def _covers(self, pair: Pair, timestamps: Sequence[datetime]) -> Optional[List[bool]]:
+        with self._lock:
+            if not self._loaded:
+                # Another thread is still building the index.
+                return None
+            coverage = self._pairs.get(pair)
+            if coverage is None:
+                return [False] * len(timestamps)
+            return [coverage.covers(as_utc(ts).timestamp()) for ts in timestamps]
+
+    def may_cover(self, asset: str, quote: str, timestamps: Sequence[datetime], window: timedelta) -> List[bool]:
+        """Per timestamp, ``False`` when no price within ``window`` can exist."""
+        if window > self.window:
+            return [True] * len(timestamps)
+        self._ensure_loaded()
+        covered = self._covers((asset, quote), timestamps)
+        if covered is not None and not all(covered):
+            self.refresh()
+            covered = self._covers((asset, quote), timestamps)
+        return [True] * len(timestamps) if covered is None else covered
+
+    def gaps(
+        self,
+        asset: Optional[str] = None,
+        quote: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Dict]:
+        """Stretches where lookups for a pair will miss, sorted by pair and time."""
+        self._ensure_loaded()
+        self.refresh()
+        lo = None if start is None else as_utc(start).timestamp()
+        hi = None if end is None else as_utc(end).timestamp()
+        result = []
+        with self._lock:
+            pairs = sorted(self._pairs.items())
+            if asset and quote and (asset, quote) not in self._pairs:
+                pairs = [((asset, quote), Coverage())]
+            for (a, q), coverage in pairs:
+                if (asset and a != asset) or (quote and q != quote):
+                    continue
+                for gap_start, gap_end in coverage.gaps(lo, hi):
+                    result.append({
+                        "asset": a,
+                        "quote": q,
+                        "start": datetime.fromtimestamp(gap_start, tz=timezone.utc),
+                        "end": datetime.fromtimestamp(gap_end, tz=timezone.utc),
+                        "seconds": gap_end - gap_start,
+                    })
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pairs = {}
+            self._last_id = 0
+            self._loaded = False
+            self._queued = []
+
+
+coverage_index = CoverageIndex()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Optional, Protocol
+
+from app.db import SessionLocal
+from app.db.models import PricePoint
+from .bscscan import BscScanPriceService
+from .cache import series_cache
+from .coverage import coverage_index
+from .rollup import apply_rollups
+
+
+class BnbUsdProvider(Protocol):
+    name: str
+
+    def get_bnb_price(self) -> Decimal:
+        ...
+
+
+class BscScanProvider:
+    name = "BSCSCAN"
+
+    def get_bnb_price(self) -> Decimal:
+        # Looked up on each call so tests can monkeypatch BscScanPriceService.
+        return Decimal(BscScanPriceService.get_bnb_price())
+
+
+class StubProvider:
+    """Fixed BNB/USD price for local runs and tests; no network access."""
+
+    name = "STUB"
+
+    def __init__(self, price: Decimal):
+        self.price = Decimal(price)
+
+    def get_bnb_price(self) -> Decimal:
+        return self.price
+
+
+class TTLCachedProvider:
+    """Reuses the wrapped provider's answer for ``ttl`` seconds."""
+
+    def __init__(self, provider: BnbUsdProvider, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.provider = provider
+        self.ttl = ttl
+        self._clock = clock
+        self._value: Optional[Decimal] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def get_bnb_price(self) -> Decimal:
+        with self._lock:
+            now = self._clock()
+            if self._value is None or now >= self._expires:
+                self._value = self.provider.get_bnb_price()
+                self._expires = now + self.ttl
+            return self._value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._value = None
+
+
+def _default_provider() -> BnbUsdProvider:
+    kind = os.environ.get("BNB_PRICE_PROVIDER", "bscscan").lower()
+    if kind == "stub":
+        return StubProvider(Decimal(os.environ.get("BNB_STUB_PRICE", "300")))
+    return BscScanProvider()
+
+
+live_bnb = TTLCachedProvider(_default_provider(), float(os.environ.get("BNB_PRICE_TTL", "60")))
+
+
+def set_provider(provider: BnbUsdProvider) -> None:
+    live_bnb.provider = provider
+    live_bnb.clear()
+
+
+def refresh_bnb_usd(provider: Optional[BnbUsdProvider] = None) -> PricePoint:
+    """Store the provider's current BNB/USD price as a point in the BNB/USD series."""
+    provider = provider or live_bnb.provider
+    point = PricePoint(
+        dt_utc=datetime.now(timezone.utc),
+        asset="BNB",
+        quote="USD",
+        price=provider.get_bnb_price(),
+        source=provider.name,
+    )
+    with SessionLocal() as session:
+        session.add(point)
+        apply_rollups(session, [{"dt_utc": point.dt_utc, "asset": "BNB", "quote": "USD", "price": point.price}])
+        session.commit()
+        session.refresh(point)
+        session.expunge(point)
+    coverage_index.add("BNB", "USD", [point.dt_utc])
+    series_cache.invalidate("BNB", "USD")
+    return point
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.db.models import PricePoint, PriceRollup
+from .series import PriceSeries, as_utc
+
+# Bucket widths in seconds, finest first.
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+Key = Tuple[str, str, str, datetime]
+
+
+def bucket_start(dt: datetime, seconds: int) -> datetime:
+    ts = int(as_utc(dt).timestamp())
+    return datetime.fromtimestamp(ts - ts % seconds, tz=timezone.utc)
+
+
+def resolution_for(tolerance: timedelta) -> Optional[str]:
+    """Coarsest resolution whose bucket width fits within ``tolerance``; ``None`` means raw ticks."""
+    fitting = [name for name, seconds in RESOLUTIONS.items() if seconds <= tolerance.total_seconds()]
+    return fitting[-1] if fitting else None
+
+
+def _merge(a: Dict, b: Dict) -> Dict:
+    first, last = (a, b) if a["first_dt"] <= b["first_dt"] else (b, a)
+    closing = b if b["last_dt"] >= a["last_dt"] else a
+    return {
+        **a,
+        "open": first["open"],
+        "first_dt": first["first_dt"],
+        "close": closing["close"],
+        "last_dt": closing["last_dt"],
+        "high": max(a["high"], b["high"]),
+        "low": min(a["low"], b["low"]),
+        "ticks": a["ticks"] + b["ticks"],
+    }
+
+
+def summarize(points: Iterable[Dict]) -> Dict[Key, Dict]:
+    """Fold ``price_point`` dicts into OHLC buckets for every resolution."""
+    buckets: Dict[Key, Dict] = {}
+    for p in points:
+        dt = as_utc(p["dt_utc"])
+        price = Decimal(p["price"])
+        for name, seconds in RESOLUTIONS.items():
+            key = (name, p["asset"], p["quote"], bucket_start(dt, seconds))
+            tick = {
+                "resolution": name,
+                "asset": p["asset"],
+                "quote": p["quote"],
+                "bucket_start": key[3],
+                "open": price,
+                "high": price,
+                "low": price,
+                "close": price,
+                "first_dt": dt,
+                "last_dt": dt,
+                "ticks": 1,
+            }
+            current = buckets.get(key)
+            buckets[key] = tick if current is None else _merge(current, tick)
+    return buckets
+
+
+def apply_rollups(session: Session, points: Iterable[Dict]) -> int:
+    """Merge newly stored ticks into ``price_rollup``; returns the buckets written.
+
+    Runs in the caller's transaction so ticks and their rollups commit together.
+    """
+    buckets = summarize(points)
+    if not buckets:
+        return 0
+    by_series: Dict[Tuple[str, str, str], List[datetime]] = {}
+    for name, asset, quote, start in buckets:
+        by_series.setdefault((name, asset, quote), []).append(start)
+    existing_ids = []
+    for (name, asset, quote), starts in by_series.items():
+        for i in range(0, len(starts), 500):
+            rows = session.execute(
+                select(PriceRollup.__table__).where(
+                    PriceRollup.resolution == name,
+                    PriceRollup.asset == asset,
+                    PriceRollup.quote == quote,
+                    PriceRollup.bucket_start.in_(starts[i:i + 500]),
+                )
+            ).mappings()
+            for row in rows:
+                stored = dict(row)
+                existing_ids.append(stored.pop("id"))
+                for col in ("bucket_start", "first_dt", "last_dt"):
+                    stored[col] = as_utc(stored[col])
+                key = (name, asset, quote, stored["bucket_start"])
+                buckets[key] = _merge(stored, buckets[key])
+    for i in range(0, len(existing_ids), 500):
+        session.execute(delete(PriceRollup).where(PriceRollup.id.in_(existing_ids[i:i + 500])))
+    session.execute(insert(PriceRollup), list(buckets.values()))
+    return len(buckets)
+
+
+def rebuild_rollups(session: Session, chunk_size: int = 10_000) -> int:
+    """Recompute ``price_rollup`` from every stored tick, committing per chunk.
+
+    Days thinned by :func:`prune_ticks` come back with the same OHLC values;
+    only their ``ticks`` counts drop to the ticks that were kept.
+    """
+    session.execute(delete(PriceRollup))
+    session.commit()
+    last_id = 0
+    total = 0
+    while True:
+        rows = session.execute(
+            select(PricePoint.id, PricePoint.dt_utc, PricePoint.asset, PricePoint.quote, PricePoint.price)
+            .where(PricePoint.id > last_id)
+            .order_by(PricePoint.id)
+            .limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        apply_rollups(session, rows)
+        session.commit()
+        total += len(rows)
+    return total
+
+
+def _redundant(rows: List) -> List[int]:
+    """Ids of ticks that are not the first, last, high or low of their minute."""
+    keep = set()
+    minutes: Dict[datetime, List] = {}
+    for row in rows:
+        minutes.setdefault(bucket_start(row.dt_utc, RESOLUTIONS["1m"]), []).append(row)
+    for ticks in minutes.values():
+        keep.update((
+            ticks[0].id,
+            ticks[-1].id,
+            max(ticks, key=lambda t: t.price).id,
+            min(ticks, key=lambda t: t.price).id,
+        ))
+    return [row.id for row in rows if row.id not in keep]
+
+
+def prune_ticks(session: Session, before: datetime, chunk_size: int = 10_000) -> int:
+    """Thin raw ticks of whole days before ``before`` down to each minute's OHLC ticks.
+
+    Every 1m bucket keeps its opening, closing, high and low tick, so the
+    rollups, raw lookups (to within a minute) and the coverage index are
+    unchanged while busy pairs shed most of their rows. Commits per chunk;
+    returns the ticks deleted. Callers must drop cached series afterwards.
+    """
+    cutoff = bucket_start(before, RESOLUTIONS["1d"])
+    pairs = session.execute(
+        select(PricePoint.asset, PricePoint.quote).where(PricePoint.dt_utc < cutoff).distinct()
+    ).all()
+    removed = 0
+    minute = RESOLUTIONS["1m"]
+    for asset, quote in pairs:
+        after = None
+        carry: List = []
+        while True:
+            query = select(PricePoint.id, PricePoint.dt_utc, PricePoint.price).where(
+                PricePoint.asset == asset,
+                PricePoint.quote == quote,
+                PricePoint.dt_utc < cutoff,
+            )
+            if after is not None:
+                query = query.where(tuple_(PricePoint.dt_utc, PricePoint.id) > after)
+            fetched = session.execute(query.order_by(PricePoint.dt_utc, PricePoint.id).limit(chunk_size)).all()
+            rows = carry + fetched
+            carry = []
+            if len(fetched) == chunk_size:
+                # The last minute may carry on into the next page: thin what is here
+                # and take its surviving ticks along.
+                last = bucket_start(rows[-1].dt_utc, minute)
+                carry = [r for r in rows if bucket_start(r.dt_utc, minute) == last]
+                rows = [r for r in rows if bucket_start(r.dt_utc, minute) != last]
+            ids = _redundant(rows)
+            dropped = set(_redundant(carry))
+            carry = [r for r in carry if r.id not in dropped]
+            ids.extend(dropped)
+            for i in range(0, len(ids), 500):
+                session.execute(delete(PricePoint).where(PricePoint.id.in_(ids[i:i + 500])))
+            session.commit()
+            removed += len(ids)
+            if not fetched:
+                break
+            after = (fetched[-1].dt_utc, fetched[-1].id)
+    return removed
+
+
+def load_rollup_series(session: Session, asset: str, quote: str, resolution: str) -> PriceSeries:
+    """Opening and closing ticks of each bucket, at their actual times."""
+    rows = session.execute(
+        select(PriceRollup.first_dt, PriceRollup.open, PriceRollup.last_dt, PriceRollup.close).where(
+            PriceRollup.resolution == resolution,
+            PriceRollup.asset == asset,
+            PriceRollup.quote == quote,
+        )
+    )
+    points = []
+    for first_dt, open_, last_dt, close in rows:
+        points.append((first_dt, open_))
+        if last_dt != first_dt:
+            points.append((last_dt, close))
+    return PriceSeries(points)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import PricePoint
+
+
+def as_utc(dt: datetime) -> datetime:
+    """SQLite hands back naive datetimes; treat them (and naive inputs) as UTC."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class PriceSeries:
+    """Time-sorted prices for one asset/quote pair with nearest-point lookup."""
+
+    __slots__ = ("times", "prices")
+
+    def __init__(self, points: Iterable[Tuple[datetime, Decimal]]):
+        ordered = sorted((as_utc(dt).timestamp(), Decimal(price)) for dt, price in points)
+        self.times: List[float] = [t for t, _ in ordered]
+        self.prices: List[Decimal] = [p for _, p in ordered]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def nearest_index(self, ts: datetime, window: timedelta) -> Optional[int]:
+        """Index of the point closest to ``ts`` within ``window``; earlier point wins ties."""
+        times = self.times
+        t = as_utc(ts).timestamp()
+        i = bisect_left(times, t)
+        best = None
+        if i > 0:
+            best = i - 1
+        if i < len(times) and (best is None or times[i] - t < t - times[best]):
+            best = i
+        if best is None or abs(times[best] - t) > window.total_seconds():
+            return None
+        return best
+
+    def nearest(self, ts: datetime, window: timedelta) -> Optional[Decimal]:
+        idx = self.nearest_index(ts, window)
+        return None if idx is None else self.prices[idx]
+
+    def nearest_many(self, timestamps: Iterable[datetime], window: timedelta) -> List[Optional[Decimal]]:
+        return [self.nearest(ts, window) for ts in timestamps]
+
+
+def load_series(
+    session: Session,
+    asset: str,
+    quote: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> PriceSeries:
+    query = (
+        select(PricePoint.dt_utc, PricePoint.price)
+        .where(PricePoint.asset == asset)
+        .where(PricePoint.quote == quote)
+    )
+    if start is not None:
+        query = query.where(PricePoint.dt_utc >= start)
+    if end is not None:
+        query = query.where(PricePoint.dt_utc <= end)
+    return PriceSeries(session.execute(query))
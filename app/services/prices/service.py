@@ -1,58 +1,155 @@
 from __future__ import annotations
 
 import logging
+import time
+from collections import defaultdict
 from datetime import datetime, timedelta
 from decimal import Decimal
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 from app.db import SessionLocal
-from app.db.models import PricePoint
-from .bscscan import BscScanPriceService
+from app.metrics import registry
+from .cache import series_cache
+from .coverage import WINDOW, coverage_index
+from .providers import live_bnb
+from .rollup import load_rollup_series, resolution_for
+from .series import PriceSeries, as_utc, load_series
 
 
 class PriceNotFound(Exception):
     pass
 
 
+def _series(asset: str, quote: str, resolution: Optional[str] = None) -> PriceSeries:
+    def load() -> PriceSeries:
+        start = time.perf_counter()
+        with SessionLocal() as session:
+            if resolution is None:
+                series = load_series(session, asset, quote)
+            else:
+                series = load_rollup_series(session, asset, quote, resolution)
+        registry.observe("gcc_price_series_load_seconds", time.perf_counter() - start, resolution=resolution or "raw")
+        return series
+
+    return series_cache.get(asset, quote, load, resolution or "")
+
+
 class PriceService:
     @staticmethod
-    def get_usd(asset: str, ts: datetime) -> Decimal:
-        session = SessionLocal()
-        start = ts - timedelta(days=1)
-        end = ts + timedelta(days=1)
-        points = (
-            session.query(PricePoint)
-            .filter(PricePoint.asset == asset)
-            .filter(PricePoint.quote == "USD")
-            .filter(PricePoint.dt_utc >= start)
-            .filter(PricePoint.dt_utc <= end)
-            .all()
-        )
-        if points:
-            chosen = min(points, key=lambda p: abs(p.dt_utc - ts))
-            logging.info("price-source=csv asset=%s ts=%s", asset, chosen.dt_utc)
-            session.close()
-            return Decimal(chosen.price)
+    def get_usd(asset: str, ts: datetime, tolerance: Optional[timedelta] = None) -> Decimal:
+        price = PriceService.get_usd_many(asset, [ts], tolerance)[0]
+        if price is None:
+            raise PriceNotFound(f"{asset} @ {ts}")
+        return price
+
+    @staticmethod
+    def get_usd_many(
+        asset: str,
+        timestamps: Sequence[datetime],
+        tolerance: Optional[timedelta] = None,
+        live: bool = True,
+    ) -> List[Optional[Decimal]]:
+        """USD prices for ``asset`` at each timestamp, in input order.
+
+        Applies the same chain as :meth:`get_usd`: the USD series, then for
+        BNB itself the live price, otherwise the BNB-quoted series times the
+        BNB/USD price nearest the same timestamp (no price when the BNB/USD
+        series has nothing within the window). Series come from the
+        in-process ``series_cache``, so each is read from the database at
+        most once until a DexScreener import invalidates it. Timestamps
+        outside ``coverage_index`` skip the series entirely. Timestamps
+        without a price come back as ``None``.
+
+        ``live=False`` leaves BNB without a stored price unpriced instead of
+        asking the live provider, for callers that price history.
+
+        With a ``tolerance`` only prices at most that far away are used (so
+        BNB never falls back to the live price), and they are read from the
+        coarsest OHLC rollup whose buckets fit within it (see
+        :mod:`app.services.prices.rollup`) instead of raw ticks.
+        """
+        if not timestamps:
+            return []
+        start = time.perf_counter()
+        results = PriceService._lookup(asset, timestamps, tolerance, live)
+        registry.observe("gcc_price_lookup_seconds", time.perf_counter() - start)
+        misses = sum(price is None for price in results)
+        if misses:
+            registry.inc("gcc_price_lookups_total", misses, source="miss")
+        return results
+
+    @staticmethod
+    def _lookup(
+        asset: str,
+        timestamps: Sequence[datetime],
+        tolerance: Optional[timedelta],
+        live: bool,
+    ) -> List[Optional[Decimal]]:
+        stamps = [as_utc(ts) for ts in timestamps]
+        window = WINDOW if tolerance is None else tolerance
+        resolution = None if tolerance is None else resolution_for(tolerance)
+
+        results: List[Optional[Decimal]] = [None] * len(stamps)
+        covered = coverage_index.may_cover(asset, "USD", stamps, window)
+        if any(covered):
+            usd = _series(asset, "USD", resolution)
+            results = [usd.nearest(ts, window) if ok else None for ts, ok in zip(stamps, covered)]
+            hits = sum(price is not None for price in results)
+            if hits:
+                logging.info("price-source=csv asset=%s hits=%d", asset, hits)
+                registry.inc("gcc_price_lookups_total", hits, source="csv")
+        missing = [i for i, price in enumerate(results) if price is None]
+        if not missing:
+            return results
 
         if asset.upper() == "BNB":
-            price = BscScanPriceService.get_bnb_price()
-            logging.info("price-source=live-bscscan asset=BNB")
-            session.close()
-            return price
-
-        points = (
-            session.query(PricePoint)
-            .filter(PricePoint.asset == asset)
-            .filter(PricePoint.quote == "BNB")
-            .filter(PricePoint.dt_utc >= start)
-            .filter(PricePoint.dt_utc <= end)
-            .all()
-        )
-        session.close()
-        if points:
-            chosen = min(points, key=lambda p: abs(p.dt_utc - ts))
-            bnb_usd = BscScanPriceService.get_bnb_price()
-            price_usd = Decimal(chosen.price) * Decimal(bnb_usd)
-            logging.info("price-source=csv-bnb asset=%s ts=%s", asset, chosen.dt_utc)
-            return price_usd
-
-        raise PriceNotFound(f"{asset} @ {ts}")
+            if tolerance is not None or not live:
+                # The live price is only "close" to now, never to a historical timestamp.
+                return results
+            price = live_bnb.get_bnb_price()
+            logging.info("price-source=live-bscscan asset=BNB hits=%d", len(missing))
+            registry.inc("gcc_price_lookups_total", len(missing), source="live")
+            for i in missing:
+                results[i] = price
+            return results
+
+        covered = coverage_index.may_cover(asset, "BNB", [stamps[i] for i in missing], window)
+        missing = [i for i, ok in zip(missing, covered) if ok]
+        if not missing:
+            return results
+        in_bnb = _series(asset, "BNB", resolution)
+        hits = [(i, in_bnb.nearest(stamps[i], window)) for i in missing]
+        hits = [(i, price) for i, price in hits if price is not None]
+        if hits:
+            bnb_usd = _series("BNB", "USD", resolution)
+            converted = 0
+            for i, price in hits:
+                # Today's BNB/USD would misprice history: without a rate nearby the row stays unpriced.
+                rate = bnb_usd.nearest(stamps[i], window)
+                if rate is not None:
+                    results[i] = Decimal(price) * Decimal(rate)
+                    converted += 1
+            logging.info(
+                "price-source=csv-bnb asset=%s hits=%d without-bnb-usd=%d", asset, converted, len(hits) - converted
+            )
+            if converted:
+                registry.inc("gcc_price_lookups_total", converted, source="csv-bnb")
+        return results
+
+    @staticmethod
+    def get_usd_batch(
+        items: Iterable[Tuple[str, datetime]],
+        tolerance: Optional[timedelta] = None,
+        live: bool = True,
+    ) -> List[Optional[Decimal]]:
+        """Multi-asset :meth:`get_usd_many`: one series load per asset, input order kept."""
+        items = list(items)
+        by_asset = defaultdict(list)
+        for pos, (asset, ts) in enumerate(items):
+            by_asset[asset].append((pos, ts))
+        results: List[Optional[Decimal]] = [None] * len(items)
+        for asset, entries in by_asset.items():
+            prices = PriceService.get_usd_many(asset, [ts for _, ts in entries], tolerance, live)
+            for (pos, _), price in zip(entries, prices):
+                results[pos] = price
+        return results
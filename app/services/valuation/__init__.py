@@ -0,0 +1,3 @@
+from .engine import asset_totals, value_transactions
+
+__all__ = ["value_transactions", "asset_totals"]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.db.models import TransactionNormalized, TransactionValuation
+from app.services.ingest.bulk import CHUNK_SIZE, insert_ignoring_conflicts
+from app.services.prices import PriceService
+
+
+def _filters(model, batch_id: Optional[int], start: Optional[datetime], end: Optional[datetime]) -> list:
+    filters = []
+    if batch_id is not None:
+        filters.append(model.import_batch_id == batch_id)
+    if start is not None:
+        filters.append(model.datetime_utc >= start)
+    if end is not None:
+        filters.append(model.datetime_utc < end)
+    return filters
+
+
+def _value_chunk(rows) -> List[Dict]:
+    by_asset = defaultdict(list)
+    for row in rows:
+        by_asset[row.base_asset].append(row)
+    values = []
+    for asset, group in by_asset.items():
+        # Today's live BNB price would be stored as a historical valuation.
+        prices = PriceService.get_usd_many(asset, [r.datetime_utc for r in group], live=False)
+        for row, price in zip(group, prices):
+            qty = Decimal(row.base_qty)
+            values.append({
+                "row_hash": row.row_hash,
+                "import_batch_id": row.import_batch_id,
+                "datetime_utc": row.datetime_utc,
+                "asset": asset,
+                "qty": qty,
+                "price_usd": price,
+                "value_usd": None if price is None else qty * Decimal(price),
+            })
+    return values
+
+
+def value_transactions(
+    batch_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    refresh: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Value the selected transactions that have no stored valuation yet.
+
+    Rows stored without a price are retried; ``refresh`` revalues the whole
+    selection, e.g. after importing prices for an earlier period. Prices are
+    resolved per asset from stored prices only (no live fallback) with
+    :meth:`PriceService.get_usd_many`; rows without one are stored unpriced.
+    Each chunk is committed on its own. Returns the number of rows (re)valued.
+    """
+    valued = 0
+    last_id = 0
+    with SessionLocal() as session:
+        if refresh:
+            selected = select(TransactionNormalized.row_hash).where(
+                *_filters(TransactionNormalized, batch_id, start, end)
+            )
+            session.execute(delete(TransactionValuation).where(TransactionValuation.row_hash.in_(selected)))
+            session.commit()
+        while True:
+            rows = session.execute(
+                select(
+                    TransactionNormalized.id,
+                    TransactionNormalized.row_hash,
+                    TransactionNormalized.import_batch_id,
+                    TransactionNormalized.datetime_utc,
+                    TransactionNormalized.base_asset,
+                    TransactionNormalized.base_qty,
+                )
+                .outerjoin(TransactionValuation, TransactionValuation.row_hash == TransactionNormalized.row_hash)
+                .where(TransactionNormalized.id > last_id)
+                .where(TransactionNormalized.base_asset.is_not(None), TransactionNormalized.base_qty.is_not(None))
+                .where(or_(TransactionValuation.id.is_(None), TransactionValuation.price_usd.is_(None)))
+                .where(*_filters(TransactionNormalized, batch_id, start, end))
+                .order_by(TransactionNormalized.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            # Resolve prices before writing: series loads use their own sessions.
+            values = _value_chunk(rows)
+            hashes = [r.row_hash for r in rows]
+            session.execute(delete(TransactionValuation).where(TransactionValuation.row_hash.in_(hashes)))
+            insert_ignoring_conflicts(session, TransactionValuation.__table__, values)
+            session.commit()
+            valued += len(rows)
+    return valued
+
+
+def asset_totals(
+    session: Session,
+    batch_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Dict]:
+    """Per-asset quantity and USD totals over stored valuations."""
+    rows = session.execute(
+        select(
+            TransactionValuation.asset,
+            func.count(TransactionValuation.id).label("transactions"),
+            (func.count(TransactionValuation.id) - func.count(TransactionValuation.price_usd)).label("unpriced"),
+            func.sum(TransactionValuation.qty).label("qty"),
+            func.sum(TransactionValuation.value_usd).label("value_usd"),
+        )
+        .where(*_filters(TransactionValuation, batch_id, start, end))
+        .group_by(TransactionValuation.asset)
+        .order_by(TransactionValuation.asset)
+    ).all()
+    return [dict(r._mapping) for r in rows]
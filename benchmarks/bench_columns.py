@@ -0,0 +1,77 @@
+"""Column access: DictReader + ``row.get(...) or ...`` chains vs. csv.reader + compiled Columns.
+
+Reads the fields the wallet parser hashes from a generated BscScan export,
+without timestamp parsing or hashing, so only the per-row column cost is
+compared. Run from the repository root::
+
+    python -m benchmarks.bench_columns --rows 200000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.ingest.registry import Columns, CsvTable
+from app.services.ingest.wallet_tx_csv import COLUMNS
+
+from .generators import write_wallet_csv
+
+
+def dict_reader(text: str) -> int:
+    n = 0
+    for row in csv.DictReader(io.StringIO(text)):
+        (
+            row.get("UnixTimestamp") or row.get("DateTime") or row.get("timestamp") or row.get("timeStamp"),
+            row.get("Value") or row.get("value") or row.get("TokenValue") or row.get("token_value") or "0",
+            row.get("Txhash") or row.get("hash") or row.get("tx_hash"),
+            row.get("From"),
+            row.get("To"),
+            row.get("TokenSymbol"),
+            row,
+        )
+        n += 1
+    return n
+
+
+def compiled(text: str, payload: bool) -> int:
+    n = 0
+    table = CsvTable(io.StringIO(text))
+    col = Columns(table.header, COLUMNS)
+    get_ts, get_value, get_hash = col["timestamp"], col["value"], col["tx_hash"]
+    get_from, get_to, get_symbol = col["from"], col["to"], col["token_symbol"]
+    record = table.record if payload else tuple
+    for row in table:
+        (get_ts(row), get_value(row) or "0", get_hash(row), get_from(row), get_to(row), get_symbol(row), record(row))
+        n += 1
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "wallet.csv"
+        write_wallet_csv(path, args.rows)
+        text = path.read_text()
+
+    base = None
+    for label, fn in (
+        ("DictReader + or-chains", lambda: dict_reader(text)),
+        ("csv.reader + Columns + raw record", lambda: compiled(text, True)),
+        ("csv.reader + Columns", lambda: compiled(text, False)),
+    ):
+        start = time.perf_counter()
+        rows = fn()
+        elapsed = time.perf_counter() - start
+        per_row = elapsed / rows * 1e6
+        base = base or per_row
+        print(f"{label:<36} {rows / elapsed:>10.0f} rows/s {per_row:>6.2f} us/row ({base - per_row:+.2f} saved)")
+
+
+if __name__ == "__main__":
+    main()
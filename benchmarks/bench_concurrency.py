@@ -0,0 +1,89 @@
+"""Import and price-lookup throughput with N threads on a file-backed database.
+
+Run from the repository root (defaults to a temporary SQLite file)::
+
+    python -m benchmarks.bench_concurrency --threads 1 2 4 8
+    DATABASE_URL=postgresql://... python -m benchmarks.bench_concurrency
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_tmp) / 'bench.db'}")
+# Every lookup should reach the database, not the in-process series cache.
+os.environ.setdefault("PRICE_CACHE_SIZE", "0")
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.db.models import Base, ImportBatch, PricePoint  # noqa: E402
+from app.services.ingest import token_tx_csv  # noqa: E402
+from app.services.prices import PriceService  # noqa: E402
+
+from .bench_ingest import write_token_csv  # noqa: E402
+
+START = datetime(2023, 9, 1, tzinfo=timezone.utc)
+
+
+def _reset() -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as session:
+        session.add_all(
+            PricePoint(dt_utc=START + timedelta(hours=h), asset="TKN", quote="USD", price=1 + h / 100, source="BENCH")
+            for h in range(24 * 30)
+        )
+        session.commit()
+
+
+def _import(path: Path) -> int:
+    with SessionLocal() as session:
+        batch = ImportBatch(source="TOKEN_CSV", file_name=path.name)
+        session.add(batch)
+        session.commit()
+        batch_id = batch.id
+    with open(path) as f:
+        return token_tx_csv.parse(f, batch_id)["rows_ok"]
+
+
+def _lookups(n: int) -> int:
+    for i in range(n):
+        PriceService.get_usd("TKN", START + timedelta(minutes=37 * i))
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--rows", type=int, default=5_000, help="rows per import file")
+    ap.add_argument("--lookups", type=int, default=500, help="lookups per thread")
+    args = ap.parse_args()
+    print(f"database: {engine.url}")
+
+    for threads in args.threads:
+        _reset()
+        paths = []
+        for n in range(threads):
+            path = Path(_tmp) / f"token-{threads}-{n}.csv"
+            write_token_csv(path, args.rows, seed=n)
+            paths.append(path)
+
+        with ThreadPoolExecutor(threads) as pool:
+            start = time.perf_counter()
+            rows = sum(pool.map(_import, paths))
+            import_rate = rows / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            done = sum(pool.map(_lookups, [args.lookups] * threads))
+            lookup_rate = done / (time.perf_counter() - start)
+
+        print(f"threads={threads:<3} import {import_rate:>9.0f} rows/s   lookups {lookup_rate:>8.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
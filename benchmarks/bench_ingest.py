@@ -0,0 +1,108 @@
+"""Rows/sec for the token and wallet CSV parsers.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_ingest --rows 50000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.db.models import Base, ImportBatch  # noqa: E402
+from app.services.ingest import token_tx_csv, wallet_tx_csv  # noqa: E402
+
+
+def write_token_csv(path: Path, rows: int, seed: int = 1) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        f.write("timestamp,tx_hash,from,to,value,token_symbol,token_contract\n")
+        for i in range(rows):
+            f.write(
+                f"2023-09-01T{i % 24:02d}:{i % 60:02d}:{rnd.randrange(60):02d}Z,"
+                f"0x{i:064x},0xfrom{i % 97},0xto{i % 89},{rnd.random() * 100:.6f},TKN,0xcontract\n"
+            )
+
+
+def write_wallet_csv(path: Path, rows: int, seed: int = 2) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        f.write("Txhash,UnixTimestamp,DateTime,From,To,Value,TokenSymbol\n")
+        for i in range(rows):
+            ts = 1693526400 + i * 7
+            f.write(
+                f"0x{i:064x},{ts},{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts))},"
+                f"0xfrom{i % 97},0xto{i % 89},{rnd.random() * 10:.6f},BNB\n"
+            )
+
+
+def write_wallet_files(tmp: Path, files: int, rows: int) -> list:
+    paths = []
+    for n in range(files):
+        path = tmp / f"wallet-{n}.csv"
+        # A different seed gives different values, hence distinct row hashes.
+        write_wallet_csv(path, rows, seed=100 + n)
+        paths.append(str(path))
+    return paths
+
+
+def _batch(source: str) -> int:
+    with SessionLocal() as session:
+        batch = ImportBatch(source=source, file_name="bench")
+        session.add(batch)
+        session.commit()
+        return batch.id
+
+
+def _run(label: str, rows: int, fn) -> None:
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} rows_ok={result['rows_ok']:<8} {rows / elapsed:>10.0f} rows/s ({elapsed:.2f}s)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--files", type=int, default=4, help="wallet files for the serial/parallel comparison")
+    args = ap.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with tempfile.TemporaryDirectory() as tmp:
+        token_path = Path(tmp) / "token.csv"
+        wallet_path = Path(tmp) / "wallet.csv"
+        write_token_csv(token_path, args.rows)
+        write_wallet_csv(wallet_path, args.rows)
+
+        with open(token_path) as f:
+            _run("token (fresh)", args.rows, lambda: token_tx_csv.parse(f, _batch("TOKEN_CSV")))
+        with open(token_path) as f:
+            _run("token (all duplicate)", args.rows, lambda: token_tx_csv.parse(f, _batch("TOKEN_CSV")))
+        with open(wallet_path) as f:
+            _run("wallet (fresh)", args.rows, lambda: wallet_tx_csv.parse([f], _batch("WALLET_CSV")))
+        with open(wallet_path) as f:
+            _run("wallet (all duplicate)", args.rows, lambda: wallet_tx_csv.parse([f], _batch("WALLET_CSV")))
+
+        paths = write_wallet_files(Path(tmp), args.files, args.rows)
+        total = args.files * args.rows
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        files = [open(p) for p in paths]
+        _run(f"wallet {args.files} files serial", total, lambda: wallet_tx_csv.parse(files, _batch("WALLET_CSV")))
+        for f in files:
+            f.close()
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        _run(f"wallet {args.files} files parallel", total, lambda: wallet_tx_csv.parse_parallel(paths, _batch("WALLET_CSV")))
+
+
+if __name__ == "__main__":
+    main()
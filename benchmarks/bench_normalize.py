@@ -0,0 +1,64 @@
+"""Normalization: per-row pydantic round-trip vs. batched NormalizedTx records.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_normalize --rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import warnings
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.services.ingest.bulk import CHUNK_SIZE
+from app.services.normalize.records import NormalizedTx, finalize
+from app.services.normalize.schema import Transaction
+
+START = datetime(2023, 9, 1, tzinfo=timezone.utc)
+
+
+def _rows(n: int):
+    return [(f"0x{i:064x}", START + timedelta(seconds=i), Decimal(i) / 7) for i in range(n)]
+
+
+def pydantic_per_row(rows) -> None:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for tx_hash, dt, qty in rows:
+            tx = Transaction(tx_hash=tx_hash, datetime_utc=dt, type="TRANSFER", base_asset="TKN",
+                             base_qty=qty, provenance={"source": "bench"})
+            json.loads(tx.json())
+
+
+def batched(rows, strict: bool = False) -> None:
+    for start in range(0, len(rows), CHUNK_SIZE):
+        records = [
+            {"provenance": {}, "tx": NormalizedTx(tx_hash=h, datetime_utc=dt, type="TRANSFER", base_asset="TKN",
+                                                  base_qty=qty, provenance={"source": "bench"})}
+            for h, dt, qty in rows[start:start + CHUNK_SIZE]
+        ]
+        finalize(records, strict_mode=strict)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+    rows = _rows(args.rows)
+
+    for label, fn in (
+        ("pydantic per row + json round-trip", lambda: pydantic_per_row(rows)),
+        ("batched NormalizedTx", lambda: batched(rows)),
+        ("batched NormalizedTx, strict mode", lambda: batched(rows, strict=True)),
+    ):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<38} {args.rows / elapsed:>10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Ingest and price-lookup benchmark suite with stored baselines.
+
+Generates seeded BscScan/DexScreener exports (see ``benchmarks.generators``),
+then reports rows/sec, database time and peak RSS growth per stage. Run from
+the repository root::
+
+    python -m benchmarks.bench_suite --size 10k --save-baseline
+    python -m benchmarks.bench_suite --size 10k      # exits 1 on a regression
+
+Baselines are machine specific and kept in ``benchmarks/baselines.json``
+(not committed).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_tmp) / 'bench.db'}")
+
+from sqlalchemy import event  # noqa: E402
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.db.models import Base, ImportBatch  # noqa: E402
+from app.services.ingest import dexscreener_csv, token_tx_csv, wallet_tx_csv  # noqa: E402
+from app.services.ingest.dedup import dedup_index  # noqa: E402
+from app.services.prices import PriceService, series_cache  # noqa: E402
+from app.services.prices.coverage import coverage_index  # noqa: E402
+
+from .generators import START, TOKENS, write_dexscreener_csv, write_token_csv, write_wallet_csv  # noqa: E402
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BASELINES = Path(__file__).with_name("baselines.json")
+# Peak memory growth below this many MB is noise, whatever the baseline says.
+MEMORY_SLACK_MB = 10.0
+
+
+class DbTimer:
+    """Wall time spent inside DBAPI ``execute`` calls on the engine."""
+
+    def __init__(self, bind) -> None:
+        self.seconds = 0.0
+        self.statements = 0
+        self._local = threading.local()
+        event.listen(bind, "before_cursor_execute", self._before)
+        event.listen(bind, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self._local.start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.seconds += time.perf_counter() - self._local.start
+        self.statements += 1
+
+    def reset(self) -> None:
+        self.seconds = 0.0
+        self.statements = 0
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+class PeakRss:
+    """Samples resident memory in a background thread; Linux only."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.start = self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_mb())
+
+    def __enter__(self) -> "PeakRss":
+        self.start = self.peak = _rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_mb())
+
+    @property
+    def growth_mb(self) -> float:
+        return self.peak - self.start
+
+
+def _batch(source: str) -> int:
+    with SessionLocal() as session:
+        batch = ImportBatch(source=source, file_name="bench")
+        session.add(batch)
+        session.commit()
+        return batch.id
+
+
+def _stage(name: str, rows: int, fn: Callable[[], object], timer: DbTimer) -> Dict:
+    timer.reset()
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        outcome = fn()
+        elapsed = time.perf_counter() - start
+    result = {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1),
+        "db_seconds": round(timer.seconds, 3),
+        "db_statements": timer.statements,
+        "peak_mb": round(rss.growth_mb, 1),
+    }
+    if isinstance(outcome, dict):
+        result["rows_ok"] = outcome["rows_ok"]
+        result["rows_error"] = outcome["rows_error"]
+    print(
+        f"{name:<18} {result['rows_per_sec']:>11.0f} rows/s  {elapsed:>8.2f}s  "
+        f"db {timer.seconds:>7.2f}s/{timer.statements:<7} peak +{rss.growth_mb:.1f}MB  "
+        f"ok={result.get('rows_ok', '-')} errors={result.get('rows_error', '-')}"
+    )
+    return result
+
+
+def _parse(module, path: Path, source: str) -> Callable[[], object]:
+    def run():
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return module.parse([f] if module is wallet_tx_csv else f, _batch(source))
+
+    return run
+
+
+def _lookups(rows: int, seed: int = 4) -> List:
+    rnd = random.Random(seed)
+    start = datetime.fromtimestamp(START, tz=timezone.utc)
+    span = rows * 2
+    return [(rnd.choice(TOKENS), start + timedelta(seconds=rnd.randrange(span))) for _ in range(rows)]
+
+
+def run(rows: int, tmp: Path) -> Dict[str, Dict]:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    dedup_index.reset()
+    coverage_index.clear()
+    series_cache.clear()
+
+    token_path, wallet_path, dex_path = tmp / "token.csv", tmp / "wallet.csv", tmp / "dex.csv"
+    write_token_csv(token_path, rows)
+    write_wallet_csv(wallet_path, rows)
+    write_dexscreener_csv(dex_path, rows)
+    items = _lookups(rows)
+
+    timer = DbTimer(engine)
+    results = {}
+    results["token"] = _stage("token", rows, _parse(token_tx_csv, token_path, "TOKEN_CSV"), timer)
+    results["token_reimport"] = _stage("token_reimport", rows, _parse(token_tx_csv, token_path, "TOKEN_CSV"), timer)
+    results["wallet"] = _stage("wallet", rows, _parse(wallet_tx_csv, wallet_path, "WALLET_CSV"), timer)
+    results["dexscreener"] = _stage("dexscreener", rows, _parse(dexscreener_csv, dex_path, "DEXSCREENER_CSV"), timer)
+    results["prices"] = _stage("prices", rows, lambda: PriceService.get_usd_batch(items), timer)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` beyond ``tolerance`` (a fraction)."""
+    failures = []
+    for stage, base in baseline.items():
+        current = results.get(stage)
+        if current is None:
+            continue
+        floor = base["rows_per_sec"] * (1 - tolerance)
+        if current["rows_per_sec"] < floor:
+            failures.append(f"{stage}: {current['rows_per_sec']:.0f} rows/s < {floor:.0f} (baseline {base['rows_per_sec']:.0f})")
+        ceiling = max(base["peak_mb"] * (1 + tolerance), base["peak_mb"] + MEMORY_SLACK_MB)
+        if current["peak_mb"] > ceiling:
+            failures.append(f"{stage}: peak +{current['peak_mb']:.1f}MB > {ceiling:.1f}MB (baseline {base['peak_mb']:.1f})")
+    return failures
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", choices=sorted(SIZES), default="10k")
+    ap.add_argument("--rows", type=int, help="override the row count of --size")
+    ap.add_argument("--baselines", type=Path, default=BASELINES)
+    ap.add_argument("--save-baseline", action="store_true", help="record this run as the baseline for --size")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown / memory growth, as a fraction")
+    args = ap.parse_args()
+
+    rows = args.rows or SIZES[args.size]
+    key = args.size if args.rows is None else str(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(rows, Path(tmp))
+
+    baselines = json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+    if args.save_baseline:
+        baselines[key] = results
+        args.baselines.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"saved baseline {key!r} to {args.baselines}")
+        return
+    if key not in baselines:
+        print(f"no baseline for {key!r}; run with --save-baseline first")
+        return
+    failures = compare(results, baselines[key], args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"no regressions against baseline {key!r} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
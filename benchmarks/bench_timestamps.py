@@ -0,0 +1,57 @@
+"""Timestamp parsing: dateutil per row vs. TimestampParser.
+
+Uses the formats found in ``tests/fixtures/``. Run from the repository root::
+
+    python -m benchmarks.bench_timestamps --rows 100000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import time
+from pathlib import Path
+
+from app.services.ingest.timestamps import TimestampParser, parse_any
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+COLUMNS = [
+    ("token_tx_sample.csv", "timestamp"),
+    ("dexscreener_sample.csv", "timestamp"),
+    ("wallet_tx_sample_normal.csv", "DateTime"),
+    ("wallet_tx_sample_normal.csv", "UnixTimestamp"),
+]
+
+
+def _values(name: str, column: str, rows: int) -> list:
+    with open(FIXTURES / name, newline="") as f:
+        sample = [row[column] for row in csv.DictReader(f)]
+    return (sample * (rows // len(sample) + 1))[:rows]
+
+
+def _rate(fn, values) -> float:
+    start = time.perf_counter()
+    for v in values:
+        fn(v)
+    return len(values) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+
+    for name, column in COLUMNS:
+        values = _values(name, column, args.rows)
+        parser = TimestampParser()
+        fast = _rate(parser, values)
+        slow = _rate(parse_any, values) if column != "UnixTimestamp" else None
+        label = f"{name}:{column} ({parser.format})"
+        if slow:
+            print(f"{label:<52} dateutil {slow:>9.0f}/s  fast {fast:>9.0f}/s  x{fast / slow:.1f}")
+        else:
+            print(f"{label:<52} dateutil       n/a    fast {fast:>9.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
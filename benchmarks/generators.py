@@ -0,0 +1,118 @@
+"""Seeded generators for realistic BscScan and DexScreener CSV exports.
+
+Every generator streams rows to disk, so 10M-row files need no more memory
+than 10k-row ones. ``dup_rate`` repeats an earlier row verbatim,
+``bad_rate`` corrupts a value so the parser must reject the row, and
+``mixed_rate`` writes a timestamp in a different format from the rest of
+the file (as hand-edited exports do).
+"""
+from __future__ import annotations
+
+import random
+import time
+from pathlib import Path
+from typing import Callable, List
+
+START = 1693526400  # 2023-09-01T00:00:00Z
+
+TOKENS = ["TKN", "ALT", "CAKE", "BUSD", "XVS", "ALPACA", "BAKE", "TWT"]
+
+
+def _iso_z(ts: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def _space_offset(ts: int) -> str:
+    # Same instant written in UTC+02:00.
+    return time.strftime("%Y-%m-%d %H:%M:%S+02:00", time.gmtime(ts + 7200))
+
+
+def _epoch(ts: int) -> str:
+    return str(ts)
+
+
+def _human(ts: int) -> str:
+    # Only dateutil understands this one: exercises the slow fallback.
+    return time.strftime("%d %b %Y %H:%M:%S", time.gmtime(ts))
+
+
+TIMESTAMP_FORMATS: List[Callable[[int], str]] = [_iso_z, _space_offset, _epoch, _human]
+
+
+def _stamp(rnd: random.Random, ts: int, seed: int, mixed_rate: float) -> str:
+    if rnd.random() < mixed_rate:
+        return rnd.choice(TIMESTAMP_FORMATS)(ts)
+    return TIMESTAMP_FORMATS[seed % 3](ts)
+
+
+def _write(path: Path, header: str, rows: int, seed: int, dup_rate: float, row: Callable) -> None:
+    rnd = random.Random(seed)
+    recent: List[str] = []
+    with open(path, "w", newline="") as f:
+        f.write(header)
+        for i in range(rows):
+            if recent and rnd.random() < dup_rate:
+                f.write(rnd.choice(recent))
+                continue
+            line = row(rnd, i)
+            f.write(line)
+            if len(recent) < 1000:
+                recent.append(line)
+            else:
+                recent[rnd.randrange(1000)] = line
+
+
+def write_token_csv(
+    path: Path, rows: int, seed: int = 1, dup_rate: float = 0.05, bad_rate: float = 0.01, mixed_rate: float = 0.02
+) -> None:
+    """Token transfer export in the ``token_tx_csv`` layout."""
+
+    def row(rnd: random.Random, i: int) -> str:
+        ts = START + i * 3
+        stamp = _stamp(rnd, ts, seed, mixed_rate)
+        value = f"{rnd.random() * 1000:.8f}"
+        if rnd.random() < bad_rate:
+            stamp, value = rnd.choice([("", value), (stamp, "n/a"), ("not a date", value)])
+        return (
+            f"{stamp},0x{rnd.getrandbits(256):064x},0x{rnd.randrange(5000):040x},"
+            f"0x{rnd.randrange(5000):040x},{value},{rnd.choice(TOKENS)},0x{rnd.randrange(len(TOKENS)):040x}\n"
+        )
+
+    _write(path, "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n", rows, seed, dup_rate, row)
+
+
+def write_wallet_csv(path: Path, rows: int, seed: int = 2, dup_rate: float = 0.05, bad_rate: float = 0.01) -> None:
+    """BscScan wallet export: some rows only carry the ``DateTime`` column."""
+
+    def row(rnd: random.Random, i: int) -> str:
+        ts = START + i * 7
+        unix = str(ts) if i % 3 else ""
+        value = f"{rnd.random() * 10:.8f}"
+        if rnd.random() < bad_rate:
+            value = "n/a"
+        return (
+            f"0x{rnd.getrandbits(256):064x},{30000000 + i},{unix},"
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts))},"
+            f"0x{rnd.randrange(5000):040x},0x{rnd.randrange(5000):040x},{value},BNB\n"
+        )
+
+    _write(path, "Txhash,Blockno,UnixTimestamp,DateTime,From,To,Value,TokenSymbol\n", rows, seed, dup_rate, row)
+
+
+def write_dexscreener_csv(
+    path: Path, rows: int, seed: int = 3, dup_rate: float = 0.02, bad_rate: float = 0.01, mixed_rate: float = 0.02
+) -> None:
+    """DexScreener price ticks, a random walk per token with USD and BNB quotes."""
+    prices = {token: 1.0 + n for n, token in enumerate(TOKENS)}
+
+    def row(rnd: random.Random, i: int) -> str:
+        token = TOKENS[i % len(TOKENS)]
+        prices[token] *= 1 + rnd.gauss(0, 0.002)
+        ts = START + (i // len(TOKENS)) * 15
+        stamp = _stamp(rnd, ts, seed, mixed_rate)
+        usd = f"{prices[token]:.8f}"
+        if rnd.random() < bad_rate:
+            usd = "-"
+        return f"{stamp},{token},{usd},{prices[token] / 215:.10f}\n"
+
+    _write(path, "timestamp,token,price_usd,price_in_bnb\n", rows, seed, dup_rate, row)
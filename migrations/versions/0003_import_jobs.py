@@ -0,0 +1,18 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_batch', sa.Column('status', sa.String(), nullable=True))
+    op.add_column('import_batch', sa.Column('rows_total', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_batch') as batch_op:
+        batch_op.drop_column('rows_total')
+        batch_op.drop_column('status')
@@ -0,0 +1,41 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'transaction_normalized',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('row_hash', sa.String(), sa.ForeignKey('transaction_raw.row_hash'), nullable=False),
+        sa.Column('import_batch_id', sa.Integer(), sa.ForeignKey('import_batch.id'), nullable=False),
+        sa.Column('tx_id', sa.String(), nullable=True),
+        sa.Column('tx_hash', sa.String(), nullable=False),
+        sa.Column('datetime_utc', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('platform', sa.String(), nullable=True),
+        sa.Column('account', sa.String(), nullable=True),
+        sa.Column('chain', sa.String(), nullable=True),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('base_asset', sa.String(), nullable=True),
+        sa.Column('base_qty', sa.Numeric(38, 18), nullable=True),
+        sa.Column('quote_asset', sa.String(), nullable=True),
+        sa.Column('quote_qty', sa.Numeric(38, 18), nullable=True),
+        sa.Column('fee_asset', sa.String(), nullable=True),
+        sa.Column('fee_qty', sa.Numeric(38, 18), nullable=True),
+        sa.Column('price_quote', sa.Numeric(38, 18), nullable=True),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.UniqueConstraint('row_hash')
+    )
+    op.create_index('ix_transaction_normalized_import_batch_id', 'transaction_normalized', ['import_batch_id'])
+    op.create_index('ix_txn_norm_tx_hash', 'transaction_normalized', ['tx_hash'])
+    op.create_index('ix_txn_norm_datetime_utc', 'transaction_normalized', ['datetime_utc'])
+    op.create_index('ix_txn_norm_base_asset_datetime', 'transaction_normalized', ['base_asset', 'datetime_utc'])
+    op.create_index('ix_txn_norm_account_datetime', 'transaction_normalized', ['account', 'datetime_utc'])
+
+
+def downgrade():
+    op.drop_table('transaction_normalized')
@@ -0,0 +1,29 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'transaction_valuation',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('row_hash', sa.String(), sa.ForeignKey('transaction_normalized.row_hash'), nullable=False),
+        sa.Column('import_batch_id', sa.Integer(), sa.ForeignKey('import_batch.id'), nullable=False),
+        sa.Column('datetime_utc', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('asset', sa.String(), nullable=False),
+        sa.Column('qty', sa.Numeric(38, 18), nullable=False),
+        sa.Column('price_usd', sa.Numeric(38, 18), nullable=True),
+        sa.Column('value_usd', sa.Numeric(38, 18), nullable=True),
+        sa.Column('valued_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('row_hash')
+    )
+    op.create_index('ix_transaction_valuation_import_batch_id', 'transaction_valuation', ['import_batch_id'])
+    op.create_index('ix_txn_val_asset_datetime', 'transaction_valuation', ['asset', 'datetime_utc'])
+
+
+def downgrade():
+    op.drop_table('transaction_valuation')
@@ -0,0 +1,42 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cost_basis_checkpoint',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('asset', sa.String(), nullable=False),
+        sa.Column('datetime_utc', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('high_water_id', sa.Integer(), nullable=False),
+        sa.Column('lots', sa.JSON(), nullable=False),
+        sa.Column('realized_usd', sa.Numeric(38, 18), nullable=False),
+        sa.UniqueConstraint('method', 'asset', 'datetime_utc', 'row_id', name='uix_cost_basis_checkpoint')
+    )
+    op.create_table(
+        'realized_gain',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('method', sa.String(), nullable=False),
+        sa.Column('asset', sa.String(), nullable=False),
+        sa.Column('row_hash', sa.String(), sa.ForeignKey('transaction_normalized.row_hash'), nullable=False),
+        sa.Column('row_id', sa.Integer(), nullable=False),
+        sa.Column('datetime_utc', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('qty', sa.Numeric(38, 18), nullable=False),
+        sa.Column('proceeds_usd', sa.Numeric(38, 18), nullable=False),
+        sa.Column('cost_usd', sa.Numeric(38, 18), nullable=False),
+        sa.Column('gain_usd', sa.Numeric(38, 18), nullable=False),
+        sa.UniqueConstraint('method', 'row_hash', name='uix_realized_gain')
+    )
+    op.create_index('ix_realized_gain_method_asset_datetime', 'realized_gain', ['method', 'asset', 'datetime_utc'])
+
+
+def downgrade():
+    op.drop_table('realized_gain')
+    op.drop_table('cost_basis_checkpoint')
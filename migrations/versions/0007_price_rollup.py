@@ -0,0 +1,30 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'price_rollup',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('resolution', sa.String(), nullable=False),
+        sa.Column('asset', sa.String(), nullable=False),
+        sa.Column('quote', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('open', sa.Numeric(38, 18), nullable=False),
+        sa.Column('high', sa.Numeric(38, 18), nullable=False),
+        sa.Column('low', sa.Numeric(38, 18), nullable=False),
+        sa.Column('close', sa.Numeric(38, 18), nullable=False),
+        sa.Column('first_dt', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_dt', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ticks', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('resolution', 'asset', 'quote', 'bucket_start', name='uix_price_rollup')
+    )
+
+
+def downgrade():
+    op.drop_table('price_rollup')
@@ -0,0 +1,16 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_batch', sa.Column('checkpoint', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('import_batch') as batch_op:
+        batch_op.drop_column('checkpoint')
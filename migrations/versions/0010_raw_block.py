@@ -0,0 +1,34 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'raw_block',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('import_batch_id', sa.Integer(), sa.ForeignKey('import_batch.id'), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+    )
+    op.create_index('ix_raw_block_import_batch_id', 'raw_block', ['import_batch_id'])
+    with op.batch_alter_table('transaction_raw') as batch_op:
+        batch_op.alter_column('raw_payload', existing_type=sa.JSON(), nullable=True)
+        batch_op.add_column(sa.Column('raw_block_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('block_row', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_transaction_raw_raw_block', 'raw_block', ['raw_block_id'], ['id'])
+
+
+def downgrade():
+    # Rows stored in blocks have no raw_payload; run ``flask compact-raw --expand`` first.
+    with op.batch_alter_table('transaction_raw') as batch_op:
+        batch_op.drop_constraint('fk_transaction_raw_raw_block', type_='foreignkey')
+        batch_op.drop_column('block_row')
+        batch_op.drop_column('raw_block_id')
+        batch_op.alter_column('raw_payload', existing_type=sa.JSON(), nullable=False)
+    op.drop_index('ix_raw_block_import_batch_id', table_name='raw_block')
+    op.drop_table('raw_block')
@@ -0,0 +1,20 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing checkpoints start at 0, so the next run replays against current valuations.
+    op.add_column(
+        'cost_basis_checkpoint',
+        sa.Column('valuation_high_water_id', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('cost_basis_checkpoint') as batch_op:
+        batch_op.drop_column('valuation_high_water_id')
@@ -3,12 +3,23 @@ import pytest
 from app.main import create_app
 from app.db import SessionLocal, engine
 from app.db.models import Base
+from app.services.ingest.dedup import dedup_index
+from app.services.prices import live_bnb, series_cache
+from app.services.prices.coverage import coverage_index
 
 
-@pytest.fixture
-def app():
+@pytest.fixture(autouse=True)
+def reset_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    series_cache.clear()
+    coverage_index.clear()
+    live_bnb.clear()
+    dedup_index.reset()
+
+
+@pytest.fixture
+def app():
     app = create_app()
     app.config.update({"TESTING": True})
     return app
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+from app.db.models import ImportBatch
+from app.routes import data
+from app.services.ingest import dexscreener_csv, token_tx_csv
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+
+
+def load(session, parser, name, source):
+    batch = ImportBatch(source=source, file_name=name)
+    session.add(batch)
+    session.commit()
+    with open(FIXTURES / name) as f:
+        parser.parse(f, batch.id)
+    return batch.id
+
+
+def test_transactions_keyset_pages(client, session):
+    load(session, token_tx_csv, "token_tx_sample.csv", "TOKEN_CSV")
+
+    first = client.get("/api/transactions?limit=2").get_json()
+    assert [i["tx_hash"] for i in first["items"]] == ["0xhash1", "0xhash2"]
+    assert first["items"][0]["datetime_utc"] == "2023-09-01T10:00:00+00:00"
+    second = client.get(f"/api/transactions?limit=2&after={first['next_cursor']}").get_json()
+    assert [i["tx_hash"] for i in second["items"]] == ["0xhash3"]
+    assert second["next_cursor"] is None
+
+
+def test_transactions_filters(client, session):
+    batch_id = load(session, token_tx_csv, "token_tx_sample.csv", "TOKEN_CSV")
+    js = client.get("/api/transactions?start=2023-09-02T00:00:00Z&end=2023-09-03T00:00:00Z").get_json()
+    assert [i["tx_hash"] for i in js["items"]] == ["0xhash2"]
+    assert client.get(f"/api/transactions?batch_id={batch_id + 1}").get_json()["items"] == []
+    assert len(client.get("/api/transactions?source=TOKEN_CSV").get_json()["items"]) == 3
+    assert client.get("/api/transactions?after=abc").status_code == 400
+
+
+def test_streaming_ndjson_and_csv(client, session, monkeypatch):
+    monkeypatch.setattr(data, "PAGE_SIZE", 1)
+    load(session, token_tx_csv, "token_tx_sample.csv", "TOKEN_CSV")
+    load(session, dexscreener_csv, "dexscreener_sample.csv", "DEXSCREENER_CSV")
+
+    resp = client.get("/api/transactions?format=ndjson")
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r["tx_hash"] for r in lines] == ["0xhash1", "0xhash2", "0xhash3"]
+    assert lines[0]["raw_payload"]["token_symbol"] == "TKN"
+
+    resp = client.get("/api/prices?format=csv&asset=TKN")
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert {(r["quote"], r["asset"]) for r in rows} == {("USD", "TKN"), ("BNB", "TKN")}
+
+    resp = client.get("/api/batches?format=ndjson&limit=1")
+    assert len(resp.get_data(as_text=True).splitlines()) == 1
+    assert client.get("/api/batches?format=xml").status_code == 400
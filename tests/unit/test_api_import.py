@@ -1,30 +1,43 @@
+import io
 from pathlib import Path
 
-from app.db.models import ImportBatch
+from app.db.models import ImportBatch, TransactionRaw
+from app.services.ingest import jobs, token_tx_csv
 
 FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
 
 
+def finished(client, resp):
+    assert resp.status_code == 202
+    batch_id = resp.get_json()["batch_id"]
+    jobs.wait(batch_id, timeout=30)
+    status = client.get(f"/api/import/{batch_id}")
+    assert status.status_code == 200
+    js = status.get_json()
+    assert js["status"] == "completed"
+    return js
+
+
 def test_api_import_token(client, session):
     data = {
         "file": (open(FIXTURES / "token_tx_sample.csv", "rb"), "token.csv"),
     }
     resp = client.post("/api/import/csv?source=token", data=data, content_type="multipart/form-data")
-    assert resp.status_code == 200
-    js = resp.get_json()
+    js = finished(client, resp)
     assert js["rows_ok"] == 3
     assert session.query(ImportBatch).count() == 1
 
 
 def test_api_import_wallet(client, session):
-    data = [
-        ("files", (open(FIXTURES / "wallet_tx_sample_normal.csv", "rb"), "n.csv")),
-        ("files", (open(FIXTURES / "wallet_tx_sample_internal.csv", "rb"), "i.csv")),
-        ("files", (open(FIXTURES / "wallet_tx_sample_tokentx.csv", "rb"), "t.csv")),
-    ]
+    data = {
+        "files": [
+            (open(FIXTURES / "wallet_tx_sample_normal.csv", "rb"), "n.csv"),
+            (open(FIXTURES / "wallet_tx_sample_internal.csv", "rb"), "i.csv"),
+            (open(FIXTURES / "wallet_tx_sample_tokentx.csv", "rb"), "t.csv"),
+        ],
+    }
     resp = client.post("/api/import/csv?source=wallet", data=data, content_type="multipart/form-data")
-    assert resp.status_code == 200
-    js = resp.get_json()
+    js = finished(client, resp)
     assert js["rows_ok"] == 3
     assert session.query(ImportBatch).count() == 1
 
@@ -34,7 +47,47 @@ def test_api_import_dex(client, session):
         "file": (open(FIXTURES / "dexscreener_sample.csv", "rb"), "dex.csv"),
     }
     resp = client.post("/api/import/csv?source=dexscreener", data=data, content_type="multipart/form-data")
-    assert resp.status_code == 200
-    js = resp.get_json()
+    js = finished(client, resp)
     assert js["rows_ok"] == 2
     assert session.query(ImportBatch).count() == 1
+
+
+def test_api_import_progress_fields(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path))
+    data = {
+        "file": (open(FIXTURES / "token_tx_sample.csv", "rb"), "token.csv"),
+    }
+    resp = client.post("/api/import/csv?source=token", data=data, content_type="multipart/form-data")
+    js = finished(client, resp)
+    assert js["rows_total"] == 3
+    assert js["rows_processed"] == 3
+    assert js["eta_seconds"] == 0
+    assert js["throughput_rows_per_sec"] is None or js["throughput_rows_per_sec"] > 0
+    assert (tmp_path / str(js["batch_id"]) / "0-token.csv").exists()
+
+
+def test_api_import_polled_while_running(client, session, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 100)
+    rows = "".join(f"2023-09-01T10:{i // 60 % 60:02d}:{i % 60:02d}Z,0xp{i},0xa,0xb,{i},TKN,0xc\n" for i in range(3000))
+    data = {"file": (io.BytesIO(("timestamp,tx_hash,from,to,value,token_symbol,token_contract\n" + rows).encode()), "t.csv")}
+    resp = client.post("/api/import/csv?source=token", data=data, content_type="multipart/form-data")
+    batch_id = resp.get_json()["batch_id"]
+
+    # Each poll's session teardown must not roll back the worker's open chunk.
+    polls = 0
+    while batch_id in jobs._futures:
+        assert client.get(f"/api/import/{batch_id}").status_code == 200
+        polls += 1
+    js = finished(client, resp)
+    assert polls > 0
+    assert (js["rows_ok"], js["rows_error"]) == (3000, 0)
+    assert session.query(TransactionRaw).count() == 3000
+
+
+def test_api_import_unknown_source_and_batch(client, session):
+    data = {"file": (open(FIXTURES / "token_tx_sample.csv", "rb"), "token.csv")}
+    resp = client.post("/api/import/csv?source=bogus", data=data, content_type="multipart/form-data")
+    assert resp.status_code == 400
+    assert session.query(ImportBatch).count() == 0
+    assert client.get("/api/import/999").status_code == 404
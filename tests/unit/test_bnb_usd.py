@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from app.db.models import ImportBatch, PricePoint
+from app.services.ingest import bnb_usd_csv, dexscreener_csv
+from app.services.prices import PriceNotFound, PriceService, live_bnb, refresh_bnb_usd
+from app.services.prices.providers import StubProvider, TTLCachedProvider
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+
+
+class OfflineProvider:
+    name = "OFFLINE"
+
+    def get_bnb_price(self):
+        raise AssertionError("live BNB price requested")
+
+
+def load(session, parser, name):
+    batch = ImportBatch(source="CSV", file_name=name)
+    session.add(batch)
+    session.commit()
+    with open(FIXTURES / name) as f:
+        return parser.parse(f, batch.id)
+
+
+def test_bnb_quote_fallback_uses_historical_bnb_usd(monkeypatch, session):
+    monkeypatch.setattr(live_bnb, "provider", OfflineProvider())
+    assert load(session, bnb_usd_csv, "bnb_usd_sample.csv")["rows_ok"] == 3
+    load(session, dexscreener_csv, "dexscreener_sample.csv")
+
+    ts = datetime(2023, 9, 1, 2, tzinfo=timezone.utc)
+    assert PriceService.get_usd("ALT", ts) == Decimal("0.002") * Decimal("215.5")
+    assert PriceService.get_usd("BNB", ts) == Decimal("215.5")
+
+
+def test_no_live_rate_for_historical_bnb_quote(monkeypatch, session):
+    monkeypatch.setattr(live_bnb, "provider", OfflineProvider())
+    load(session, dexscreener_csv, "dexscreener_sample.csv")
+    ts = datetime(2023, 9, 1, 2, tzinfo=timezone.utc)
+    with pytest.raises(PriceNotFound):
+        PriceService.get_usd("ALT", ts)
+
+
+def test_refresh_stores_point_from_provider(session):
+    point = refresh_bnb_usd(StubProvider(Decimal("321.5")))
+    assert point.source == "STUB"
+    assert session.query(PricePoint).filter_by(asset="BNB", quote="USD").count() == 1
+    assert PriceService.get_usd("BNB", datetime.now(timezone.utc) - timedelta(hours=1)) == Decimal("321.5")
+
+
+def test_ttl_cache_reuses_live_price():
+    calls = []
+    now = [0.0]
+
+    class Counting:
+        name = "COUNT"
+
+        def get_bnb_price(self):
+            calls.append(now[0])
+            return Decimal(len(calls))
+
+    cached = TTLCachedProvider(Counting(), ttl=60, clock=lambda: now[0])
+    assert cached.get_bnb_price() == 1
+    now[0] = 59
+    assert cached.get_bnb_price() == 1
+    now[0] = 60
+    assert cached.get_bnb_price() == 2
+    assert calls == [0.0, 60]
+
+
+def test_refresh_endpoint(monkeypatch, client):
+    monkeypatch.setattr(live_bnb, "provider", StubProvider(Decimal("250")))
+    resp = client.post("/api/prices/bnb/refresh")
+    assert resp.status_code == 200
+    assert Decimal(resp.get_json()["price"]) == Decimal("250")
+    assert resp.get_json()["source"] == "STUB"
+
+    monkeypatch.setattr(live_bnb, "provider", OfflineProvider())
+    assert client.post("/api/prices/bnb/refresh").status_code == 503
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.db.models import (
+    CostBasisCheckpoint,
+    ImportBatch,
+    RealizedGain,
+    TransactionNormalized,
+    TransactionRaw,
+    TransactionValuation,
+)
+from app.services.costbasis import Lots, compute_cost_basis, positions
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def add_txs(session, txs, prefix):
+    batch = ImportBatch(source="TEST", file_name=prefix)
+    session.add(batch)
+    session.commit()
+    for i, (day, kind, qty, price) in enumerate(txs):
+        row_hash = f"{prefix}-{i}"
+        session.add(TransactionRaw(import_batch_id=batch.id, source="TEST", row_hash=row_hash, raw_payload={}, provenance={}))
+        session.add(TransactionNormalized(
+            row_hash=row_hash,
+            import_batch_id=batch.id,
+            tx_hash=row_hash,
+            datetime_utc=T0 + timedelta(days=day),
+            type=kind,
+            base_asset="TKN",
+            base_qty=Decimal(qty),
+            quote_asset="USD",
+            price_quote=Decimal(price),
+        ))
+    session.commit()
+
+
+@pytest.mark.parametrize("method,cost", [("fifo", "10"), ("lifo", "30"), ("average", "20")])
+def test_lots_dispose(method, cost):
+    lots = Lots(method)
+    lots.acquire(Decimal(1), Decimal(10))
+    lots.acquire(Decimal(1), Decimal(30))
+    assert lots.dispose(Decimal(1)) == Decimal(cost)
+    assert lots.quantity == 1
+    assert lots.dispose(Decimal(2)) == Decimal(40) - Decimal(cost)
+    assert not lots.lots
+
+
+@pytest.mark.parametrize("method", ["fifo", "lifo", "average"])
+def test_zero_quantity_transfers_add_no_lot(method, session):
+    lots = Lots(method)
+    lots.acquire(Decimal(0), Decimal(0))
+    lots.acquire(Decimal(0), Decimal(5))
+    assert not lots.lots
+
+    add_txs(session, [(0, "TRANSFER", "0", "0"), (1, "TRANSFER", "0", "0"), (2, "BUY", "2", "10")], "z")
+    assert compute_cost_basis(method) == {"TKN": 3}
+    [pos] = positions(session, method)
+    assert (pos["open_qty"], pos["open_cost_usd"]) == (2, 20)
+
+
+def test_realized_gains_fifo(session):
+    add_txs(session, [(0, "BUY", "2", "10"), (1, "BUY", "2", "20"), (2, "SELL", "3", "30")], "a")
+    assert compute_cost_basis("fifo") == {"TKN": 3}
+    [gain] = session.query(RealizedGain).all()
+    assert gain.cost_usd == Decimal(40)
+    assert gain.gain_usd == Decimal(50)
+    [pos] = positions(session, "fifo")
+    assert (pos["open_qty"], pos["open_cost_usd"], pos["realized_usd"]) == (1, 20, 50)
+
+
+def test_incremental_replay_from_earliest_change(session):
+    add_txs(session, [(day, "BUY", "1", "10") for day in range(10)] + [(20, "SELL", "5", "20")], "a")
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 11}
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 0}
+
+    # A late import landing on day 7 only replays from the checkpoint before it.
+    add_txs(session, [(7, "SELL", "2", "15")], "b")
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 6}
+    gains = {g.row_hash: g.gain_usd for g in session.query(RealizedGain)}
+    assert gains == {"b-0": Decimal(10), "a-10": Decimal(50)}
+    [pos] = positions(session, "fifo")
+    assert pos["open_qty"] == 3
+    assert pos["realized_usd"] == 60
+
+    # Same result as a replay from scratch.
+    session.query(CostBasisCheckpoint).delete()
+    session.commit()
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 12}
+    assert positions(session, "fifo") == [pos]
+
+
+def test_revaluation_replays_from_changed_row(session):
+    add_txs(session, [(day, "BUY", "1", "10") for day in range(6)] + [(9, "SELL", "2", "0")], "a")
+    # Not USD-quoted: unit prices come from stored valuations, none yet.
+    session.query(TransactionNormalized).update({"quote_asset": "BNB"})
+    session.commit()
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 7}
+    assert positions(session, "fifo")[0]["open_cost_usd"] == 0
+
+    sell = session.query(TransactionNormalized).filter_by(row_hash="a-6").one()
+    session.add(TransactionValuation(
+        row_hash=sell.row_hash, import_batch_id=sell.import_batch_id, datetime_utc=sell.datetime_utc,
+        asset="TKN", qty=Decimal(2), price_usd=Decimal(25), value_usd=Decimal(50),
+    ))
+    session.commit()
+    # Only the sell after the last checkpoint before it is replayed.
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 1}
+    [gain] = session.query(RealizedGain).all()
+    assert gain.proceeds_usd == 50
+    assert compute_cost_basis("fifo", checkpoint_every=3) == {"TKN": 0}
+
+
+def test_cost_basis_endpoint(client, session):
+    add_txs(session, [(0, "BUY", "2", "10"), (1, "SELL", "1", "15")], "a")
+    # GET only reads what was last computed.
+    assert client.get("/api/costbasis?method=lifo").get_json() == {"method": "lifo", "assets": []}
+    assert session.query(CostBasisCheckpoint).count() == 0
+
+    body = client.post("/api/costbasis?method=lifo").get_json()
+    assert body["replayed"] == 2
+    [tkn] = body["assets"]
+    assert Decimal(tkn["realized_usd"]) == 5
+    assert client.get("/api/costbasis?method=lifo").get_json()["assets"] == body["assets"]
+    assert client.post("/api/costbasis?method=lifo").get_json()["replayed"] == 0
+    assert client.get("/api/costbasis?method=bogus").status_code == 400
+    assert client.post("/api/costbasis?method=bogus").status_code == 400
@@ -0,0 +1,24 @@
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.db import db_session, make_engine
+
+
+def test_memory_sqlite_shares_one_connection():
+    assert isinstance(make_engine("sqlite://").pool, StaticPool)
+
+
+def test_file_sqlite_is_pooled_with_wal(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    assert isinstance(engine.pool, QueuePool)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+    engine.dispose()
+
+
+def test_request_session_removed_on_teardown(app):
+    with app.app_context():
+        db_session.execute(text("SELECT 1"))
+        assert db_session.registry.has()
+    assert not db_session.registry.has()
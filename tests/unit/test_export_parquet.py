@@ -0,0 +1,135 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from app.db.models import ImportBatch, PricePoint, TransactionNormalized, TransactionRaw
+from app.services.export import export_parquet, load_state
+from app.services.ingest import dexscreener_csv, token_tx_csv
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+
+
+def import_batch(session, module, text, source, status="completed"):
+    batch = ImportBatch(source=source, file_name="export.csv", status=status)
+    session.add(batch)
+    session.commit()
+    module.parse(io.StringIO(text), batch.id)
+    return batch.id
+
+
+def token_rows(rows):
+    return HEADER + "".join(f"{ts},0x{i},0xa,0xb,{value},{sym},0xc\n" for i, (ts, value, sym) in enumerate(rows))
+
+
+def read(path):
+    return pq.read_table(str(path), partitioning="hive").to_pylist()
+
+
+def test_transactions_partitioned_and_incremental(session, tmp_path):
+    first = import_batch(session, token_tx_csv, token_rows([
+        ("2023-09-01T10:00:00Z", "1.5", "TKN"),
+        ("2023-10-02T10:00:00Z", "0.000000000000000000123", "TKN"),
+        ("2023-09-03T10:00:00Z", "7", "ABC"),
+    ]), "TOKEN_CSV")
+    import_batch(session, token_tx_csv, token_rows([("2023-09-04T10:00:00Z", "9", "ZZZ")]), "TOKEN_CSV", "running")
+
+    summary = export_parquet(str(tmp_path), ["transactions"])["transactions"]
+    assert summary["batches"] == [first]
+    assert sorted(summary["files"]) == [
+        f"source=TOKEN_CSV/asset=ABC/month=2023-09/batch-{first}.parquet",
+        f"source=TOKEN_CSV/asset=TKN/month=2023-09/batch-{first}.parquet",
+        f"source=TOKEN_CSV/asset=TKN/month=2023-10/batch-{first}.parquet",
+    ]
+    rows = sorted(read(tmp_path / "transactions"), key=lambda r: r["id"])
+    assert [(r["base_asset"], r["asset"], r["month"], r["source"]) for r in rows] == [
+        ("TKN", "TKN", "2023-09", "TOKEN_CSV"),
+        ("TKN", "TKN", "2023-10", "TOKEN_CSV"),
+        ("ABC", "ABC", "2023-09", "TOKEN_CSV"),
+    ]
+    assert rows[0]["base_qty"] == Decimal("1.5")
+    assert rows[1]["base_qty"] == Decimal(0)
+    assert rows[0]["datetime_utc"].isoformat() == "2023-09-01T10:00:00+00:00"
+
+    # Nothing new: no files. A newly completed batch adds only its own files.
+    assert export_parquet(str(tmp_path), ["transactions"])["transactions"]["batches"] == []
+    second = import_batch(session, token_tx_csv, token_rows([("2023-09-05T10:00:00Z", "2", "TKN")]), "TOKEN_CSV")
+    summary = export_parquet(str(tmp_path), ["transactions"])["transactions"]
+    assert (summary["batches"], summary["rows"]) == ([second], 1)
+    assert len(read(tmp_path / "transactions")) == 4
+    assert load_state(str(tmp_path))["transactions"]["batches"] == {str(first): 3, str(second): 5}
+
+    # Rows normalized into an exported batch later (backfill-normalized) go to a new file.
+    session.add(TransactionRaw(import_batch_id=first, source="TOKEN_CSV", row_hash="late", raw_payload={}, provenance={}))
+    session.add(TransactionNormalized(
+        row_hash="late", import_batch_id=first, tx_hash="0xlate", type="TRANSFER", base_asset="TKN",
+        datetime_utc=datetime(2023, 9, 6, tzinfo=timezone.utc),
+    ))
+    session.commit()
+    summary = export_parquet(str(tmp_path), ["transactions"])["transactions"]
+    assert summary["files"] == [f"source=TOKEN_CSV/asset=TKN/month=2023-09/batch-{first}-4.parquet"]
+    assert len(read(tmp_path / "transactions")) == 5
+
+
+def test_prices_incremental_and_full(session, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.export.parquet.ROW_GROUP_SIZE", 2)
+    text = "timestamp,token,price_usd,price_in_bnb\n" + "".join(
+        f"2023-09-{day:02d}T00:00:00Z,TKN,1.{day},0.00{day}\n" for day in range(1, 6)
+    )
+    import_batch(session, dexscreener_csv, text, "DEXSCREENER_CSV")
+
+    summary = export_parquet(str(tmp_path), ["prices"])["prices"]
+    assert summary["rows"] == 10
+    assert summary["files"] == ["source=DEXSCREENER/asset=TKN/month=2023-09/points-1.parquet"]
+    path = tmp_path / "prices" / summary["files"][0]
+    assert pq.ParquetFile(str(path)).num_row_groups == 5
+    rows = read(tmp_path / "prices")
+    assert {r["quote"] for r in rows} == {"USD", "BNB"}
+    assert Decimal("1.3") in {round(r["price"], 9) for r in rows}
+
+    import_batch(session, dexscreener_csv, "timestamp,token,price_usd\n2023-10-01T00:00:00Z,TKN,3\n", "DEXSCREENER_CSV")
+    summary = export_parquet(str(tmp_path), ["prices"])["prices"]
+    assert summary["files"] == ["source=DEXSCREENER/asset=TKN/month=2023-10/points-11.parquet"]
+    assert len(read(tmp_path / "prices")) == 11
+
+    summary = export_parquet(str(tmp_path), ["prices"], full=True)["prices"]
+    assert summary["rows"] == 11
+    assert len(read(tmp_path / "prices")) == 11
+    assert not list((tmp_path / "prices").rglob("points-11.parquet"))
+
+
+def test_prices_committed_out_of_order(session, tmp_path):
+    def add(point_id, day):
+        session.add(PricePoint(
+            id=point_id, dt_utc=datetime(2023, 9, day, tzinfo=timezone.utc), asset="TKN", quote="USD",
+            price=Decimal(day), source="TEST",
+        ))
+        session.commit()
+
+    add(1, 1)
+    add(3, 3)
+    assert export_parquet(str(tmp_path), ["prices"])["prices"]["rows"] == 2
+    # Id 2 commits after 3 was exported; it is picked up once newer ids arrive.
+    add(2, 2)
+    assert export_parquet(str(tmp_path), ["prices"])["prices"]["rows"] == 0
+    add(4, 4)
+    summary = export_parquet(str(tmp_path), ["prices"])["prices"]
+    assert (summary["rows"], summary["last_id"]) == (2, 4)
+    assert sorted(r["id"] for r in read(tmp_path / "prices")) == [1, 2, 3, 4]
+    assert load_state(str(tmp_path))["prices"]["recent"] == [1, 2, 3, 4]
+
+
+def test_export_endpoint(client, session, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.export.parquet.EXPORT_DIR", str(tmp_path))
+    import_batch(session, token_tx_csv, token_rows([("2023-09-01T10:00:00Z", "1", "TKN")]), "TOKEN_CSV")
+
+    resp = client.post("/api/export/parquet?dataset=transactions")
+    assert resp.status_code == 200
+    assert resp.get_json()["transactions"]["rows"] == 1
+    assert Path(tmp_path / "_export_state.json").exists()
+    assert client.post("/api/export/parquet?dataset=bogus").status_code == 400
@@ -0,0 +1,51 @@
+import io
+
+from app.db.models import ImportBatch, TransactionRaw
+from app.services.ingest import bulk, token_tx_csv
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+
+
+def make_csv(n, dup_every=0):
+    lines = [HEADER]
+    for i in range(n):
+        j = i - 1 if dup_every and i % dup_every == 0 and i else i
+        lines.append(f"2023-09-01T10:00:{j % 60:02d}Z,0xbulk{j},0xa,0xb,{j}.5,TKN,0xc\n")
+    return io.StringIO("".join(lines))
+
+
+def new_batch(session):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="bulk.csv")
+    session.add(batch)
+    session.commit()
+    return batch.id
+
+
+def test_bulk_dedup_across_chunks_and_batches(monkeypatch, session):
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 7)
+    before = session.query(TransactionRaw).count()
+
+    result = token_tx_csv.parse(make_csv(50, dup_every=5), new_batch(session))
+    assert result["rows_ok"] == 41
+    assert result["rows_error"] == 0
+    assert session.query(TransactionRaw).count() == before + 41
+
+    result = token_tx_csv.parse(make_csv(60), new_batch(session))
+    assert result["rows_ok"] == 19
+    assert session.query(TransactionRaw).count() == before + 60
+
+
+def test_existing_hashes_and_conflict_insert(session):
+    batch_id = new_batch(session)
+    row = {
+        "import_batch_id": batch_id,
+        "source": "TOKEN_CSV",
+        "row_hash": "bulk-hash-1",
+        "raw_payload": {},
+        "provenance": {},
+    }
+    bulk.insert_raw_rows(session, [row])
+    bulk.insert_raw_rows(session, [row])
+    session.commit()
+    assert bulk.existing_hashes(session, ["bulk-hash-1", "bulk-hash-2"]) == {"bulk-hash-1"}
+    assert session.query(TransactionRaw).filter_by(row_hash="bulk-hash-1").count() == 1
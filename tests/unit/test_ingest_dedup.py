@@ -0,0 +1,94 @@
+import io
+from hashlib import sha256
+
+from app.db.models import ImportBatch, TransactionRaw
+from app.services.ingest import bulk, token_tx_csv
+from app.services.ingest.dedup import BloomFilter, DedupIndex, dedup_index
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+
+
+def make_csv(n):
+    rows = [f"2023-09-01T10:00:{i % 60:02d}Z,0xdedup{i},0xa,0xb,{i}.5,TKN,0xc\n" for i in range(n)]
+    return io.StringIO(HEADER + "".join(rows))
+
+
+def new_batch(session):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="dedup.csv")
+    session.add(batch)
+    session.commit()
+    return batch.id
+
+
+def hashes(n, prefix="row"):
+    return [sha256(f"{prefix}{i}".encode()).hexdigest() for i in range(n)]
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_fp_rate():
+    bloom = BloomFilter(capacity=5000, fp_rate=0.01)
+    known = hashes(5000)
+    for h in known:
+        bloom.add(h)
+    assert all(h in bloom for h in known)
+    fp = sum(h in bloom for h in hashes(5000, prefix="other"))
+    assert fp / 5000 < 0.03
+    assert 0.005 < bloom.estimated_fp_rate < 0.02
+    assert bloom.nbytes < 8000
+
+
+def test_reimport_skips_db_lookups_for_new_rows(session):
+    token_tx_csv.parse(make_csv(30), new_batch(session))
+    stats = dedup_index.stats()
+    assert stats["lookups"] == 30
+    assert stats["db_checks"] == stats["false_positives"]
+
+    result = token_tx_csv.parse(make_csv(40), new_batch(session))
+    assert result["rows_ok"] == 10
+    stats = dedup_index.stats()
+    assert stats["entries"] == 40
+    assert stats["lookups"] == 70
+    assert stats["db_checks"] - stats["false_positives"] == 30
+    assert stats["memory_bytes"] > 0
+
+
+def test_snapshot_resumes_from_last_row(tmp_path, monkeypatch, session):
+    token_tx_csv.parse(make_csv(20), new_batch(session))
+    path = str(tmp_path / "dedup.bloom")
+    first = DedupIndex(path, capacity=1000, fp_rate=0.01)
+    first.warm(session)
+    first.flush(session)
+    assert first.stats()["entries"] == 20
+
+    monkeypatch.setattr(bulk, "dedup_index", first)
+    token_tx_csv.parse(make_csv(25), new_batch(session))
+
+    second = DedupIndex(path, capacity=1000, fp_rate=0.01)
+    second.warm(session)
+    assert second.last_id == 25
+    # Only rows inserted after the snapshot are replayed.
+    assert second.stats()["entries"] == 25
+    assert all(h in second.filter for (h,) in session.query(TransactionRaw.row_hash))
+
+
+def test_dedup_stats_endpoint(client):
+    resp = client.get("/api/import/dedup")
+    assert resp.status_code == 200
+    assert {"entries", "memory_bytes", "estimated_fp_rate", "observed_fp_rate"} <= set(resp.get_json())
+
+
+def test_stale_filter_does_not_over_report(tmp_path, monkeypatch, session):
+    stale = DedupIndex(str(tmp_path / "dedup.bloom"), capacity=1000, fp_rate=0.01)
+    stale.warm(session)
+    # Another process inserts the rows after this one warmed its filter.
+    token_tx_csv.parse(make_csv(5), new_batch(session))
+
+    monkeypatch.setattr(bulk, "dedup_index", stale)
+    result = token_tx_csv.parse(make_csv(5), new_batch(session))
+    assert result["rows_ok"] == 0
+    assert result["stats"]["counters"]["duplicate"] == 5
+    assert session.query(TransactionRaw).count() == 5
+
+    stale.flush(session)
+    assert stale.last_id == 5
+    assert all(h in stale.filter for (h,) in session.query(TransactionRaw.row_hash))
+    assert DedupIndex(stale.path, capacity=1000, fp_rate=0.01)._load() is not None
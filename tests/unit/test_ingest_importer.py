@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import pytest
+
+from app.db.models import ImportBatch, TransactionRaw
+from app.services.ingest import importer, jobs
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+
+
+def token_csv(prefix, n):
+    return HEADER + "".join(f"2023-09-01T10:00:{i:02d}Z,0x{prefix}{i},0xa,0xb,{i}.5,TKN,0xc\n" for i in range(n))
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path / "spool"))
+
+
+@pytest.fixture
+def exports(tmp_path):
+    directory = tmp_path / "exports"
+    directory.mkdir()
+    (directory / "a.csv").write_text(token_csv("a", 5))
+    (directory / "b.csv.gz").write_bytes(gzip.compress(token_csv("b", 3).encode()))
+    (directory / "notes.txt").write_text("not an export")
+    return directory
+
+
+def test_expand_paths(exports):
+    assert importer.expand_paths([str(exports)]) == [str(exports / "a.csv"), str(exports / "b.csv.gz")]
+    assert importer.expand_paths([str(exports / "*.csv"), str(exports / "a.csv")]) == [str(exports / "a.csv")]
+    with pytest.raises(FileNotFoundError):
+        importer.expand_paths([str(exports / "missing.csv")])
+
+
+def test_stage_copies_plain_csv(exports):
+    [spooled] = importer.stage(str(exports / "a.csv"), 7)
+    with open(exports / "a.csv", "a") as f:
+        f.write("2023-09-01T10:01:00Z,0xlate,0xa,0xb,1,TKN,0xc\n")
+    with open(spooled) as f:
+        assert f.read() == token_csv("a", 5)
+
+
+def test_import_files_one_batch_per_file(session, exports):
+    (exports / "bad.csv.gz").write_bytes(b"\x1f\x8bnot gzip")
+    reports = []
+    outcomes = importer.import_files(
+        "token", importer.expand_paths([str(exports)]), workers=1, on_progress=reports.append, interval=60
+    )
+
+    assert [(o["status"], o["rows_ok"]) for o in outcomes] == [("completed", 5), ("completed", 3), ("failed", 0)]
+    assert "could not read upload" in outcomes[2]["error"]
+    assert session.query(TransactionRaw).count() == 8
+    batches = session.query(ImportBatch).order_by(ImportBatch.id).all()
+    assert [(b.source, b.file_name, b.status) for b in batches] == [
+        ("TOKEN_CSV", "a.csv", "completed"),
+        ("TOKEN_CSV", "b.csv.gz", "completed"),
+        ("TOKEN_CSV", "bad.csv.gz", "failed"),
+    ]
+    final = reports[-1]
+    assert (final.files_done, final.files_total, final.rows_processed) == (3, 3, 8)
+
+
+def test_watch_imports_new_files_once(session, exports):
+    assert importer.watch(str(exports), "token", workers=1, poll_interval=0, max_polls=2) == 2
+    state = json.loads((exports / importer.STATE_FILE).read_text())
+    assert sorted(state) == ["a.csv", "b.csv.gz"]
+
+    (exports / "c.csv").write_text(token_csv("c", 2))
+    assert importer.watch(str(exports), "token", workers=1, poll_interval=0, max_polls=2) == 1
+    assert session.query(ImportBatch).count() == 3
+    assert session.query(TransactionRaw).count() == 10
+
+
+def test_import_csv_command(app, session, exports):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["import-csv", "--source", "token", "--workers", "1", str(exports / "a.csv")])
+    assert result.exit_code == 0, result.output
+    assert "1/1 files  5/5 rows" in result.output
+    assert "batch 1 completed" in result.output
+
+    assert runner.invoke(args=["import-csv", "--source", "bogus", str(exports)]).exit_code == 2
+    assert runner.invoke(args=["import-csv", "--source", "token"]).exit_code == 2
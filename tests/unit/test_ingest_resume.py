@@ -0,0 +1,181 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db.models import ImportBatch, TransactionRaw
+from app.services.ingest import jobs, token_tx_csv, wallet_tx_csv
+from app.services.ingest.checkpoint import OffsetLines, offset_of
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+WALLET_HEADER = "Txhash,UnixTimestamp,DateTime,From,To,Value,TokenSymbol\n"
+
+
+class FailingFile(io.BytesIO):
+    """Binary upload whose connection drops after ``fail_after`` lines."""
+
+    def __init__(self, data: bytes, fail_after: int):
+        super().__init__(data)
+        self.lines = 0
+        self.fail_after = fail_after
+
+    def readline(self, *args):
+        self.lines += 1
+        if self.lines > self.fail_after:
+            raise OSError("connection reset while reading upload")
+        return super().readline(*args)
+
+
+def token_csv(n):
+    rows = [f"2023-09-01T10:{i // 60 % 60:02d}:{i % 60:02d}Z,0xs{i},0xa,0xb,{i}.25,TKN,0xc\n" for i in range(n)]
+    return "\ufeff" + HEADER + "".join(rows)
+
+
+def wallet_csv(prefix, n):
+    rows = [f"0x{prefix}{i},{1693562400 + i},,0xf,0xt,{i}.5,ETH\n" for i in range(n)]
+    return WALLET_HEADER + "".join(rows)
+
+
+def new_batch(session, source="TOKEN_CSV"):
+    batch = ImportBatch(source=source, file_name="resume.csv", status="running")
+    session.add(batch)
+    session.commit()
+    return batch.id
+
+
+def test_offset_lines_resumes_after_header():
+    data = token_csv(5).encode()
+    lines = OffsetLines(io.BytesIO(data))
+    assert next(iter(lines)) == HEADER
+    assert list(OffsetLines(io.BytesIO(data))) == (HEADER + token_csv(5)[len(HEADER) + 1:]).splitlines(True)
+
+    reader = OffsetLines(io.BytesIO(data))
+    it = iter(reader)
+    for _ in range(3):
+        next(it)
+    resumed = list(OffsetLines(io.BytesIO(data), reader.offset))
+    assert resumed[0] == HEADER
+    assert resumed[1:] == token_csv(5).splitlines(True)[3:]
+
+
+def test_token_import_resumes_from_checkpoint(monkeypatch, session, tmp_path):
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 10)
+    path = tmp_path / "0-token.csv"
+    path.write_text(token_csv(100), encoding="utf-8")
+    batch_id = new_batch(session)
+
+    with pytest.raises(OSError):
+        token_tx_csv.parse(OffsetLines(FailingFile(path.read_bytes(), 36)), batch_id)
+
+    batch = session.get(ImportBatch, batch_id)
+    assert batch.rows_processed == 30
+    assert batch.checkpoint["row"] == 30
+    assert batch.checkpoint["offset"] == len(token_csv(30).encode())
+    session.expire_all()
+
+    result = jobs.run_import(batch_id, "token", [str(path)], resume=True)
+    assert result["rows_ok"] == 100
+    # Nothing before the checkpoint was read or deduped again.
+    assert result["stats"]["stages"]["read"]["calls"] == 70
+    assert result["stats"]["counters"].get("duplicate", 0) == 0
+    assert session.query(TransactionRaw).count() == 100
+    batch = session.get(ImportBatch, batch_id)
+    assert (batch.status, batch.rows_processed, batch.rows_ok) == ("completed", 100, 100)
+
+
+def test_resume_keeps_earlier_warnings(monkeypatch, session):
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 10)
+    batch_id = new_batch(session)
+    lines = token_csv(30)[1:].splitlines(True)
+    lines[4] = lines[4].replace("3.25", "bad")
+    lines[26] = lines[26].replace("25.25", "worse")
+
+    def failing():
+        yield from lines[:16]
+        raise OSError("connection reset while reading upload")
+
+    with pytest.raises(OSError):
+        token_tx_csv.parse(failing(), batch_id)
+    assert len(session.get(ImportBatch, batch_id).warnings) == 1
+    session.expire_all()
+
+    result = token_tx_csv.parse(iter(lines), batch_id, resume=True)
+    assert (result["rows_ok"], result["rows_error"]) == (28, 2)
+    assert len(result["warnings"]) == 2
+    session.expire_all()
+    assert len(session.get(ImportBatch, batch_id).warnings) == 2
+
+
+def test_resume_without_offset_skips_rows(monkeypatch, session):
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 10)
+    batch_id = new_batch(session)
+    lines = token_csv(50)[1:].splitlines(True)
+
+    def failing():
+        yield from lines[:26]
+        raise OSError("connection reset while reading upload")
+
+    with pytest.raises(OSError):
+        token_tx_csv.parse(failing(), batch_id)
+    assert session.get(ImportBatch, batch_id).checkpoint == {"file": 0, "row": 20, "offset": None}
+
+    result = token_tx_csv.parse(iter(lines), batch_id, resume=True)
+    assert result["rows_ok"] == 50
+    assert result["stats"]["counters"].get("duplicate", 0) == 0
+    assert session.query(TransactionRaw).count() == 50
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_wallet_import_resumes_in_second_file(monkeypatch, session, tmp_path, parallel):
+    monkeypatch.setattr(wallet_tx_csv, "CHUNK_SIZE", 5)
+    paths = [tmp_path / "0-a.csv", tmp_path / "1-b.csv"]
+    paths[0].write_text(wallet_csv("a", 12))
+    paths[1].write_text(wallet_csv("b", 20))
+    batch_id = new_batch(session, "WALLET_CSV")
+
+    files = [OffsetLines(open(paths[0], "rb")), OffsetLines(FailingFile(paths[1].read_bytes(), 12))]
+    with pytest.raises(OSError):
+        wallet_tx_csv.parse(files, batch_id)
+    files[0].file.close()
+    point = session.get(ImportBatch, batch_id).checkpoint
+    assert (point["file"], point["row"]) == (1, 8)
+    session.expire_all()
+
+    if parallel:
+        result = wallet_tx_csv.parse_parallel([str(p) for p in paths], batch_id, workers=2, resume=True)
+    else:
+        files = [OffsetLines(open(p, "rb"), offset_of(point, idx)) for idx, p in enumerate(paths)]
+        result = wallet_tx_csv.parse(files, batch_id, resume=True)
+        for f in files:
+            f.file.close()
+    assert result["rows_ok"] == 32
+    assert result["stats"]["counters"].get("duplicate", 0) == 0
+    assert session.query(TransactionRaw).count() == 32
+    assert session.get(ImportBatch, batch_id).rows_processed == 32
+
+
+def test_api_resume(client, session, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 10)
+    batch_id = new_batch(session)
+    (tmp_path / str(batch_id)).mkdir()
+    (tmp_path / str(batch_id) / "0-token.csv").write_text(token_csv(25))
+
+    # Still running elsewhere: the heartbeat is fresh.
+    batch = session.get(ImportBatch, batch_id)
+    batch.heartbeat_at = datetime.now(timezone.utc)
+    session.commit()
+    assert client.post(f"/api/import/{batch_id}/resume").status_code == 409
+
+    # Its worker died: no chunk committed for longer than STALE_SECONDS.
+    batch.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=jobs.STALE_SECONDS + 60)
+    session.commit()
+    resp = client.post(f"/api/import/{batch_id}/resume")
+    assert resp.status_code == 202
+    jobs.wait(batch_id, timeout=30)
+    js = client.get(f"/api/import/{batch_id}").get_json()
+    assert (js["status"], js["rows_ok"]) == ("completed", 25)
+    assert js["checkpoint"]["row"] == 20
+
+    assert client.post(f"/api/import/{batch_id}/resume").status_code == 409
+    assert client.post("/api/import/999/resume").status_code == 404
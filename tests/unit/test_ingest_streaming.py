@@ -0,0 +1,68 @@
+import os
+import tracemalloc
+
+import pytest
+
+from app.db.models import ImportBatch, PricePoint, TransactionRaw
+from app.services.ingest import dexscreener_csv, token_tx_csv
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+
+
+def token_lines(n, fail_at=None):
+    yield HEADER
+    for i in range(n):
+        if i == fail_at:
+            raise OSError("connection reset while reading upload")
+        yield f"2023-09-01T10:{i // 60 % 60:02d}:{i % 60:02d}Z,0xs{i},0xa,0xb,{i}.25,TKN,0xc\n"
+
+
+def new_batch(session, source="TOKEN_CSV"):
+    batch = ImportBatch(source=source, file_name="stream.csv")
+    session.add(batch)
+    session.commit()
+    return batch.id
+
+
+def test_chunks_are_committed_with_progress(monkeypatch, session):
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 10)
+    batch_id = new_batch(session)
+
+    with pytest.raises(OSError):
+        token_tx_csv.parse(token_lines(100, fail_at=35), batch_id)
+
+    assert session.query(TransactionRaw).count() == 30
+    batch = session.get(ImportBatch, batch_id)
+    assert batch.rows_processed == 30
+    assert batch.rows_ok == 30
+
+
+def test_dexscreener_chunked_progress(monkeypatch, session):
+    monkeypatch.setattr(dexscreener_csv, "CHUNK_SIZE", 4)
+    batch_id = new_batch(session, "DEXSCREENER_CSV")
+    lines = ["timestamp,token,price_usd,price_in_bnb\n"]
+    lines += [f"2023-09-01T{i:02d}:00:00Z,TKN,1.{i},0.00{i}\n" for i in range(10)]
+
+    result = dexscreener_csv.parse(iter(lines), batch_id)
+    assert result["rows_ok"] == 10
+    assert session.query(PricePoint).count() == 20
+    assert session.get(ImportBatch, batch_id).rows_processed == 10
+
+    dexscreener_csv.parse(iter(lines), new_batch(session, "DEXSCREENER_CSV"))
+    assert session.query(PricePoint).count() == 20
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_SLOW_TESTS"), reason="set RUN_SLOW_TESTS=1 to run")
+def test_multi_million_row_import_under_memory_cap(session):
+    rows = int(os.environ.get("STREAM_TEST_ROWS", 2_000_000))
+    batch_id = new_batch(session)
+
+    tracemalloc.start()
+    try:
+        result = token_tx_csv.parse(token_lines(rows), batch_id)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result["rows_ok"] == rows
+    assert peak < 64 * 1024 * 1024
@@ -0,0 +1,145 @@
+import gzip
+import io
+import zipfile
+from contextlib import ExitStack
+from pathlib import Path
+
+import pytest
+
+from app.db.models import ImportBatch
+from app.services.ingest import jobs
+from app.services.ingest.checkpoint import open_spooled
+from app.services.ingest.upload import save_upload, sniff
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+TOKEN = (FIXTURES / "token_tx_sample.csv").read_bytes()
+
+
+class Unseekable(io.RawIOBase):
+    """Socket-like body: read() only."""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+def zipped(**members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def finished(client, resp):
+    assert resp.status_code == 202
+    batch_id = resp.get_json()["batch_id"]
+    jobs.wait(batch_id, timeout=30)
+    return client.get(f"/api/import/{batch_id}").get_json()
+
+
+def test_sniff_keeps_stream_intact():
+    kind, stream = sniff(Unseekable(gzip.compress(TOKEN)))
+    assert kind == "gzip"
+    assert gzip.decompress(stream.read()) == TOKEN
+    kind, stream = sniff(io.BytesIO(TOKEN))
+    assert kind is None and stream.read() == TOKEN
+
+
+def test_save_upload_decompresses(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.ingest.upload.SPOOL_CHUNK_SIZE", 64)
+    paths = save_upload(Unseekable(gzip.compress(TOKEN)), "token.csv.gz", str(tmp_path), 0)
+    assert [Path(p).name for p in paths] == ["0-token.csv"]
+    assert Path(paths[0]).read_bytes() == TOKEN
+
+    data = zipped(**{"a.csv": TOKEN, "dir/b.csv": b"x\n"})
+    for stream in (io.BytesIO(data), Unseekable(data)):
+        paths = save_upload(stream, "export.zip", str(tmp_path), 3)
+        assert [Path(p).name for p in paths] == ["3-a.csv", "4-b.csv"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["0-token.csv", "3-a.csv", "4-b.csv"]
+
+    with pytest.raises(ValueError):
+        save_upload(io.BytesIO(gzip.compress(TOKEN)[:20]), "broken.csv.gz", str(tmp_path), 5)
+
+
+def test_save_upload_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.ingest.upload.MAX_UNCOMPRESSED_BYTES", len(TOKEN) - 1)
+    monkeypatch.setattr("app.services.ingest.upload.SPOOL_CHUNK_SIZE", 16)
+    with pytest.raises(ValueError, match="larger than"):
+        save_upload(Unseekable(gzip.compress(TOKEN)), "token.csv.gz", str(tmp_path), 0)
+    for stream in (io.BytesIO(zipped(**{"a.csv": TOKEN})), Unseekable(zipped(**{"a.csv": TOKEN}))):
+        with pytest.raises(ValueError, match="larger than"):
+            save_upload(stream, "export.zip", str(tmp_path), 0)
+    # Partial output is removed.
+    assert list(tmp_path.iterdir()) == []
+    assert save_upload(io.BytesIO(TOKEN[:-1]), "token.csv", str(tmp_path), 0)
+
+
+def test_save_upload_zstd(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    data = zstandard.ZstdCompressor().compress(TOKEN)
+    paths = save_upload(Unseekable(data), "token.csv.zst", str(tmp_path), 0)
+    assert Path(paths[0]).read_bytes() == TOKEN
+
+
+def test_open_spooled_maps_and_resumes(tmp_path):
+    path = tmp_path / "0-token.csv"
+    path.write_bytes(TOKEN)
+    header, first = TOKEN.decode().splitlines(True)[:2]
+    with ExitStack() as stack:
+        lines = open_spooled(stack, str(path))
+        assert list(lines) == TOKEN.decode().splitlines(True)
+        assert lines.name == str(path)
+        resumed = list(open_spooled(stack, str(path), len(header) + len(first)))
+    assert resumed == [header] + TOKEN.decode().splitlines(True)[2:]
+
+    (tmp_path / "1-empty.csv").write_bytes(b"")
+    with ExitStack() as stack:
+        assert list(open_spooled(stack, str(tmp_path / "1-empty.csv"))) == []
+
+
+def test_api_import_compressed(client, session, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path))
+    data = {"file": (io.BytesIO(gzip.compress(TOKEN)), "token.csv.gz")}
+    js = finished(client, client.post("/api/import/csv?source=token", data=data, content_type="multipart/form-data"))
+    assert (js["status"], js["rows_ok"]) == ("completed", 3)
+    assert (tmp_path / str(js["batch_id"]) / "0-token.csv").exists()
+
+    resp = client.post(
+        "/api/import/csv?source=token&filename=again.zip",
+        data=zipped(**{"token.csv": TOKEN}),
+        content_type="application/zip",
+    )
+    js = finished(client, resp)
+    assert (js["status"], js["rows_total"], js["rows_ok"]) == ("completed", 3, 0)
+
+
+def test_api_import_corrupt_upload(client, session, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path))
+    data = {"file": (io.BytesIO(gzip.compress(TOKEN)[:20]), "token.csv.gz")}
+    resp = client.post("/api/import/csv?source=token", data=data, content_type="multipart/form-data")
+    assert resp.status_code == 400
+    batch = session.get(ImportBatch, resp.get_json()["batch_id"])
+    assert batch.status == "failed" and batch.notes
+    assert not (tmp_path / str(batch.id)).exists()
+
+
+def test_api_import_chunked_body(client, session, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "SPOOL_DIR", str(tmp_path))
+    headers = {"Transfer-Encoding": "chunked", "Content-Type": "application/gzip"}
+    resp = client.post(
+        "/api/import/csv?source=token&filename=token.csv.gz",
+        input_stream=io.BytesIO(gzip.compress(TOKEN)),
+        headers=headers,
+        environ_overrides={"wsgi.input_terminated": True},
+    )
+    js = finished(client, resp)
+    assert (js["status"], js["rows_ok"]) == ("completed", 3)
+
+    resp = client.post("/api/import/csv?source=token", input_stream=io.BytesIO(TOKEN), headers=headers)
+    assert resp.status_code == 411
@@ -24,3 +24,32 @@ def test_parse_wallet_csv(session):
     first = session.query(TransactionRaw).first()
     prov = first.provenance
     assert "source_file" in prov and "row_number" in prov
+
+
+def test_parse_wallet_parallel_matches_serial(session):
+    paths = [
+        str(FIXTURES / "wallet_tx_sample_normal.csv"),
+        str(FIXTURES / "wallet_tx_sample_internal.csv"),
+        str(FIXTURES / "wallet_tx_sample_tokentx.csv"),
+        str(FIXTURES / "wallet_tx_sample_normal.csv"),
+    ]
+    batch = ImportBatch(source="WALLET_CSV", file_name="multi")
+    session.add(batch)
+    session.commit()
+
+    result = wallet_tx_csv.parse_parallel(paths, batch.id, workers=2)
+    rows = session.query(TransactionRaw).order_by(TransactionRaw.id).all()
+    assert result["rows_ok"] == len(rows)
+    assert [r.provenance["source_file"] for r in rows][:2] == [paths[0], paths[0]]
+    hashes = {r.row_hash for r in rows}
+
+    batch2 = ImportBatch(source="WALLET_CSV", file_name="multi")
+    session.add(batch2)
+    session.commit()
+    files = [open(p) for p in paths]
+    result2 = wallet_tx_csv.parse(files, batch2.id)
+    for f in files:
+        f.close()
+    assert result2["rows_ok"] == 0
+    assert {r.row_hash for r in session.query(TransactionRaw)} == hashes
+    assert session.get(ImportBatch, batch.id).rows_processed == 6
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.db.models import ImportBatch
+from app.metrics import Registry, StageStats, timed_iter
+from app.services.ingest import token_tx_csv
+from app.services.prices import PriceService
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+
+
+def test_registry_renders_prometheus_text():
+    reg = Registry()
+    reg.describe("x_seconds", "histogram", "Example.")
+    reg.observe("x_seconds", 0.002, stage="read")
+    reg.observe("x_seconds", 2.0, stage="read")
+    reg.inc("x_total", 3, source='a"b')
+    text = reg.render()
+    assert "# TYPE x_seconds histogram" in text
+    assert 'x_seconds_bucket{stage="read",le="0.001"} 0' in text
+    assert 'x_seconds_bucket{stage="read",le="0.005"} 1' in text
+    assert 'x_seconds_bucket{stage="read",le="+Inf"} 2' in text
+    assert 'x_seconds_count{stage="read"} 2' in text
+    assert 'x_total{source="a\\"b"} 3' in text
+
+
+def test_registry_renders_large_values_exactly():
+    reg = Registry()
+    reg.inc("x_total", 1234567)
+    reg.inc("x_total")
+    reg.set("x_bytes", 12345678.25)
+    reg.observe("x_seconds", 1234567.125)
+    text = reg.render()
+    assert "x_total 1234568\n" in text
+    assert "x_bytes 12345678.25\n" in text
+    assert "x_seconds_sum 1234567.125\n" in text
+
+
+def test_timed_iter_counts_items():
+    stats = StageStats()
+    assert list(timed_iter(range(5), stats)) == [0, 1, 2, 3, 4]
+    assert stats.calls["read"] == 5
+
+
+def test_import_records_stage_stats(session):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="token.csv")
+    session.add(batch)
+    session.commit()
+    with open(FIXTURES / "token_tx_sample.csv") as f:
+        result = token_tx_csv.parse(f, batch.id)
+
+    stages = result["stats"]["stages"]
+    assert {"read", "timestamp", "hash", "normalize", "dedup", "insert", "commit"} <= set(stages)
+    assert stages["timestamp"]["calls"] == 3
+    assert result["stats"]["counters"] == {"duplicate": 0, "error": 0, "ok": 3, "processed": 3}
+    session.refresh(batch)
+    assert batch.stats["counters"]["ok"] == 3
+
+
+def test_metrics_endpoint(client, session):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="token.csv", status="completed")
+    session.add(batch)
+    session.commit()
+    with open(FIXTURES / "token_tx_sample.csv") as f:
+        token_tx_csv.parse(f, batch.id)
+    PriceService.get_usd_many("NOPE", [datetime(2023, 9, 1, tzinfo=timezone.utc)])
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert 'gcc_import_stage_seconds_count{source="token",stage="hash"}' in text
+    assert 'gcc_import_rows_total{outcome="ok",source="token"}' in text
+    assert 'gcc_price_lookups_total{source="miss"}' in text
+    assert 'gcc_import_batches{status="completed"} 1' in text
+    assert 'gcc_import_batches{status="failed"} 0' in text
+
+    # A status no batch has any more drops back to 0.
+    batch.status = "failed"
+    session.commit()
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'gcc_import_batches{status="completed"} 0' in text
+    assert 'gcc_import_batches{status="failed"} 1' in text
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.services.normalize.records import NormalizedTx, canonical, finalize, validate_batch
+from app.services.normalize.schema import Transaction
+
+DT = datetime(2023, 9, 1, 10, tzinfo=timezone.utc)
+
+
+def record(tx):
+    return {"row_hash": tx.tx_hash, "provenance": {"row_number": 1}, "tx": tx}
+
+
+def test_canonical_matches_pydantic_model():
+    tx = NormalizedTx(tx_hash="0x1", datetime_utc=DT, type="TRANSFER", base_asset="TKN",
+                      base_qty=Decimal("1.23"), provenance={"source": "token_csv"})
+    model = Transaction(**tx._asdict())
+    out = canonical(tx)
+    assert list(out) == list(dict(model))
+    assert out["datetime_utc"] == "2023-09-01T10:00:00+00:00"
+    assert out["base_qty"] == "1.23"
+    assert datetime.fromisoformat(out["datetime_utc"]) == model.datetime_utc
+    assert {k: v for k, v in out.items() if k not in ("datetime_utc", "base_qty")} == {
+        k: v for k, v in dict(model).items() if k not in ("datetime_utc", "base_qty")
+    }
+
+
+def test_validate_batch_flags_bad_rows_by_column():
+    batch = [
+        NormalizedTx(tx_hash="0x1", datetime_utc=DT, type="TRANSFER"),
+        NormalizedTx(tx_hash=None, datetime_utc=DT, type="TRANSFER"),
+        NormalizedTx(tx_hash="0x3", datetime_utc=DT.replace(tzinfo=None), type="TRANSFER"),
+        NormalizedTx(tx_hash="0x4", datetime_utc=DT.astimezone(timezone(timedelta(hours=2))), type="TRANSFER"),
+        NormalizedTx(tx_hash="0x5", datetime_utc=DT, type="TRANSFER", base_qty=1.5),
+    ]
+    assert sorted(validate_batch(batch)) == [1, 2, 3, 4]
+
+
+def test_finalize_fast_and_strict_agree():
+    txs = [
+        NormalizedTx(tx_hash=f"0x{i}", datetime_utc=DT, type="TRANSFER", base_qty=Decimal(i))
+        for i in range(3)
+    ]
+    fast = [record(tx) for tx in txs] + [record(NormalizedTx(tx_hash="", datetime_utc=DT, type="TRANSFER"))]
+    slow = [record(tx) for tx in txs]
+    assert len(finalize(fast, strict_mode=False)) == 1
+    assert finalize(slow, strict_mode=True) == []
+    assert [r["provenance"]["normalized"] for r in fast] == [r["provenance"]["normalized"] for r in slow]
+    assert fast[2]["normalized"]["base_qty"] == Decimal(2)
+    assert "tx" not in fast[0]
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from app.db.models import ImportBatch, TransactionNormalized, TransactionRaw
+from app.services.ingest import token_tx_csv
+from app.services.normalize.backfill import backfill_normalized
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+
+
+def import_token(session):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="token.csv")
+    session.add(batch)
+    session.commit()
+    with open(FIXTURES / "token_tx_sample.csv") as f:
+        token_tx_csv.parse(f, batch.id)
+    return batch.id
+
+
+def test_parser_populates_normalized_table(session):
+    batch_id = import_token(session)
+    rows = session.query(TransactionNormalized).order_by(TransactionNormalized.tx_hash).all()
+    assert [r.tx_hash for r in rows] == ["0xhash1", "0xhash2", "0xhash3"]
+    assert all(r.import_batch_id == batch_id and r.type == "TRANSFER" for r in rows)
+    assert rows[1].datetime_utc.replace(tzinfo=timezone.utc) == datetime(2023, 9, 2, 10, 30, tzinfo=timezone.utc)
+    assert rows[2].base_qty == Decimal("3")
+    assert [r.account for r in rows] == ["0xfrom1", "0xfrom2", "0xfrom3"]
+    assert rows[0].raw.provenance["row_number"] == 1
+
+
+def test_backfill_fills_missing_rows(app, session):
+    import_token(session)
+    session.query(TransactionNormalized).delete()
+    session.commit()
+
+    assert backfill_normalized(chunk_size=2) == 3
+    assert session.query(TransactionNormalized).count() == session.query(TransactionRaw).count()
+    assert backfill_normalized(chunk_size=2) == 0
+
+    session.query(TransactionNormalized).delete()
+    session.commit()
+    result = app.test_cli_runner().invoke(args=["backfill-normalized", "--chunk-size", "1"])
+    assert "backfilled 3" in result.output
@@ -0,0 +1,76 @@
+import csv
+import io
+
+import pytest
+
+from app.db.models import ImportBatch, PricePoint, TransactionRaw
+from app.services.ingest import jobs, registry, wallet_tx_csv
+from app.services.ingest.registry import Columns, CsvTable
+
+
+@pytest.fixture
+def restore_registry(monkeypatch):
+    monkeypatch.setattr(registry, "REGISTRY", {
+        name: spec._replace(columns=dict(spec.columns)) for name, spec in registry.REGISTRY.items()
+    })
+
+
+def test_columns_compiled_from_header():
+    header = ["Value", "value", "Txhash", "Txhash", "Extra"]
+    col = Columns(header, {"value": ("Value", "value"), "tx_hash": ("Txhash",), "to": ("To",)}, required=("to",))
+    assert col.positions == {"value": (0, 1), "tx_hash": (3,), "to": ()}
+    assert col["value"](["", "2", "a", "b", "x"]) == "2"
+    assert col["value"](["1", "2", "a", "b", "x"]) == "1"
+    assert col["value"](["", "", "a", "b", "x"]) == ""
+    # Last duplicate wins, as with DictReader.
+    assert col["tx_hash"](["1", "2", "a", "b", "x"]) == "b"
+    with pytest.raises(KeyError):
+        col["to"](["1", "2", "a", "b", "x"])
+    assert Columns(header, {"to": ("To",)})["to"](["1"]) is None
+
+
+def test_table_records_match_dict_reader():
+    text = "a,b,c\n1,2,3\n\n4,5\n6,7,8,9\n"
+    table = CsvTable(io.StringIO(text))
+    assert [table.record(row) for row in table] == list(csv.DictReader(io.StringIO(text)))
+    assert CsvTable(io.StringIO("")).header == []
+
+
+def test_registered_variant_imports_through_api(client, session, restore_registry):
+    registry.register(
+        "bscscan_bep20",
+        wallet_tx_csv.parse,
+        {**wallet_tx_csv.COLUMNS, "value": ("Quantity",), "token_symbol": ("TokenSymbol", "Symbol")},
+        multi_file=True,
+        transactions=True,
+    )
+    text = (
+        '"Txhash","DateTime (UTC)","From","To","Quantity","Symbol"\n'
+        '"0x1","2023-09-01 10:00:00","0xa","0xb","1.5","TKN"\n'
+        '"0x2","2023-09-01 11:00:00","0xb","0xa","2","TKN"\n'
+    )
+    resp = client.post(
+        "/api/import/csv?source=bscscan_bep20",
+        data={"file": (io.BytesIO(text.encode()), "bep20.csv")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 202
+    batch_id = resp.get_json()["batch_id"]
+    jobs.wait(batch_id, timeout=30)
+    batch = session.get(ImportBatch, batch_id)
+    assert (batch.status, batch.source, batch.rows_ok) == ("completed", "BSCSCAN_BEP20_CSV", 2)
+    raw = session.query(TransactionRaw).order_by(TransactionRaw.id).first()
+    assert raw.raw_payload["Quantity"] == "1.5"
+    assert client.post("/api/import/csv?source=unknown", data=text, content_type="text/csv").status_code == 400
+
+
+def test_add_variants_extends_existing_source(session, restore_registry):
+    registry.add_variants("bnb", timestamp=["Date", "timestamp"], price=["Close"])
+    assert registry.get("bnb").columns["timestamp"] == ("timestamp", "date", "dt", "Date")
+    batch = ImportBatch(source="BNB_USD_CSV", file_name="bnb.csv")
+    session.add(batch)
+    session.commit()
+    spec = registry.get("bnb")
+    result = spec.run([io.StringIO("Date,Close\n2023-09-01,215.5\n2023-09-02,\n")], batch.id)
+    assert (result["rows_ok"], result["rows_error"]) == (1, 1)
+    assert session.query(PricePoint).one().price == 215.5
@@ -0,0 +1,55 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.db.models import ImportBatch
+from app.services.ingest import dexscreener_csv
+from app.services.prices import PriceService, series_cache
+from app.services.prices.cache import SeriesCache
+from app.services.prices.series import PriceSeries
+
+TS = datetime(2023, 9, 1, 12, tzinfo=timezone.utc)
+
+
+def import_dex(session, text):
+    batch = ImportBatch(source="DEXSCREENER_CSV", file_name="dex.csv")
+    session.add(batch)
+    session.commit()
+    dexscreener_csv.parse(io.StringIO(text), batch.id)
+
+
+def test_repeat_lookups_served_from_cache(session):
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T00:00:00Z,TKN,1.0\n")
+    before = series_cache.stats()
+    for _ in range(5):
+        assert PriceService.get_usd("TKN", TS) == Decimal("1.0")
+    stats = series_cache.stats()
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 4
+
+
+def test_dexscreener_import_invalidates_series(session):
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T00:00:00Z,TKN,1.0\n")
+    assert PriceService.get_usd("TKN", TS) == Decimal("1.0")
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T11:00:00Z,TKN,2.0\n")
+    assert PriceService.get_usd("TKN", TS) == Decimal("2.0")
+
+
+def test_lru_eviction_and_stale_load_not_cached():
+    cache = SeriesCache(maxsize=2)
+    empty = lambda: PriceSeries([])  # noqa: E731
+    cache.get("A", "USD", empty)
+    cache.get("B", "USD", empty)
+    cache.get("A", "USD", empty)
+    cache.get("C", "USD", empty)
+    assert cache.stats()["size"] == 2
+    cache.get("B", "USD", empty)
+    assert cache.stats()["misses"] == 4
+
+    def racing_load():
+        cache.invalidate("D", "USD")
+        return PriceSeries([])
+
+    cache.get("D", "USD", racing_load)
+    cache.get("D", "USD", empty)
+    assert cache.stats()["misses"] == 6
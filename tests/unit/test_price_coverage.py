@@ -0,0 +1,73 @@
+import io
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.db.models import ImportBatch, PricePoint
+from app.services.ingest import dexscreener_csv
+from app.services.prices import PriceService, series_cache
+from app.services.prices.coverage import Coverage
+
+T0 = datetime(2023, 9, 1, tzinfo=timezone.utc)
+
+
+def import_dex(session, text):
+    batch = ImportBatch(source="DEXSCREENER_CSV", file_name="dex.csv")
+    session.add(batch)
+    session.commit()
+    dexscreener_csv.parse(io.StringIO(text), batch.id)
+
+
+def test_coverage_merges_intervals():
+    cov = Coverage()
+    cov.add(10, 20)
+    cov.add(30, 40)
+    cov.add(18, 32)
+    cov.add(50, 60)
+    assert (cov.starts, cov.ends) == ([10, 50], [40, 60])
+    assert cov.covers(10) and cov.covers(35) and not cov.covers(45) and not cov.covers(5)
+    assert cov.gaps() == [(40, 60 - 10)]
+    assert cov.gaps(0, 70) == [(0, 10), (40, 50), (60, 70)]
+
+
+def test_uncovered_lookups_skip_series(session):
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T00:00:00Z,TKN,1.0\n")
+    far = T0 + timedelta(days=10)
+    assert PriceService.get_usd_many("TKN", [far, T0]) == [None, Decimal("1.0")]
+    misses = series_cache.stats()["misses"]
+    assert PriceService.get_usd_many("NOPE", [far]) == [None]
+    assert PriceService.get_usd_many("TKN", [far]) == [None]
+    assert series_cache.stats()["misses"] == misses
+
+
+def test_import_extends_coverage(session):
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T00:00:00Z,TKN,1.0\n")
+    later = T0 + timedelta(days=5)
+    assert PriceService.get_usd_many("TKN", [later]) == [None]
+    import_dex(session, "timestamp,token,price_usd\n2023-09-05T12:00:00Z,TKN,2.0\n")
+    assert PriceService.get_usd_many("TKN", [later]) == [Decimal("2.0")]
+
+
+def test_ticks_from_other_writers_are_picked_up(session):
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T00:00:00Z,TKN,1.0\n")
+    later = T0 + timedelta(days=5)
+    assert PriceService.get_usd_many("TKN", [T0, later]) == [Decimal("1.0"), None]
+    # Stored behind the index's back, as the CLI or another worker would: the
+    # refresh on the next miss also drops the cached TKN/USD series.
+    session.add(PricePoint(dt_utc=later, asset="TKN", quote="USD", price=Decimal("3"), source="TEST"))
+    session.commit()
+    assert PriceService.get_usd_many("TKN", [later]) == [Decimal("3")]
+
+
+def test_gaps_endpoint(client, session):
+    import_dex(session, "timestamp,token,price_usd\n2023-09-01T00:00:00Z,TKN,1.0\n2023-09-10T00:00:00Z,TKN,2.0\n")
+    body = client.get("/api/prices/gaps?asset=TKN&quote=USD").get_json()
+    assert body["gaps"] == [{
+        "asset": "TKN",
+        "quote": "USD",
+        "start": "2023-09-02T00:00:00+00:00",
+        "end": "2023-09-09T00:00:00+00:00",
+        "seconds": 7 * 86400,
+    }]
+    body = client.get("/api/prices/gaps?asset=ALT&quote=USD&start=2023-09-01&end=2023-09-02").get_json()
+    assert [g["seconds"] for g in body["gaps"]] == [86400]
+    assert client.get("/api/prices/gaps?min_seconds=999999999").get_json()["gaps"] == []
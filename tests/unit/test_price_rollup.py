@@ -0,0 +1,88 @@
+import io
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.db.models import ImportBatch, PricePoint, PriceRollup
+from app.services.ingest import dexscreener_csv
+from app.services.prices import PriceService, series_cache
+from app.services.prices.rollup import prune_ticks, rebuild_rollups, resolution_for
+from app.services.prices.service import PriceNotFound
+
+TICKS = """timestamp,token,price_usd
+2023-09-01T10:00:05Z,TKN,1.0
+2023-09-01T10:00:40Z,TKN,3.0
+2023-09-01T10:01:10Z,TKN,2.0
+2023-09-01T12:30:00Z,TKN,4.0
+"""
+
+
+def import_dex(session, text):
+    batch = ImportBatch(source="DEXSCREENER_CSV", file_name="dex.csv")
+    session.add(batch)
+    session.commit()
+    dexscreener_csv.parse(io.StringIO(text), batch.id)
+
+
+def rollups(session, resolution):
+    rows = session.query(PriceRollup).filter_by(resolution=resolution).order_by(PriceRollup.bucket_start)
+    return [(r.open, r.high, r.low, r.close, r.ticks) for r in rows]
+
+
+def test_rollups_built_at_ingest_and_merged(session):
+    import_dex(session, TICKS)
+    assert rollups(session, "1m") == [(1, 3, 1, 3, 2), (2, 2, 2, 2, 1), (4, 4, 4, 4, 1)]
+    assert rollups(session, "1h") == [(1, 3, 1, 2, 3), (4, 4, 4, 4, 1)]
+    assert rollups(session, "1d") == [(1, 4, 1, 4, 4)]
+
+    # A later import merges into existing buckets; re-imported ticks are not counted twice.
+    import_dex(session, TICKS + "2023-09-01T09:59:00Z,TKN,0.5\n")
+    assert rollups(session, "1d") == [(Decimal("0.5"), 4, Decimal("0.5"), 4, 5)]
+    assert rollups(session, "1h")[0] == (Decimal("0.5"), Decimal("0.5"), Decimal("0.5"), Decimal("0.5"), 1)
+
+    before = rollups(session, "1m")
+    assert rebuild_rollups(session) == 5
+    assert rollups(session, "1m") == before
+
+
+def test_resolution_for_tolerance():
+    assert resolution_for(timedelta(seconds=30)) is None
+    assert resolution_for(timedelta(minutes=5)) == "1m"
+    assert resolution_for(timedelta(hours=2)) == "1h"
+    assert resolution_for(timedelta(days=7)) == "1d"
+
+
+def test_tolerance_lookup_uses_rollups(session):
+    import_dex(session, TICKS)
+    ts = datetime(2023, 9, 1, 10, 0, 30, tzinfo=timezone.utc)
+    assert PriceService.get_usd("TKN", ts) == Decimal("3.0")
+    assert PriceService.get_usd_many("TKN", [ts], tolerance=timedelta(seconds=5)) == [None]
+    # Daily buckets keep only the day's first and last tick.
+    assert PriceService.get_usd("TKN", ts, tolerance=timedelta(days=1)) == Decimal("1.0")
+    assert PriceService.get_usd("TKN", ts, tolerance=timedelta(minutes=1)) == Decimal("3.0")
+    # Raw, daily and minute TKN/USD; the TKN/BNB miss is answered by the coverage index.
+    assert series_cache.stats()["size"] == 3
+
+
+def test_tolerance_lookup_never_uses_live_bnb(session):
+    ts = datetime(2023, 9, 1, 10, tzinfo=timezone.utc)
+    assert PriceService.get_usd_many("BNB", [ts], tolerance=timedelta(hours=1)) == [None]
+    with pytest.raises(PriceNotFound):
+        PriceService.get_usd("BNB", ts, tolerance=timedelta(minutes=5))
+
+
+def test_prune_keeps_rollups_and_lookups(session):
+    busy = "".join(f"2023-09-01T10:02:{s:02d}Z,TKN,{p}\n" for s, p in zip(range(0, 60, 10), (5, 9, 6, 1, 7, 8)))
+    import_dex(session, TICKS + busy + "2023-09-03T00:00:00Z,TKN,6.0\n")
+    before = {r: [row[:4] for row in rollups(session, r)] for r in ("1m", "1h", "1d")}
+
+    # Only days before the cutoff's day are thinned: 10:02 keeps 5, 9, 1 and 8.
+    assert prune_ticks(session, datetime(2023, 9, 2, 18, tzinfo=timezone.utc), chunk_size=3) == 2
+    assert session.query(PricePoint).count() == 9
+    series_cache.clear()
+    assert PriceService.get_usd("TKN", datetime(2023, 9, 1, 10, 2, 45, tzinfo=timezone.utc)) == Decimal("8")
+    assert PriceService.get_usd("TKN", datetime(2023, 9, 3, tzinfo=timezone.utc)) == Decimal("6.0")
+
+    rebuild_rollups(session)
+    assert {r: [row[:4] for row in rollups(session, r)] for r in ("1m", "1h", "1d")} == before
@@ -1,3 +1,4 @@
+import io
 from datetime import datetime, timezone
 from decimal import Decimal
 from pathlib import Path
@@ -5,7 +6,7 @@ from pathlib import Path
 import pytest
 
 from app.db.models import ImportBatch
-from app.services.ingest import dexscreener_csv
+from app.services.ingest import bnb_usd_csv, dexscreener_csv
 from app.services.prices.service import PriceNotFound, PriceService
 from app.services.prices import bscscan
 
@@ -20,6 +21,13 @@ def load_prices(session):
         dexscreener_csv.parse(f, batch.id)
 
 
+def load_bnb_usd(session, price):
+    batch = ImportBatch(source="BNB_USD_CSV", file_name="bnb.csv")
+    session.add(batch)
+    session.commit()
+    bnb_usd_csv.parse(io.StringIO(f"timestamp,price\n2023-09-01T12:00:00Z,{price}\n"), batch.id)
+
+
 def test_price_lookup_from_csv(session):
     load_prices(session)
     ts = datetime(2023, 9, 1, 12, tzinfo=timezone.utc)
@@ -29,8 +37,12 @@ def test_price_lookup_from_csv(session):
 
 def test_price_lookup_bnb_fallback(monkeypatch, session):
     load_prices(session)
-    monkeypatch.setattr(bscscan.BscScanPriceService, "get_bnb_price", staticmethod(lambda: Decimal("200")))
     ts = datetime(2023, 9, 1, 12, tzinfo=timezone.utc)
+    monkeypatch.setattr(bscscan.BscScanPriceService, "get_bnb_price", staticmethod(lambda: Decimal("200")))
+    # The live BNB/USD price is never applied to a historical BNB quote.
+    with pytest.raises(PriceNotFound):
+        PriceService.get_usd("ALT", ts)
+    load_bnb_usd(session, "200")
     price = PriceService.get_usd("ALT", ts)
     assert price == Decimal("0.4")
 
@@ -40,3 +52,30 @@ def test_price_not_found(session):
     ts = datetime(2023, 9, 1, 12, tzinfo=timezone.utc)
     with pytest.raises(PriceNotFound):
         PriceService.get_usd("MISSING", ts)
+
+
+def test_get_usd_many_keeps_order_and_marks_misses(monkeypatch, session):
+    load_prices(session)
+    load_bnb_usd(session, "200")
+    calls = []
+
+    def live():
+        calls.append(1)
+        return Decimal("200")
+
+    monkeypatch.setattr(bscscan.BscScanPriceService, "get_bnb_price", staticmethod(live))
+    near = datetime(2023, 9, 1, 12, tzinfo=timezone.utc)
+    far = datetime(2023, 9, 5, tzinfo=timezone.utc)
+
+    assert PriceService.get_usd_many("TKN", [far, near, near]) == [None, Decimal("1.0"), Decimal("1.0")]
+    assert PriceService.get_usd_many("ALT", [near, far, near]) == [Decimal("0.4"), None, Decimal("0.4")]
+    assert calls == []
+
+
+def test_get_usd_batch_multi_asset(monkeypatch, session):
+    load_prices(session)
+    load_bnb_usd(session, "200")
+    monkeypatch.setattr(bscscan.BscScanPriceService, "get_bnb_price", staticmethod(lambda: Decimal("200")))
+    ts = datetime(2023, 9, 1, 12, tzinfo=timezone.utc)
+    result = PriceService.get_usd_batch([("ALT", ts), ("MISSING", ts), ("TKN", ts), ("BNB", ts)])
+    assert result == [Decimal("0.4"), None, Decimal("1.0"), Decimal("200")]
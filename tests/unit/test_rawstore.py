@@ -0,0 +1,130 @@
+import io
+
+import pytest
+
+from app.db.models import ImportBatch, RawBlock, TransactionNormalized, TransactionRaw
+from app.services.ingest import bulk, rawstore, token_tx_csv
+from app.services.ingest.rawstore import compact_batch, decode_rows, encode_rows, expand_batch, storage_report
+from app.services.normalize.backfill import backfill_normalized
+
+HEADER = "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+
+
+def token_csv(n):
+    return HEADER + "".join(
+        f"2023-09-01T10:{i // 60 % 60:02d}:{i % 60:02d}Z,0xs{i},0xa,0xb,{i % 7}.25,TKN,0xc\n" for i in range(n)
+    )
+
+
+def import_token(session, n):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="raw.csv")
+    session.add(batch)
+    session.commit()
+    token_tx_csv.parse(io.StringIO(token_csv(n)), batch.id)
+    return batch.id
+
+
+@pytest.fixture
+def compact(monkeypatch):
+    monkeypatch.setattr(rawstore, "RAW_STORAGE", "compact")
+
+
+def test_codec_round_trip():
+    rows = [
+        {"a": "x", "b": "1", "c": None},
+        {"a": "x", "b": "2"},
+        {"b": "3", "a": "y", None: ["extra", "cells"]},
+        {},
+    ]
+    data = encode_rows(rows)
+    assert decode_rows(data) == rows
+    assert decode_rows(encode_rows([{}, {}])) == [{}, {}]
+    assert decode_rows(encode_rows([])) == []
+
+
+def test_compact_import_stores_blocks(session, compact, monkeypatch):
+    monkeypatch.setattr(token_tx_csv, "CHUNK_SIZE", 20)
+    batch_id = import_token(session, 50)
+
+    assert session.query(RawBlock).count() == 3
+    assert session.query(TransactionNormalized).count() == 50
+    rows = session.query(TransactionRaw).order_by(TransactionRaw.id).all()
+    assert all(r.raw_payload is None for r in rows)
+    assert "normalized" not in rows[0].provenance
+    assert rows[0].provenance["row_number"] == 1
+    assert rows[21].payload["tx_hash"] == "0xs21"
+    assert rows[21].block is rows[22].block
+
+    # Re-import: the dedup path is unchanged.
+    batch = ImportBatch(source="TOKEN_CSV", file_name="again.csv")
+    session.add(batch)
+    session.commit()
+    assert token_tx_csv.parse(io.StringIO(token_csv(50)), batch.id)["rows_ok"] == 0
+    assert batch_id != batch.id
+
+
+def test_transactions_api_decodes_blocks(client, session, compact):
+    import_token(session, 5)
+    items = client.get("/api/transactions?limit=10").get_json()["items"]
+    assert [i["raw_payload"]["tx_hash"] for i in items] == [f"0xs{i}" for i in range(5)]
+    assert "raw_block_id" not in items[0]
+
+
+def test_compact_expand_and_report(session):
+    batch_id = import_token(session, 300)
+    before = session.query(TransactionRaw).order_by(TransactionRaw.id).all()
+    payloads = [r.raw_payload for r in before]
+    assert "normalized" in before[0].provenance
+    session.expunge_all()
+
+    projected = storage_report(session, batch_id)[0]
+    assert projected["rows"] == 300
+    assert projected["compact_bytes_per_row"] * 3 < projected["json_bytes_per_row"]
+
+    assert compact_batch(session, batch_id, chunk_size=128) == 300
+    session.expunge_all()
+    rows = session.query(TransactionRaw).order_by(TransactionRaw.id).all()
+    assert [r.payload for r in rows] == payloads
+    assert all(r.raw_payload is None and "normalized" not in r.provenance for r in rows)
+    stored = storage_report(session, batch_id)[0]
+    assert stored["compact_bytes"] < projected["json_bytes"] / 3
+    session.expunge_all()
+
+    assert expand_batch(session, batch_id) == 300
+    session.expunge_all()
+    assert [r.raw_payload for r in session.query(TransactionRaw).order_by(TransactionRaw.id)] == payloads
+    assert session.query(RawBlock).count() == 0
+
+
+def test_compact_keeps_normalized_json_until_backfilled(session):
+    batch_id = import_token(session, 20)
+    provenances = [r.provenance for r in session.query(TransactionRaw).order_by(TransactionRaw.id)]
+    # Rows written before transaction_normalized existed only have the JSON copy.
+    session.query(TransactionNormalized).filter(TransactionNormalized.id > 10).delete()
+    session.commit()
+    session.expunge_all()
+
+    compact_batch(session, batch_id)
+    session.expunge_all()
+    rows = session.query(TransactionRaw).order_by(TransactionRaw.id).all()
+    assert ["normalized" in r.provenance for r in rows] == [False] * 10 + [True] * 10
+
+    assert expand_batch(session, batch_id) == 20
+    session.expunge_all()
+    assert [r.provenance for r in session.query(TransactionRaw).order_by(TransactionRaw.id)] == provenances
+    assert backfill_normalized() == 10
+
+
+def test_conflicting_chunk_leaves_no_block(session, compact):
+    import_token(session, 5)
+    batch = ImportBatch(source="TOKEN_CSV", file_name="again.csv")
+    session.add(batch)
+    session.commit()
+    stale = {r.row_hash for r in session.query(TransactionRaw)}
+    rows = [
+        {"import_batch_id": batch.id, "source": "TOKEN_CSV", "row_hash": h, "raw_payload": {}, "provenance": {}}
+        for h in stale
+    ]
+    assert bulk.insert_raw_rows(session, rows) == set()
+    session.commit()
+    assert session.query(RawBlock).count() == 1
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.ingest.timestamps import TimestampParser, parse_any
+
+EXPECTED = datetime(2023, 9, 1, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "value, fmt",
+    [
+        ("1693562400", "epoch"),
+        ("2023-09-01T10:00:00Z", "iso"),
+        ("2023-09-01 12:00:00+02:00", "iso"),
+        ("2023-09-01 10:00:00", "iso"),
+        ("Sep 1 2023 10:00AM", "dateutil"),
+    ],
+)
+def test_detects_format_and_matches_dateutil(value, fmt):
+    parse = TimestampParser()
+    dt = parse(value)
+    assert parse.format == fmt
+    assert dt == EXPECTED
+    assert dt.tzinfo == timezone.utc
+    if fmt != "epoch":
+        assert dt == parse_any(value)
+
+
+def test_outliers_fall_back_to_dateutil():
+    parse = TimestampParser()
+    assert parse("2023-09-01T10:00:00Z") == EXPECTED
+    assert parse("2023-09-01 05:00:00-0500") == EXPECTED
+    assert parse("1 Sep 2023 10:00 UTC") == EXPECTED
+    assert parse.format == "iso"
+    assert parse.fallbacks == 2
+
+
+def test_mixed_epoch_and_iso_column():
+    parse = TimestampParser()
+    assert parse("2023-09-01 10:00:00") == EXPECTED
+    assert parse(str(int(EXPECTED.timestamp()))) == EXPECTED
+    assert parse.fallbacks == 1
+
+
+def test_unparseable_value_raises():
+    parse = TimestampParser()
+    parse("1693562400")
+    with pytest.raises(ValueError):
+        parse("not a date")
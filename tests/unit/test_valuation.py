@@ -0,0 +1,87 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from app.db.models import ImportBatch, PricePoint, TransactionValuation
+from app.services.ingest import dexscreener_csv, token_tx_csv
+from app.services.prices import series_cache
+from app.services.valuation import asset_totals, value_transactions
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures"
+
+
+def import_fixture(session, module, name, source):
+    batch = ImportBatch(source=source, file_name=name)
+    session.add(batch)
+    session.commit()
+    with open(FIXTURES / name) as f:
+        module.parse(f, batch.id)
+    return batch.id
+
+
+def test_value_batch_and_totals(session):
+    import_fixture(session, dexscreener_csv, "dexscreener_sample.csv", "DEXSCREENER_CSV")
+    batch_id = import_fixture(session, token_tx_csv, "token_tx_sample.csv", "TOKEN_CSV")
+
+    assert value_transactions(batch_id) == 3
+    [tkn] = asset_totals(session, batch_id)
+    assert tkn["asset"] == "TKN"
+    assert tkn["transactions"] == 3
+    assert tkn["unpriced"] == 2
+    assert round(tkn["value_usd"], 9) == Decimal("1.23")
+
+    # Only the unpriced rows are looked at again.
+    assert value_transactions(batch_id) == 2
+    assert session.query(TransactionValuation).count() == 3
+
+    session.add(PricePoint(
+        dt_utc=datetime(2023, 9, 3, tzinfo=timezone.utc), asset="TKN", quote="USD", price=Decimal("2"), source="TEST",
+    ))
+    session.commit()
+    series_cache.invalidate("TKN", "USD")
+    assert value_transactions(batch_id) == 2
+    [tkn] = asset_totals(session, batch_id)
+    assert tkn["unpriced"] == 0
+    assert round(tkn["value_usd"], 9) == Decimal("12.23")
+    assert value_transactions(batch_id, refresh=True) == 3
+
+
+def test_historical_bnb_row_stays_unpriced(session):
+    batch = ImportBatch(source="TOKEN_CSV", file_name="bnb.csv")
+    session.add(batch)
+    session.commit()
+    token_tx_csv.parse(io.StringIO(
+        "timestamp,tx_hash,from,to,value,token_symbol,token_contract\n"
+        "2023-09-01T10:00:00Z,0xbnb,0xa,0xb,2,BNB,0xc\n"
+    ), batch.id)
+
+    # The default provider is not configured; valuation must not reach it.
+    assert value_transactions(batch.id) == 1
+    [bnb] = asset_totals(session, batch.id)
+    assert (bnb["asset"], bnb["unpriced"], bnb["value_usd"]) == ("BNB", 1, None)
+
+
+def test_valuation_endpoint(client, session):
+    import_fixture(session, dexscreener_csv, "dexscreener_sample.csv", "DEXSCREENER_CSV")
+    batch_id = import_fixture(session, token_tx_csv, "token_tx_sample.csv", "TOKEN_CSV")
+
+    # Reading totals never values anything.
+    body = client.get(f"/api/valuation?batch_id={batch_id}&end=2023-09-02").get_json()
+    assert body == {"assets": [], "total_usd": "0"}
+
+    body = client.post(f"/api/valuation?batch_id={batch_id}&end=2023-09-02").get_json()
+    assert body["valued"] == 1
+    [tkn] = body["assets"]
+    assert (tkn["asset"], tkn["transactions"], tkn["unpriced"]) == ("TKN", 1, 0)
+    assert round(Decimal(body["total_usd"]), 9) == Decimal("1.23")
+    assert client.post(f"/api/valuation?batch_id={batch_id}&end=2023-09-02").get_json()["valued"] == 0
+    assert client.get(f"/api/valuation?batch_id={batch_id}&end=2023-09-02").get_json()["total_usd"] == body["total_usd"]
+
+
+def test_value_transactions_command(app, session):
+    import_fixture(session, dexscreener_csv, "dexscreener_sample.csv", "DEXSCREENER_CSV")
+    batch_id = import_fixture(session, token_tx_csv, "token_tx_sample.csv", "TOKEN_CSV")
+    result = app.test_cli_runner().invoke(args=["value-transactions", "--batch-id", str(batch_id)])
+    assert result.exit_code == 0, result.output
+    assert "valued 3 transactions" in result.output